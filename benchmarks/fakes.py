@@ -0,0 +1,520 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Local Stand-In Servers for Benchmarks
+"""
+
+# Standard imports
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+import gzip
+import hashlib
+import hmac
+import http.server
+import itertools
+import json
+import logging
+import random
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+import urllib.error
+import urllib.request
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# The port tuyaface always connects to
+TUYA_PORT = 6668
+# A `TUYA_DEVICE` value that points at `TuyaServer`
+TUYA_DEVICE = {'protocol': '3.3', 'deviceid': 'benchmark', 'ip': '127.0.0.1',
+               'localkey': '0123456789abcdef'}
+
+
+class Behavior:
+    """How a stand-in server behaves: how slow it is, how often it fails, how much it sends,
+    and whether the status it reports flaps between two values."""
+    # Milliseconds added to every response
+    latency_ms: float = 0
+    # Fraction of requests, 0-1, answered with HTTP 500 (or dropped, for Tuya)
+    error_rate: float = 0
+    # Bytes of padding in JSON responses, or number of events in calendars
+    payload_size: int = 0
+    # Alternate between two statuses on every request
+    flap: bool = False
+
+    def __init__(self, latency_ms: float = 0, error_rate: float = 0, payload_size: int = 0,
+                 flap: bool = False):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.payload_size = payload_size
+        self.flap = flap
+
+    def delay(self):
+        """Sleeps for the configured latency."""
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000)
+
+    def should_fail(self) -> bool:
+        """Returns True if this request should fail."""
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+class _FakeHandler(http.server.BaseHTTPRequestHandler):
+    """Answers every API that Status-Light's sources call, by path."""
+    protocol_version = 'HTTP/1.1'
+    # The headers and body are written separately; without this, a client that keeps the
+    # connection alive waits out a delayed ACK (~40ms) for every response
+    disable_nagle_algorithm = True
+    server: '_FakeHTTPServer'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handles a GET request."""
+        self._handle(b'')
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handles a POST request."""
+        length = int(self.headers.get('Content-Length', 0))
+        self._handle(self.rfile.read(length) if length else b'')
+
+    def _handle(self, request_body: bytes):
+        behavior = self.server.behavior
+        behavior.delay()
+        if behavior.should_fail():
+            self._send(500, 'application/json', b'{"error": "stand-in failure"}')
+            return
+
+        request = next(self.server.requests)
+        self.server.request_count = request + 1
+        url = urlparse(self.path)
+        body = self.server.respond(url.path, request, parse_qs(url.query), request_body)
+        if body is None:
+            self._send(404, 'application/json', b'{"error": "not found"}')
+        elif isinstance(body, str):
+            self._send_calendar(body.encode())
+        else:
+            self._send(200, 'application/json', json.dumps(body).encode())
+
+    def _send_calendar(self, body: bytes):
+        """Sends a calendar with its ETag, or 304 if the client already has it, gzipped if
+        the client accepts it."""
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.server.not_modified_count += 1
+            self._send(304, 'text/calendar', b'', {'ETag': etag})
+            return
+        headers = {'ETag': etag}
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        self._send(200, 'text/calendar', body, headers)
+
+    def _send(self, code: int, content_type: str, body: bytes,
+              headers: dict[str, str] | None = None):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+
+class _FakeHTTPServer(http.server.ThreadingHTTPServer):
+    """A stand-in HTTP server on an ephemeral localhost port."""
+    daemon_threads = True
+
+    def __init__(self, behavior: Behavior):
+        super().__init__(('127.0.0.1', 0), _FakeHandler)
+        self.behavior = behavior
+        self.requests = itertools.count()
+        self.request_count = 0
+        # Conditional requests answered with 304 Not Modified
+        self.not_modified_count = 0
+
+    @property
+    def url(self) -> str:
+        """The base URL of this server, with a trailing slash."""
+        return f'http://127.0.0.1:{self.server_address[1]}/'
+
+    def respond(self, path: str, request: int, query: dict[str, list[str]],
+                body: bytes) -> dict | str | None:
+        """Returns the response body for `path`, its `query` and the request `body`, or
+        None for an unknown path."""
+        raise NotImplementedError
+
+    def _padding(self) -> str:
+        return 'x' * self.behavior.payload_size
+
+    def _flapped(self, request: int, first, second):
+        return second if self.behavior.flap and request % 2 else first
+
+
+class SlackServer(_FakeHTTPServer):
+    """Stands in for the Slack Web API `users.info` and `users.getPresence` methods, and
+    `apps.connections.open`, which hands out `socket_url`."""
+    socket_url: str = ''
+
+    def respond(self, path, request, query, body):
+        if path.endswith('/apps.connections.open'):
+            return {'ok': True, 'url': self.socket_url}
+        if path.endswith('/users.info'):
+            return {'ok': True, 'user': {'id': 'U0', 'profile': {
+                'status_emoji': '', 'status_text': '', 'huddle_state': 'default_unset',
+                'title': self._padding()}}}
+        if path.endswith('/users.getPresence'):
+            return {'ok': True, 'presence': self._flapped(request, 'active', 'away')}
+        return None
+
+
+class WebexServer(_FakeHTTPServer):
+    """Stands in for the Webex `people` API, getting one person or listing several by ID."""
+
+    def respond(self, path, request, query, body):
+        if '/people/' in path:
+            return self._person(path.rsplit('/', 1)[-1], request)
+        if path.endswith('/people'):
+            person_ids = ','.join(query.get('id', [])).split(',')
+            return {'items': [self._person(person_id, request)
+                              for person_id in person_ids if person_id != '']}
+        return None
+
+    def _person(self, person_id: str, request: int) -> dict:
+        return {'id': person_id, 'displayName': 'Benchmark', 'nickName': self._padding(),
+                'status': self._flapped(request, 'active', 'meeting')}
+
+
+class GraphServer(_FakeHTTPServer):
+    """Stands in for the Microsoft Graph `me` and `getSchedule` endpoints."""
+
+    def respond(self, path, request, query, body):
+        if path.endswith('/me'):
+            return {'id': 'benchmark', 'mail': 'benchmark@example.com',
+                    'userPrincipalName': 'benchmark@example.com', 'jobTitle': self._padding()}
+        if path.endswith('/getSchedule'):
+            now = datetime.now(timezone.utc)
+            items = [{'status': 'busy',
+                      'start': {'dateTime': (now + timedelta(minutes=10 + i)).strftime(
+                          '%Y-%m-%dT%H:%M:%S.0000000'), 'timeZone': 'UTC'},
+                      'end': {'dateTime': (now + timedelta(minutes=11 + i)).strftime(
+                          '%Y-%m-%dT%H:%M:%S.0000000'), 'timeZone': 'UTC'}}
+                     for i in range(self.behavior.payload_size)]
+            if self._flapped(request, False, True):
+                items.insert(0, {'status': 'busy',
+                                 'start': {'dateTime': now.strftime('%Y-%m-%dT%H:%M:%S.0000000'),
+                                           'timeZone': 'UTC'},
+                                 'end': {'dateTime': (now + timedelta(minutes=1)).strftime(
+                                     '%Y-%m-%dT%H:%M:%S.0000000'), 'timeZone': 'UTC'}})
+            return {'value': [{'scheduleId': 'benchmark@example.com',
+                               'availabilityView': self._flapped(request, '0', '2'),
+                               'scheduleItems': items}]}
+        return None
+
+
+class GoogleServer(_FakeHTTPServer):
+    """Stands in for the Google Calendar `freeBusy`, `events` and `channels` endpoints.
+
+    Every calendar has the same events: `payload_size` busy ones from ten minutes on, and
+    one under way that `change` (or, with `flap`, every `events` request) cancels or
+    restores. Sync tokens are change counters, and push channels are notified of every
+    `change`."""
+
+    def __init__(self, behavior: Behavior):
+        super().__init__(behavior)
+        now = datetime.now(timezone.utc)
+        # Each event, with the change counter it was last changed at
+        self.events = {f'event{i}': (self._event(f'event{i}', now + timedelta(minutes=10 + i),
+                                                 now + timedelta(minutes=11 + i)), 0)
+                       for i in range(behavior.payload_size)}
+        self.changes = 0
+        # Each open push channel, by ID
+        self.channels: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def respond(self, path, request, query, body):
+        if path.endswith('/freeBusy'):
+            now = datetime.now(timezone.utc)
+            busy = [{'start': (now + timedelta(minutes=10 + i)).isoformat(),
+                     'end': (now + timedelta(minutes=11 + i)).isoformat()}
+                    for i in range(self.behavior.payload_size)]
+            if self._flapped(request, False, True):
+                busy.insert(0, {'start': now.isoformat(),
+                                'end': (now + timedelta(minutes=1)).isoformat()})
+            return {'kind': 'calendar#freeBusy', 'calendars': {'primary': {'busy': busy}}}
+        if path.endswith('/events'):
+            if self.behavior.flap:
+                self.change(notify=False)
+            return self._list_events(query)
+        if path.endswith('/events/watch'):
+            channel = json.loads(body)
+            with self._lock:
+                self.channels[channel['id']] = channel
+            # Google confirms a new channel with a `sync` notification, and keeps it open
+            # for a week
+            threading.Thread(target=self._notify, args=(channel, 'sync'), daemon=True).start()
+            return {'kind': 'api#channel', 'id': channel['id'], 'resourceId': 'benchmark',
+                    'expiration': str(int((time.time() + 7 * 86400) * 1000))}
+        if path.endswith('/channels/stop'):
+            with self._lock:
+                self.channels.pop(json.loads(body)['id'], None)
+            return {}
+        return None
+
+    def change(self, notify: bool = True):
+        """Cancels the event under way, or restores it from now for ten minutes, and
+        notifies every push channel, unless `notify` is False."""
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self.changes += 1
+            current = self.events.get('current', ({'status': 'cancelled'}, 0))[0]
+            event = self._event('current', now, now + timedelta(minutes=10))
+            if current['status'] != 'cancelled':
+                event['status'] = 'cancelled'
+            self.events['current'] = (event, self.changes)
+            channels = list(self.channels.values())
+        if notify:
+            for channel in channels:
+                self._notify(channel, 'exists')
+
+    def _list_events(self, query: dict[str, list[str]]) -> dict:
+        """Lists every event, or with a sync token, those changed since, with the
+        cancelled ones."""
+        with self._lock:
+            since = int(query['syncToken'][0]) if 'syncToken' in query else None
+            items = [event for event, changed in self.events.values()
+                     if (changed > since if since is not None
+                         else event['status'] != 'cancelled')]
+            return {'kind': 'calendar#events', 'items': items,
+                    'nextSyncToken': str(self.changes)}
+
+    def _event(self, event_id: str, start: datetime, end: datetime) -> dict:
+        return {'kind': 'calendar#event', 'id': event_id, 'status': 'confirmed',
+                'summary': 'Benchmark',
+                'start': {'dateTime': start.isoformat()}, 'end': {'dateTime': end.isoformat()}}
+
+    def _notify(self, channel: dict, state: str):
+        """Sends a push notification to `channel`'s address."""
+        request = urllib.request.Request(channel['address'], b'', {
+            'X-Goog-Channel-ID': channel['id'], 'X-Goog-Channel-Token': channel.get('token', ''),
+            'X-Goog-Resource-ID': 'benchmark', 'X-Goog-Resource-State': state})
+        try:
+            with urllib.request.urlopen(request, timeout=5):
+                pass
+        except (urllib.error.URLError, OSError) as ex:
+            logger.warning('Unable to notify push channel %s: %s', channel['id'], ex)
+
+
+class IcsServer(_FakeHTTPServer):
+    """Stands in for an ICS calendar feed, with `payload_size` events spread around now.
+
+    The feed only changes on the hour (or, with `flap`, on every request), so conditional
+    requests are usually answered with 304 Not Modified."""
+
+    def respond(self, path, request, query, body):
+        if not path.endswith('.ics'):
+            return None
+        current = datetime.now(timezone.utc).replace(microsecond=0)
+        now = current.replace(minute=0, second=0)
+        lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Status-Light//Benchmark//EN']
+        for i in range(self.behavior.payload_size):
+            start = now + timedelta(hours=i - self.behavior.payload_size // 2, minutes=30)
+            lines += ['BEGIN:VEVENT', f'UID:benchmark-{i}@status-light',
+                      f'DTSTAMP:{now:%Y%m%dT%H%M%SZ}', f'DTSTART:{start:%Y%m%dT%H%M%SZ}',
+                      f'DTEND:{start + timedelta(minutes=15):%Y%m%dT%H%M%SZ}',
+                      f'SUMMARY:Benchmark event {i}', 'END:VEVENT']
+        if self._flapped(request, False, True):
+            lines += ['BEGIN:VEVENT', 'UID:benchmark-flap@status-light',
+                      f'DTSTAMP:{now:%Y%m%dT%H%M%SZ}',
+                      f'DTSTART:{current - timedelta(minutes=1):%Y%m%dT%H%M%SZ}',
+                      f'DTEND:{current + timedelta(minutes=1):%Y%m%dT%H%M%SZ}',
+                      'SUMMARY:Flap', 'END:VEVENT']
+        lines.append('END:VCALENDAR')
+        return '\r\n'.join(lines) + '\r\n'
+
+
+class _SlackSocketHandler(socketserver.BaseRequestHandler):
+    """Accepts a WebSocket connection and answers its pings; events are sent by
+    `SlackSocketServer.send_event`."""
+    server: 'SlackSocketServer'
+    # The WebSocket handshake's magic GUID
+    GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+    def handle(self):
+        request = b''
+        while b'\r\n\r\n' not in request:
+            data = self.request.recv(4096)
+            if not data:
+                return
+            request += data
+        key = next(line.split(b':', 1)[1].strip() for line in request.split(b'\r\n')
+                   if line.lower().startswith(b'sec-websocket-key:'))
+        accept = base64.b64encode(hashlib.sha1(key + self.GUID).digest())
+        self.request.sendall(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                             b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + accept +
+                             b'\r\n\r\n')
+        lock = threading.Lock()
+        with self.server.clients_lock:
+            self.server.clients[self.request] = lock
+        self.server.send_frame(self.request, lock, 0x1, json.dumps({'type': 'hello'}).encode())
+        try:
+            while True:
+                opcode, payload = self._read_frame()
+                if opcode is None or opcode == 0x8:
+                    return
+                if opcode == 0x9:
+                    self.server.send_frame(self.request, lock, 0xA, payload)
+        except OSError:
+            return
+        finally:
+            with self.server.clients_lock:
+                self.server.clients.pop(self.request, None)
+
+    def _read_frame(self) -> tuple[int | None, bytes]:
+        """Reads one (masked) frame from the client."""
+        header = self._read(2)
+        if header is None:
+            return None, b''
+        opcode, length = header[0] & 0x0F, header[1] & 0x7F
+        if length == 126:
+            length = int.from_bytes(self._read(2) or b'', 'big')
+        elif length == 127:
+            length = int.from_bytes(self._read(8) or b'', 'big')
+        mask = self._read(4) if header[1] & 0x80 else bytes(4)
+        payload = self._read(length) or b''
+        return opcode, bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+
+    def _read(self, size: int) -> bytes | None:
+        data = b''
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+
+class SlackSocketServer(socketserver.ThreadingTCPServer):
+    """Stands in for Slack's Socket Mode WebSocket endpoint on an ephemeral port."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SlackSocketHandler)
+        self.clients: dict[socket.socket, threading.Lock] = {}
+        self.clients_lock = threading.Lock()
+        self.envelopes = itertools.count()
+
+    @property
+    def url(self) -> str:
+        """The WebSocket URL to connect to."""
+        return f'ws://127.0.0.1:{self.server_address[1]}/link'
+
+    def send_event(self, event: dict) -> int:
+        """Sends an Events API `event` to every connected client, and returns how many."""
+        envelope = json.dumps({'envelope_id': f'envelope-{next(self.envelopes)}',
+                               'type': 'events_api', 'accepts_response_payload': False,
+                               'payload': {'type': 'event_callback', 'event': event}})
+        with self.clients_lock:
+            clients = list(self.clients.items())
+        for client, lock in clients:
+            self.send_frame(client, lock, 0x1, envelope.encode())
+        return len(clients)
+
+    @staticmethod
+    def send_frame(client: socket.socket, lock: threading.Lock, opcode: int, payload: bytes):
+        """Sends one unmasked frame to a client."""
+        if len(payload) < 126:
+            header = bytes([0x80 | opcode, len(payload)])
+        elif len(payload) < 65536:
+            header = bytes([0x80 | opcode, 126]) + len(payload).to_bytes(2, 'big')
+        else:
+            header = bytes([0x80 | opcode, 127]) + len(payload).to_bytes(8, 'big')
+        with lock:
+            client.sendall(header + payload)
+
+
+class _TuyaHandler(socketserver.BaseRequestHandler):
+    """Acknowledges every command sent to a Tuya device."""
+    server: 'TuyaServer'
+
+    def handle(self):
+        self.request.settimeout(5)
+        while True:
+            try:
+                data = self.request.recv(4096)
+            except OSError:
+                return
+            if len(data) < 16:
+                return
+            behavior = self.server.behavior
+            behavior.delay()
+            if behavior.should_fail():
+                # Drop the connection; tuyaface raises and Status-Light retries
+                return
+            self.request.sendall(self.reply(data[4:8], data[8:12]))
+
+    @staticmethod
+    def reply(seq: bytes, cmd: bytes) -> bytes:
+        """Builds an unencrypted, payload-less reply frame with a zero return code."""
+        frame = bytes.fromhex('000055aa') + seq + cmd + (12).to_bytes(4, 'big') + bytes(4)
+        return frame + binascii.crc32(frame).to_bytes(4, 'big') + bytes.fromhex('0000aa55')
+
+
+class TuyaServer(socketserver.ThreadingTCPServer):
+    """Stands in for a Tuya device on 127.0.0.1, on the fixed port tuyaface uses."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, behavior: Behavior):
+        super().__init__(('127.0.0.1', TUYA_PORT), _TuyaHandler)
+        self.behavior = behavior
+
+
+def post_event(url: str, kind: str, payload, secret: str) -> int:
+    """Posts `payload` to Status-Light's `/<kind>` push endpoint, signed the way Webex,
+    Slack or a generic sender (`kind` of `webex`, `slack` or `status`) would sign it, and
+    returns the HTTP status."""
+    body = json.dumps(payload).encode()
+    headers = {'Content-Type': 'application/json'}
+    if kind == 'webex':
+        headers['X-Spark-Signature'] = hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+    elif kind == 'slack':
+        timestamp = str(int(time.time()))
+        headers['X-Slack-Request-Timestamp'] = timestamp
+        headers['X-Slack-Signature'] = 'v0=' + hmac.new(
+            secret.encode(), b'v0:' + timestamp.encode() + b':' + body,
+            hashlib.sha256).hexdigest()
+    else:
+        headers['X-Status-Light-Signature'] = 'sha256=' + hmac.new(
+            secret.encode(), body, hashlib.sha256).hexdigest()
+    request = urllib.request.Request(url.rstrip('/') + '/' + kind, body, headers)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as ex:
+        return ex.code
+
+
+def start(server: socketserver.BaseServer) -> socketserver.BaseServer:
+    """Serves `server` from a background thread and returns it."""
+    threading.Thread(target=server.serve_forever, name=type(server).__name__,
+                     daemon=True).start()
+    return server
+
+
+def get_free_port() -> int:
+    """Returns a localhost TCP port that nothing is listening on."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def is_port_free(port: int) -> bool:
+    """Returns True if nothing is listening on the localhost `port`."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        return probe.connect_ex(('127.0.0.1', port)) != 0
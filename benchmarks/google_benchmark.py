@@ -0,0 +1,158 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Google Calendar Source Regression Benchmark
+
+Polls the Google Calendar source against a local stand-in for the Calendar API, and
+checks that each poll makes exactly one freebusy (or, with `--mode sync`, incremental
+events) request, and that the CPU time per
+poll and the RSS growth over all the polls stay under their limits. Building the
+Calendar service parses the whole discovery document, so doing it on every poll (as
+`--rebuild` does, to show what a regression looks like) breaks both limits. Exits
+non-zero if any check fails. The stand-in runs in a child process, so its cost isn't
+counted.
+
+    python benchmarks/google_benchmark.py
+    python benchmarks/google_benchmark.py --polls 5000 --rebuild --json
+    python benchmarks/google_benchmark.py --mode sync --flap
+"""
+
+# Standard imports
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import resource
+import sys
+import tempfile
+
+# Project imports
+import fakes
+from loop_benchmark import SOURCE_DIR, get_rss_bytes, write_tokens
+
+
+def serve_fake(connection, flap: bool):
+    """Runs the Calendar API stand-in in a child process, reporting how many requests it
+    has answered whenever asked, until told to stop."""
+    logging.basicConfig(level=logging.WARNING)
+    server = fakes.start(fakes.GoogleServer(fakes.Behavior(payload_size=20, flap=flap)))
+    connection.send(server.url)
+    while connection.recv() == 'count':
+        connection.send(getattr(server, 'request_count', 0))
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the command line."""
+    parser = argparse.ArgumentParser(
+        description='Checks the CPU and memory cost of polling the Google Calendar source.')
+    parser.add_argument('--polls', type=int, default=2000,
+                        help='polls measured (default: 2000)')
+    parser.add_argument('--warmup', type=int, default=200,
+                        help='polls made before measuring, to fill caches (default: 1.5)')
+    parser.add_argument('--max-cpu-ms', type=float, default=1.5,
+                        help='most CPU time per poll, in milliseconds (default: 1.5)')
+    parser.add_argument('--max-rss-growth-mb', type=float, default=1.0,
+                        help='most RSS growth over the measured polls (default: 1.0)')
+    parser.add_argument('--mode', default='freebusy', choices=['freebusy', 'sync'],
+                        help='query busy times, or sync events (default: freebusy)')
+    parser.add_argument('--flap', action='store_true',
+                        help='change an event on every poll')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='rebuild the credentials and service on every poll, as '
+                             'Status-Light used to')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    return parser.parse_args()
+
+
+def main():
+    """Runs the benchmark, prints the report, and exits non-zero on a regression."""
+    args = parse_args()
+    parent_connection, child_connection = multiprocessing.Pipe()
+    server_process = multiprocessing.Process(target=serve_fake, args=(child_connection, args.flap),
+                                             daemon=True)
+    server_process.start()
+    url = parent_connection.recv()
+
+    with tempfile.TemporaryDirectory() as token_store:
+        write_tokens(token_store)
+        sys.path.insert(0, SOURCE_DIR)
+        # pylint: disable=import-outside-toplevel
+        from sources.calendar import google
+        from utility import enum
+
+        api = google.GoogleCalendarAPI()
+        api.tokenStore = token_store
+        api.credentialStore = token_store
+        api.apiUrl = url
+        api.lookahead = 5
+        api.mode = args.mode
+        # Fetch the busy times on every poll, rather than answering from the cache
+        api.cacheLifetime = 0
+
+        def poll():
+            if args.rebuild:
+                api._creds = None  # pylint: disable=protected-access
+                api._service = None  # pylint: disable=protected-access
+            return api.get_current_status()
+
+        for _ in range(args.warmup):
+            poll()
+        gc.collect()
+        parent_connection.send('count')
+        requests_start = parent_connection.recv()
+        rss_start = get_rss_bytes()
+        usage_start = resource.getrusage(resource.RUSAGE_SELF)
+
+        statuses = [poll() for _ in range(args.polls)]
+
+        usage_end = resource.getrusage(resource.RUSAGE_SELF)
+        gc.collect()
+        rss_end = get_rss_bytes()
+        parent_connection.send('count')
+        requests = parent_connection.recv() - requests_start
+    parent_connection.send('stop')
+    server_process.join(timeout=5)
+
+    cpu_seconds = (usage_end.ru_utime - usage_start.ru_utime) + \
+        (usage_end.ru_stime - usage_start.ru_stime)
+    report = {
+        'polls': args.polls,
+        'mode': args.mode,
+        'rebuild': args.rebuild,
+        'requests_per_poll': round(requests / args.polls, 3),
+        'cpu_ms_per_poll': round(cpu_seconds * 1000 / args.polls, 3),
+        'rss_start_mb': round(rss_start / 2 ** 20, 1),
+        'rss_end_mb': round(rss_end / 2 ** 20, 1),
+        'rss_growth_mb': round((rss_end - rss_start) / 2 ** 20, 2),
+        'unknown_statuses': sum(status is enum.Status.UNKNOWN for status in statuses)
+    }
+    failures = []
+    if requests != args.polls:
+        failures.append(f'{requests} request(s) for {args.polls} poll(s)')
+    if report['cpu_ms_per_poll'] > args.max_cpu_ms:
+        failures.append(f'{report["cpu_ms_per_poll"]}ms of CPU per poll, over '
+                        f'{args.max_cpu_ms}ms')
+    if report['rss_growth_mb'] > args.max_rss_growth_mb:
+        failures.append(f'RSS grew {report["rss_growth_mb"]}MB, over '
+                        f'{args.max_rss_growth_mb}MB')
+    if report['unknown_statuses'] > 0:
+        failures.append(f'{report["unknown_statuses"]} poll(s) failed')
+    report['failures'] = failures
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            if key != 'failures':
+                print(f'{key}: {value}')
+        for failure in failures:
+            print(f'FAIL: {failure}')
+        if not failures:
+            print('PASS')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+ICS Calendar Source Benchmark
+
+Generates a synthetic feed of single and recurring events spread over several years,
+with a mix of busy, tentative, out of office, working elsewhere, transparent and
+cancelled ones, and times polling the ICS source over it, which searches its index of
+the next `indexHorizon` minutes' occurrences, against expanding every recurring event
+in the feed on every poll, as Status-Light used to. Also reports how long parsing the
+feed and building the index take, which happens once per refresh. Exits non-zero if
+the two disagree about any status.
+
+    python benchmarks/ics_benchmark.py
+    python benchmarks/ics_benchmark.py --events 5000 --polls 2000 --json
+"""
+
+# Standard imports
+import argparse
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'status-light')
+sys.path.insert(0, SOURCE_DIR)
+
+# Project imports
+# pylint: disable=wrong-import-position
+import recurring_ical_events
+from sources.calendar import ics
+from utility import enum
+from utility.clock import SimulatedClock
+
+# Extra properties for some events, and how many events in each hundred get them
+EVENT_KINDS: tuple[tuple[list[str], int], ...] = (
+    ([], 70),
+    (['STATUS:TENTATIVE'], 10),
+    (['TRANSP:TRANSPARENT'], 8),
+    (['STATUS:CANCELLED'], 4),
+    (['X-MICROSOFT-CDO-BUSYSTATUS:OOF'], 4),
+    (['X-MICROSOFT-CDO-BUSYSTATUS:WORKINGELSEWHERE'], 4))
+RULES: tuple[str, ...] = ('FREQ=DAILY;COUNT=400', 'FREQ=WEEKLY;BYDAY=MO,WE,FR',
+                          'FREQ=WEEKLY;INTERVAL=2', 'FREQ=MONTHLY;COUNT=36')
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the command line."""
+    parser = argparse.ArgumentParser(
+        description='Benchmarks looking up the ICS status in a large synthetic feed.')
+    parser.add_argument('--events', type=int, default=50000,
+                        help='events in the feed (default: 50000)')
+    parser.add_argument('--recurring', type=float, default=0.1,
+                        help='share of the events that recur (default: 0.1)')
+    parser.add_argument('--years', type=int, default=3,
+                        help='years the single events are spread over, ending a year '
+                             'from now (default: 3)')
+    parser.add_argument('--polls', type=int, default=1000,
+                        help='polls timed with the index, 15 seconds apart (default: 1000)')
+    parser.add_argument('--legacy-polls', type=int, default=5,
+                        help='of those polls, how many are also timed expanding every '
+                             'event (default: 5)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    return parser.parse_args()
+
+
+def make_feed(args: argparse.Namespace, now: datetime, rng: random.Random) -> bytes:
+    """Returns a feed of `args.events` events, in ICS format."""
+    stamp = f'{now:%Y%m%dT%H%M%SZ}'
+    first = now - timedelta(days=365 * (args.years - 1))
+    span_minutes = 365 * args.years * 24 * 60
+    properties, weights = zip(*EVENT_KINDS)
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Status-Light//Benchmark//EN']
+    for index in range(args.events):
+        start = first + timedelta(minutes=rng.randrange(0, span_minutes, 15))
+        event = ['BEGIN:VEVENT', f'UID:benchmark-{index}@status-light', f'DTSTAMP:{stamp}',
+                 f'DTSTART:{start:%Y%m%dT%H%M%SZ}',
+                 f'DTEND:{start + timedelta(minutes=rng.choice([15, 30, 60, 90])):%Y%m%dT%H%M%SZ}',
+                 f'SUMMARY:Benchmark event {index}']
+        if rng.random() < args.recurring:
+            event.append(f'RRULE:{rng.choice(RULES)}')
+        event += rng.choices(properties, weights)[0]
+        lines += event + ['END:VEVENT']
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(lines) + '\r\n').encode()
+
+
+def get_legacy_status(api: ics.Ics, calendar, now: datetime) -> enum.Status:
+    """Works out the status the way Status-Light used to: expanding every event in the
+    calendar over the lookahead and transition search windows, on every poll."""
+    local_tz = now.tzinfo
+    end_time = now + timedelta(minutes=api.lookahead)
+    horizon_time = now + timedelta(minutes=max(api.lookahead, api.transitionHorizon))
+    statuses = set()
+    for event in recurring_ical_events.of(calendar).between(now, horizon_time):
+        # pylint: disable=protected-access
+        event_start, event_end = api._get_event_times(event, local_tz)
+        if event_start < end_time and (event_end > now or event_start == event_end):
+            statuses.add(api._get_event_status(event))
+    for status in ics.STATUS_ORDER:
+        if status in statuses:
+            return status
+    return enum.Status.FREE
+
+
+def main():
+    """Runs the benchmark, prints the report, and exits non-zero if the index and the
+    full expansion disagree."""
+    args = parse_args()
+    rng = random.Random(0)
+    now = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    feed = make_feed(args, now, rng)
+
+    with tempfile.TemporaryDirectory() as cache_store:
+        api = ics.Ics()
+        api.cacheStore = cache_store
+        api.cacheLifetime = 60 * 24
+        with open(os.path.join(cache_store, api.cacheFile), 'wb') as cache_file:
+            cache_file.write(feed)
+        clock = SimulatedClock(now)
+        api.clock = clock
+
+        parse_start = time.perf_counter()
+        calendar = api._load_calendar()  # pylint: disable=protected-access
+        parse_time = time.perf_counter() - parse_start
+
+        # The first poll builds the index
+        build_start = time.perf_counter()
+        statuses = [api.get_current_status()]
+        build_time = time.perf_counter() - build_start
+
+        poll_times = []
+        for poll in range(1, args.polls):
+            clock.elapsed = poll * 15.0
+            poll_start = time.perf_counter()
+            statuses.append(api.get_current_status())
+            poll_times.append(time.perf_counter() - poll_start)
+
+        legacy_times = []
+        mismatches = 0
+        for poll in range(0, args.polls, max(args.polls // max(args.legacy_polls, 1), 1)):
+            clock.elapsed = poll * 15.0
+            poll_now = clock.now(clock.now().astimezone().tzinfo)
+            poll_start = time.perf_counter()
+            legacy_status = get_legacy_status(api, calendar, poll_now)
+            legacy_times.append(time.perf_counter() - poll_start)
+            if legacy_status != statuses[poll]:
+                mismatches += 1
+
+    indexed_time = sum(poll_times) / max(len(poll_times), 1)
+    legacy_time = sum(legacy_times) / max(len(legacy_times), 1)
+    report = {
+        'events': args.events,
+        'feed_mb': round(len(feed) / 2 ** 20, 1),
+        'parse_ms': round(parse_time * 1000, 1),
+        'index_build_ms': round(build_time * 1000, 1),
+        'indexed_occurrences': len(api._occurrences),  # pylint: disable=protected-access
+        'legacy_ms_per_poll': round(legacy_time * 1000, 3),
+        'indexed_ms_per_poll': round(indexed_time * 1000, 3),
+        'speedup': round(legacy_time / indexed_time, 1) if indexed_time else None,
+        'statuses': {status.name.lower(): statuses.count(status) for status in set(statuses)},
+        'mismatches': mismatches
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f'{key}: {value}')
+        if mismatches:
+            print(f'FAIL: {mismatches} poll(s) disagreed with expanding every event')
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
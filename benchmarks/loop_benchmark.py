@@ -0,0 +1,305 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Main Loop Benchmark
+
+Runs the real `StatusLight.run` loop against local stand-ins for every source and
+for a Tuya device, with polling intervals set to zero so the loop runs flat out,
+and reports iterations per second, iteration latency, CPU time, RSS, open file
+descriptors, and how many HTTP connections the shared pools opened per request. The stand-ins run in a child process, so their cost isn't counted.
+
+    python benchmarks/loop_benchmark.py --duration 10 --latency-ms 20 --flap
+    python benchmarks/loop_benchmark.py --sources ics --payload-size 5000 --json
+
+Every `--latency-ms`, `--error-rate` and `--payload-size` option can be overridden
+per stand-in, e.g. `--slack-latency-ms 200` or `--tuya-error-rate 0.1`.
+"""
+
+# Standard imports
+import argparse
+import base64
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# Project imports
+import fakes
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'status-light')
+SERVICES = ['webex', 'slack', 'office365', 'google', 'ics', 'tuya']
+SERVERS = {
+    'webex': fakes.WebexServer,
+    'slack': fakes.SlackServer,
+    'office365': fakes.GraphServer,
+    'google': fakes.GoogleServer,
+    'ics': fakes.IcsServer
+}
+
+
+class IterationTimer(threading.Event):
+    """Stands in for `StatusLight.wake_event`, timing the work between each wait."""
+
+    def __init__(self):
+        super().__init__()
+        self.iteration_start = time.perf_counter()
+        self.latencies: list[float] = []
+
+    def wait(self, timeout=None):
+        self.latencies.append(time.perf_counter() - self.iteration_start)
+        result = super().wait(timeout)
+        self.iteration_start = time.perf_counter()
+        return result
+
+
+def serve_fakes(behaviors: dict[str, fakes.Behavior], connection):
+    """Runs the stand-in servers in a child process until told to stop."""
+    logging.basicConfig(level=logging.WARNING)
+    urls = {}
+    for service, server_class in SERVERS.items():
+        urls[service] = fakes.start(server_class(behaviors[service])).url
+    fakes.start(fakes.TuyaServer(behaviors['tuya']))
+    connection.send(urls)
+    connection.recv()
+
+
+def write_tokens(token_store: str):
+    """Writes Office 365 and Google tokens that never expire, so no sign-in is needed."""
+    def encode(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+    # 3rd-party imports
+    import msal  # pylint: disable=import-outside-toplevel
+
+    now = int(time.time())
+    token_cache = msal.SerializableTokenCache()
+    token_cache.add({
+        'client_id': 'benchmark',
+        'scope': ['https://graph.microsoft.com/Calendars.Read',
+                  'https://graph.microsoft.com/User.Read'],
+        'token_endpoint': 'https://login.microsoftonline.com/common/oauth2/v2.0/token',
+        'response': {
+            'access_token': 'benchmark', 'token_type': 'Bearer', 'expires_in': 10 ** 8,
+            'refresh_token': 'benchmark', 'scope': 'Calendars.Read User.Read',
+            'client_info': encode({'uid': 'benchmark', 'utid': 'benchmark'}),
+            'id_token': '.'.join([encode({'alg': 'none'}), encode({
+                'aud': 'benchmark', 'iss': 'https://login.microsoftonline.com/benchmark/v2.0',
+                'oid': 'benchmark', 'tid': 'benchmark', 'sub': 'benchmark', 'ver': '2.0',
+                'preferred_username': 'benchmark@example.com',
+                'iat': now, 'exp': now + 10 ** 8}), ''])
+        }
+    })
+    with open(os.path.join(token_store, 'o365_token.txt'), 'w', encoding='utf-8') as token_file:
+        token_file.write(token_cache.serialize())
+
+    with open(os.path.join(token_store, 'token.json'), 'w', encoding='utf-8') as token_file:
+        json.dump({'token': 'benchmark', 'refresh_token': 'benchmark', 'client_id': 'benchmark',
+                   'client_secret': 'benchmark', 'expiry': '2099-01-01T00:00:00Z',
+                   'scopes': ['https://www.googleapis.com/auth/calendar.freebusy']}, token_file)
+
+
+def get_rss_bytes() -> int:
+    """Returns the current resident set size, falling back to the peak where unavailable."""
+    try:
+        with open('/proc/self/statm', encoding='ascii') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # ru_maxrss is in KiB on Linux, but bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def get_open_fds() -> int | None:
+    """Returns the number of open file descriptors, or None where it can't be counted."""
+    for fd_dir in ['/proc/self/fd', '/dev/fd']:
+        if os.path.isdir(fd_dir):
+            return len(os.listdir(fd_dir))
+    return None
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Returns the nearest-rank percentile of `values`."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the command line."""
+    parser = argparse.ArgumentParser(
+        description='Benchmarks the Status-Light main loop against local stand-in servers.')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='seconds to run the loop for (default: 10)')
+    parser.add_argument('--sources', default='webex,slack,office365,google,ics',
+                        help='comma-separated SOURCES to poll (default: all)')
+    parser.add_argument('--target', default='tuya', choices=['tuya', 'virtual'],
+                        help='light target (default: tuya, against the stand-in device)')
+    parser.add_argument('--flap', action='store_true',
+                        help='make every source alternate its status, forcing a transition '
+                             'on every iteration')
+    parser.add_argument('--ics-cache-minutes', type=int, default=0,
+                        help='ICS cache lifetime; 0 downloads the feed on every poll')
+    parser.add_argument('--o365-cache-minutes', type=int, default=0,
+                        help='Office 365 schedule cache lifetime; 0 fetches it on every poll')
+    parser.add_argument('--google-cache-minutes', type=int, default=0,
+                        help='Google busy times cache lifetime; 0 fetches them on every poll')
+    parser.add_argument('--google-mode', default='freebusy', choices=['freebusy', 'sync'],
+                        help='query busy times, or sync events (default: freebusy)')
+    parser.add_argument('--log-level', default='CRITICAL',
+                        help='Status-Light LOGLEVEL (default: CRITICAL, to keep the report '
+                             'readable)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    for name, default, help_text in [('latency-ms', 0, 'milliseconds added to every response'),
+                                     ('error-rate', 0, 'fraction of requests that fail'),
+                                     ('payload-size', 0, 'bytes of JSON padding, or number '
+                                                         'of calendar events')]:
+        kind = int if name == 'payload-size' else float
+        parser.add_argument(f'--{name}', type=kind, default=default,
+                            help=f'{help_text} (default: {default})')
+        for service in SERVICES:
+            parser.add_argument(f'--{service}-{name}', type=kind, default=None,
+                                help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    """Runs the benchmark and prints the report."""
+    args = parse_args()
+    behaviors = {}
+    for service in SERVICES:
+        options = {}
+        for option in ['latency_ms', 'error_rate', 'payload_size']:
+            override = getattr(args, f'{service}_{option}')
+            options[option] = getattr(args, option) if override is None else override
+        behaviors[service] = fakes.Behavior(flap=args.flap, **options)
+
+    if args.target == 'tuya' and not fakes.is_port_free(fakes.TUYA_PORT):
+        sys.exit(f'Port {fakes.TUYA_PORT} is in use; the Tuya stand-in needs it')
+
+    parent_connection, child_connection = multiprocessing.Pipe()
+    server_process = multiprocessing.Process(target=serve_fakes,
+                                             args=(behaviors, child_connection), daemon=True)
+    server_process.start()
+    urls = parent_connection.recv()
+
+    with tempfile.TemporaryDirectory(prefix='status-light-benchmark-') as store:
+        write_tokens(store)
+        environ = {
+            'SOURCES': args.sources,
+            'TARGET': args.target,
+            'TUYA_DEVICE': json.dumps(fakes.TUYA_DEVICE),
+            'WEBEX_PERSONID': 'benchmark',
+            'WEBEX_BOTID': 'benchmark',
+            'SLACK_USER_ID': 'benchmark',
+            'SLACK_BOT_TOKEN': 'benchmark',
+            'O365_APPID': 'benchmark',
+            'O365_APPSECRET': 'benchmark',
+            'O365_TOKENSTORE': store,
+            'GOOGLE_TOKENSTORE': store,
+            'GOOGLE_CREDENTIALSTORE': store,
+            'GOOGLE_MODE': args.google_mode,
+            'ICS_URL': urls['ics'] + 'calendar.ics',
+            'ICS_CACHESTORE': store,
+            'LOGLEVEL': args.log_level
+        }
+
+        sys.path.insert(0, SOURCE_DIR)
+        spec = importlib.util.spec_from_file_location(
+            'status_light', os.path.join(SOURCE_DIR, 'status-light.py'))
+        status_light_module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(status_light_module)
+
+        status_light = status_light_module.StatusLight(environ)
+        status_light.init()
+        # Imported from the same place as Status-Light's, so it sees the same metrics
+        from utility import metrics  # pylint: disable=import-outside-toplevel
+
+        # Point every source at its stand-in, and poll everything on every iteration
+        # Only the selected sources exist
+        if status_light.webex_api is not None:
+            status_light.webex_api.base_url = urls['webex'] + 'v1/'
+            # Fetch the statuses on every poll, rather than sharing recent ones
+            sys.modules[type(status_light.webex_api).__module__].BATCH_WINDOW_SECONDS = 0
+        if status_light.slack_api is not None:
+            status_light.slack_api.base_url = urls['slack'] + 'api/'
+        if status_light.office_api is not None:
+            status_light.office_api.graphUrl = urls['office365']
+            status_light.office_api.cacheLifetime = args.o365_cache_minutes
+        if status_light.google_api is not None:
+            status_light.google_api.apiUrl = urls['google']
+            status_light.google_api.cacheLifetime = args.google_cache_minutes
+        if status_light.ics_api is not None:
+            status_light.ics_api.cacheLifetime = args.ics_cache_minutes
+        for source in status_light.source_scheduler.intervals:
+            status_light.source_scheduler.intervals[source] = 0
+        timer = IterationTimer()
+        status_light.wake_event = timer
+
+        rss_start, fds_start = get_rss_bytes(), get_open_fds()
+        rss_peak, fds_peak = rss_start, fds_start
+        usage_start = resource.getrusage(resource.RUSAGE_SELF)
+        wall_start = time.perf_counter()
+
+        loop_thread = threading.Thread(target=status_light.run, name='status-light')
+        loop_thread.start()
+        while time.perf_counter() - wall_start < args.duration:
+            time.sleep(0.25)
+            rss_peak = max(rss_peak, get_rss_bytes())
+            if fds_start is not None:
+                fds_peak = max(fds_peak, get_open_fds())
+        status_light.stop()
+        loop_thread.join()
+
+        wall_time = time.perf_counter() - wall_start
+        usage_end = resource.getrusage(resource.RUSAGE_SELF)
+        rss_end, fds_end = get_rss_bytes(), get_open_fds()
+
+    parent_connection.send('stop')
+    server_process.join(timeout=5)
+
+    # The last wait is the one `stop` interrupted
+    latencies = timer.latencies
+    cpu_time = (usage_end.ru_utime - usage_start.ru_utime) + \
+        (usage_end.ru_stime - usage_start.ru_stime)
+    report = {
+        'sources': args.sources,
+        'target': args.target,
+        'duration_s': round(wall_time, 3),
+        'iterations': len(latencies),
+        'iterations_per_s': round(len(latencies) / wall_time, 2),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else None,
+        'cpu_s': round(cpu_time, 3),
+        'cpu_percent': round(cpu_time / wall_time * 100, 1),
+        'rss_start_mb': round(rss_start / 2 ** 20, 1),
+        'rss_end_mb': round(rss_end / 2 ** 20, 1),
+        'rss_peak_mb': round(rss_peak / 2 ** 20, 1),
+        'fds_start': fds_start,
+        'fds_end': fds_end,
+        'fds_peak': fds_peak,
+        'transitions': int(metrics.TRANSITIONS.value()),
+        'tuya_retries': int(metrics.TUYA_RETRIES.value()),
+        'http_requests': int(metrics.HTTP_REQUESTS.value()),
+        'http_connections': int(metrics.HTTP_CONNECTIONS.value()),
+        'poll_errors': {source: int(metrics.SOURCE_POLL_ERRORS.value(source=source))
+                        for source in args.sources.split(',')}
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        width = max(len(key) for key in report)
+        for key, value in report.items():
+            print(f'{key.ljust(width)}  {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Slack Custom Status Matcher Benchmark
+
+Generates rule sets of increasing size, split evenly between the four custom status
+categories, and times how long matching one custom status takes with the compiled
+matcher, against the `str.startswith` checks it replaced (one per category, in
+priority order). Also reports how long compiling each rule set takes, which happens
+once per configuration.
+
+    python benchmarks/matcher_benchmark.py
+    python benchmarks/matcher_benchmark.py --rules 10,1000,10000 --json
+"""
+
+# Standard imports
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+import timeit
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'status-light')
+sys.path.insert(0, SOURCE_DIR)
+
+# Project imports
+from utility import enum, matcher  # pylint: disable=wrong-import-position
+
+STATUSES = {'busy': enum.Status.BUSY, 'scheduled': enum.Status.TENTATIVE,
+            'available': enum.Status.ACTIVE, 'off': enum.Status.INACTIVE}
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the command line."""
+    parser = argparse.ArgumentParser(
+        description='Benchmarks matching Slack custom statuses against large rule sets.')
+    parser.add_argument('--rules', default='8,100,1000,10000',
+                        help='comma-separated rule set sizes (default: 8,100,1000,10000)')
+    parser.add_argument('--number', type=int, default=2000,
+                        help='matches timed per rule set and custom status (default: 2000)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    return parser.parse_args()
+
+
+def make_rules(count: int, rng: random.Random) -> dict[str, list[str]]:
+    """Returns `count` random `:emoji: text` prefix rules, split between the categories."""
+    rules: dict[str, list[str]] = {category: [] for category in matcher.CATEGORIES}
+    for index in range(count):
+        emoji = ''.join(rng.choices(string.ascii_lowercase, k=8))
+        text = ''.join(rng.choices(string.ascii_lowercase + ' ', k=12))
+        rules[matcher.CATEGORIES[index % len(matcher.CATEGORIES)]].append(f':{emoji}: {text}')
+    return rules
+
+
+def match_startswith(rules: list[tuple[enum.Status, tuple[str, ...]]],
+                     custom_status: str) -> enum.Status:
+    """Matches the way Status-Light used to: one `startswith` per category, lowest
+    priority first, each match overriding the last."""
+    return_value = enum.Status.UNKNOWN
+    for status, prefixes in rules:
+        if len(prefixes) > 0 and custom_status.startswith(prefixes):
+            return_value = status
+    return return_value
+
+
+def main():
+    """Runs the benchmark and prints the report."""
+    args = parse_args()
+    rng = random.Random(0)
+    report = []
+    for count in [int(value) for value in args.rules.split(',')]:
+        rules = make_rules(count, rng)
+        legacy_rules = [(STATUSES[category], tuple(rule.casefold() for rule in rules[category]))
+                        for category in reversed(matcher.CATEGORIES)]
+
+        compile_start = time.perf_counter()
+        compiled = matcher.compile_rules(tuple(
+            (category, STATUSES[category], tuple(rules[category]))
+            for category in matcher.CATEGORIES))
+        compile_time = time.perf_counter() - compile_start
+
+        # The last rule of the lowest-priority category, and a status matching nothing
+        statuses = {'hit': (rules['off'] or [''])[-1].casefold() + ' until monday',
+                    'miss': ':spiral_calendar_pad: in a meeting with someone'}
+        result = {'rules': count, 'compile_ms': round(compile_time * 1000, 3)}
+        for name, custom_status in statuses.items():
+            expected = match_startswith(legacy_rules, custom_status)
+            matched = compiled.match(custom_status)
+            assert (matched[1] if matched else enum.Status.UNKNOWN) == expected
+            legacy_time = timeit.timeit(lambda: match_startswith(legacy_rules, custom_status),
+                                        number=args.number) / args.number
+            compiled_time = timeit.timeit(lambda: compiled.match(custom_status),
+                                          number=args.number) / args.number
+            result[f'{name}_startswith_us'] = round(legacy_time * 1e6, 3)
+            result[f'{name}_compiled_us'] = round(compiled_time * 1e6, 3)
+            result[f'{name}_speedup'] = round(legacy_time / compiled_time, 1)
+        report.append(result)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    columns = list(report[0])
+    widths = [max(len(column), *(len(str(row[column])) for row in report))
+              for column in columns]
+    print('  '.join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in report:
+        print('  '.join(str(row[column]).rjust(width)
+                        for column, width in zip(columns, widths)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Push Latency Benchmark
+
+Runs the real `StatusLight.run` loop with a Slack source pointed at a local stand-in,
+and a local sender that posts signed Slack `presence_change` events (or generic
+`/status` events) to Status-Light's push endpoint, alternating between `active` and
+`away`. Reports how long each change took to reach the (virtual) light, and how many
+requests Status-Light made to the source's stand-in meanwhile.
+
+With `--kind socket`, Status-Light connects to a Socket Mode stand-in instead, which
+sends `user_change` events alternating between a huddle and no custom status.
+
+With `--kind google`, Status-Light syncs a Google calendar from a Calendar API stand-in
+instead, and watches it; the stand-in cancels and restores a meeting under way, and
+notifies Status-Light's `/google` endpoint, which syncs the change.
+
+    python benchmarks/push_benchmark.py --events 50 --interval 0.2
+    python benchmarks/push_benchmark.py --kind status --json
+    python benchmarks/push_benchmark.py --kind socket --poll-seconds 5 --interval 1
+    python benchmarks/push_benchmark.py --kind google
+"""
+
+# Standard imports
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+# Project imports
+import fakes
+from loop_benchmark import write_tokens
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'status-light')
+SECRET = 'benchmark-secret'
+USER_ID = 'U0'
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the command line."""
+    parser = argparse.ArgumentParser(
+        description='Benchmarks how quickly pushed status changes reach the light.')
+    parser.add_argument('--events', type=int, default=50,
+                        help='number of status changes to push (default: 50)')
+    parser.add_argument('--interval', type=float, default=0.2,
+                        help='seconds between status changes (default: 0.2)')
+    parser.add_argument('--kind', default='slack',
+                        choices=['slack', 'status', 'socket', 'google'],
+                        help='push Slack presence_change events, generic events, Slack '
+                             'user_change events over Socket Mode, or Google Calendar '
+                             'notifications (default: slack)')
+    parser.add_argument('--poll-seconds', type=int, default=30,
+                        help='SLACK_POLL_SECONDS (or GOOGLE_POLL_SECONDS), until the first '
+                             'push (default: 30)')
+    parser.add_argument('--log-level', default='CRITICAL',
+                        help='Status-Light LOGLEVEL (default: CRITICAL, to keep the report '
+                             'readable)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    return parser.parse_args()
+
+
+def main():
+    """Runs the benchmark and prints the report."""
+    args = parse_args()
+    slack_server = fakes.start(fakes.SlackServer(fakes.Behavior()))
+    socket_server = fakes.start(fakes.SlackSocketServer())
+    slack_server.socket_url = socket_server.url
+    google_server = fakes.start(fakes.GoogleServer(fakes.Behavior()))
+    push_port = fakes.get_free_port()
+    push_url = f'http://127.0.0.1:{push_port}/'
+    environ = {
+        'SOURCES': 'slack',
+        'TARGET': 'virtual',
+        'SLACK_USER_ID': USER_ID,
+        'SLACK_BOT_TOKEN': 'benchmark',
+        'SLACK_POLL_SECONDS': str(args.poll_seconds),
+        'LOGLEVEL': args.log_level
+    }
+    if args.kind == 'socket':
+        environ['SLACK_APP_TOKEN'] = 'xapp-benchmark'
+    token_store = tempfile.TemporaryDirectory()
+    if args.kind == 'google':
+        write_tokens(token_store.name)
+        environ.update({'SOURCES': 'google', 'GOOGLE_MODE': 'sync',
+                        'GOOGLE_TOKENSTORE': token_store.name,
+                        'GOOGLE_CREDENTIALSTORE': token_store.name,
+                        'GOOGLE_WEBHOOK_URL': push_url + 'google',
+                        'GOOGLE_WEBHOOK_SECRET': SECRET,
+                        'GOOGLE_POLL_SECONDS': str(args.poll_seconds)})
+
+    sys.path.insert(0, SOURCE_DIR)
+    spec = importlib.util.spec_from_file_location(
+        'status_light', os.path.join(SOURCE_DIR, 'status-light.py'))
+    status_light_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(status_light_module)
+    # Imported from the same place as Status-Light's, so it delivers to the same profiles
+    from utility import push  # pylint: disable=import-outside-toplevel
+
+    status_light = status_light_module.StatusLight(environ)
+    status_light.init()
+    if args.kind == 'google':
+        status_light.google_api.apiUrl = google_server.url
+    else:
+        status_light.slack_api.base_url = slack_server.url + 'api/'
+    push_server = push.start_server('127.0.0.1', push_port, '', SECRET, SECRET, SECRET)
+
+    # Time every change of the light
+    light_changed = threading.Event()
+    light_times: list[float] = []
+    light = status_light.light
+    set_color, turn_off = light.set_color, light.turn_off
+
+    def record(call):
+        def recorded(*call_args):
+            result = call(*call_args)
+            light_times.append(time.perf_counter())
+            light_changed.set()
+            return result
+        return recorded
+    light.set_color, light.turn_off = record(set_color), record(turn_off)
+
+    loop_thread = threading.Thread(target=status_light.run, name='status-light')
+    loop_thread.start()
+    # The first poll sets the light, and tells Status-Light there's no custom status
+    light_changed.wait(10)
+
+    latencies = []
+    rejected = 0
+    api_server = google_server if args.kind == 'google' else slack_server
+    requests_start = api_server.request_count
+    wall_start = time.perf_counter()
+    for event in range(args.events):
+        presence = 'away' if event % 2 == 0 else 'active'
+        if args.kind == 'slack':
+            payload = {'type': 'event_callback',
+                       'event': {'type': 'presence_change', 'user': USER_ID,
+                                 'presence': presence}}
+        else:
+            payload = {'source': 'slack',
+                       'status': 'inactive' if presence == 'away' else 'active'}
+        light_changed.clear()
+        sent = time.perf_counter()
+        if args.kind == 'google':
+            # A meeting under way, then not; the notification makes Status-Light sync
+            google_server.change()
+            if light_changed.wait(5):
+                latencies.append(light_times[-1] - sent)
+        elif args.kind == 'socket':
+            # In a huddle, then not; without a custom status, the presence is polled
+            huddle = 'in_a_huddle' if event % 2 == 0 else 'default_unset'
+            if socket_server.send_event({'type': 'user_change', 'user': {
+                    'id': USER_ID, 'profile': {'status_emoji': '', 'status_text': '',
+                                               'huddle_state': huddle}}}) == 0:
+                rejected += 1
+                continue
+            if light_changed.wait(5):
+                latencies.append(light_times[-1] - sent)
+        elif fakes.post_event(push_url, args.kind, payload, SECRET) != 200:
+            rejected += 1
+        elif light_changed.wait(5):
+            latencies.append(light_times[-1] - sent)
+        time.sleep(args.interval)
+    wall_time = time.perf_counter() - wall_start
+    api_requests = api_server.request_count - requests_start
+
+    status_light.stop()
+    loop_thread.join()
+    if push_server is not None:
+        push_server.shutdown()
+    slack_server.shutdown()
+    socket_server.shutdown()
+    google_server.shutdown()
+    token_store.cleanup()
+
+    report = {
+        'kind': args.kind,
+        'events': args.events,
+        'rejected': rejected,
+        'light_changes': len(latencies),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3) if latencies else None,
+        'max_ms': round(max(latencies) * 1000, 3) if latencies else None,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3) if latencies else None,
+        'duration_s': round(wall_time, 3),
+        'api_requests': api_requests
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        width = max(len(key) for key in report)
+        for key, value in report.items():
+            print(f'{key.ljust(width)}  {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Startup Time Report
+
+Starts a fresh interpreter with `python -X importtime`, imports Status-Light and
+configures it from the environment (without polling anything), then reports how
+long that took, the peak RSS, and the slowest top-level imports. Only the selected
+sources and target should appear; an SDK showing up for a source that isn't
+selected is a regression.
+
+    SOURCES=ics TARGET=virtual ICS_URL=https://example.com/a.ics \\
+        python benchmarks/startup_report.py
+    python benchmarks/startup_report.py --top 20 --json
+"""
+
+# Standard imports
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'status-light')
+
+# Run in the child interpreter; prints its own timings and RSS as JSON on stdout
+CHILD_CODE = '''
+import importlib.util, json, resource, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {source_dir!r})
+spec = importlib.util.spec_from_file_location('status_light', {main!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+configured = module.StatusLight().configure()
+done = time.perf_counter()
+print(json.dumps({{'configured': configured,
+                  'import_s': imported - start,
+                  'configure_s': done - imported,
+                  'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+'''
+
+# Used when the environment doesn't select anything; the cheapest configuration
+DEFAULT_ENVIRON = {
+    'SOURCES': 'ics',
+    'TARGET': 'virtual',
+    'ICS_URL': 'https://example.com/calendar.ics'
+}
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """Parses `-X importtime` output into (module, self_us, cumulative_us, depth) tuples."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def main():
+    """Runs the report and prints it."""
+    parser = argparse.ArgumentParser(
+        description='Reports Status-Light\'s startup time, peak RSS and slowest imports.')
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of slowest top-level imports to list (default: 10)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    environ = dict(os.environ)
+    if 'SOURCES' not in environ:
+        environ.update(DEFAULT_ENVIRON)
+    environ.setdefault('LOGLEVEL', 'WARNING')
+
+    code = CHILD_CODE.format(source_dir=SOURCE_DIR,
+                             main=os.path.join(SOURCE_DIR, 'status-light.py'))
+    child = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=environ,
+                           cwd=SOURCE_DIR, capture_output=True, text=True, check=False)
+    if child.returncode != 0 or not child.stdout.strip():
+        sys.exit(f'Status-Light failed to start:\n{child.stderr[-2000:]}')
+    timings = json.loads(child.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(child.stderr)
+
+    # Top-level imports of Status-Light's own modules account for everything below them
+    top_level = sorted((entry for entry in imports if entry[3] == 0),
+                       key=lambda entry: -entry[2])
+    report = {
+        'sources': environ['SOURCES'],
+        'target': environ.get('TARGET', 'tuya'),
+        'configured': timings['configured'],
+        'import_ms': round(timings['import_s'] * 1000, 1),
+        'configure_ms': round(timings['configure_s'] * 1000, 1),
+        'import_time_total_ms': round(sum(entry[1] for entry in imports) / 1000, 1),
+        'modules_imported': len(imports),
+        'peak_rss_mb': round(timings['peak_rss_kb'] / 1024, 1),
+        'slowest_imports_ms': {name: round(cumulative / 1000, 1)
+                               for name, _, cumulative, _ in top_level[:args.top]}
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    width = max(len(key) for key in report)
+    for key, value in report.items():
+        if isinstance(value, dict):
+            print(key)
+            for name, milliseconds in value.items():
+                print(f'  {name.ljust(width)}  {milliseconds}')
+        else:
+            print(f'{key.ljust(width)}  {value}')
+
+
+if __name__ == '__main__':
+    main()
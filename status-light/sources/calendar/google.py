@@ -9,101 +9,199 @@ Google Calendar Source
 # https://github.com/portableprogrammer/Status-Light/
 
 # Standard imports
+import bisect
 import os.path
 from datetime import datetime
 from datetime import timedelta
+from datetime import timezone
 import logging
+import tempfile
+import time
+import uuid
 
 # 3rd-party imports
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 # Project imports
 from utility import enum
+from utility import util
 
 logger = logging.getLogger(__name__)
 
+# How long before the access token expires to refresh it; google-auth would otherwise
+# refresh it itself, a little later, without saving it
+TOKEN_REFRESH_MARGIN: timedelta = timedelta(minutes=5)
+# One freebusy query covers at most this many calendars
+MAX_CALENDARS: int = 50
+# In `sync` mode, with several events at once, the status is the first of these any of
+# them has, as for ICS calendars
+SYNC_STATUS_ORDER: tuple[enum.Status, ...] = (
+    enum.Status.BUSY, enum.Status.OUTOFOFFICE, enum.Status.WORKINGELSEWHERE,
+    enum.Status.TENTATIVE)
+# How far back the first sync of a calendar starts, to include events already under way
+SYNC_PAST: timedelta = timedelta(days=1)
+# How long before a push channel expires to open a new one
+CHANNEL_RENEW_MARGIN: timedelta = timedelta(hours=1)
+# How long to wait before trying to open push channels again, after failing to
+CHANNEL_RETRY_SECONDS: int = 300
+
 
 class GoogleCalendarAPI:
-    """Handles Google Calendar Free/Busy"""
+    """Handles Google Calendar Free/Busy, or, in `sync` mode, a synced copy of the
+    calendars' events"""
 
     credentialStore = '~'
     tokenStore = '~'
+    # The Google APIs, which only need changing to point at a stand-in server
+    apiUrl = 'https://www.googleapis.com/'
 
     # 81 - Make calendar lookahead configurable
     lookahead: int
 
+    # How many minutes past now to query for the next status transition
+    transitionHorizon: int = 60
+    _next_transition: datetime | None = None
+
+    # The calendars whose busy times are combined
+    calendarIds: list[str] = ['primary']
+    # How many minutes of busy times to fetch at once, and how long to keep them for
+    cacheWindow: int = 480
+    cacheLifetime: int = 15
+    # The fetched busy times of every calendar, merged, as sorted (start, end) intervals
+    # that don't overlap, so their ends are sorted too
+    _intervals: list[tuple[datetime, datetime]] = []
+    _ends: list[datetime] = []
+    _window_end: datetime | None = None
+    _fetch_time: datetime | None = None
+
+    # `freebusy` queries busy times; `sync` keeps a local copy of the calendars' events
+    mode: str = 'freebusy'
+    # Where Google sends push notifications (Status-Light's `/google` endpoint), and the
+    # token they carry; in `sync` mode, calendars are only watched if both are set
+    webhookUrl: str = ''
+    webhookToken: str = ''
+    # In `sync` mode, each calendar's events, as (start, end, status) by event ID, and the
+    # token to sync its changes with
+    _events: dict[str, dict[str, tuple[datetime, datetime, enum.Status]]] | None = None
+    _sync_tokens: dict[str, str] | None = None
+    # Every calendar's events, sorted by start
+    _event_intervals: list[tuple[datetime, datetime, enum.Status]] = []
+    _event_starts: list[datetime] = []
+    # Each calendar's push channel, as (channel ID, resource ID, expiration)
+    _channels: dict[str, tuple[str, str, datetime]] | None = None
+    _channel_retry_time: float = 0.0
+
     CREDENTIALS_FILENAME = 'client_secret.json'
 
     # If modifying these scopes, delete the file token.json.
     SCOPES = ['https://www.googleapis.com/auth/calendar.freebusy']
+    # Needed, as well, in `sync` mode
+    SYNC_SCOPES = ['https://www.googleapis.com/auth/calendar.events.readonly']
+
+    # The credentials and service, built once; and the access token last saved
+    _creds: Credentials | None = None
+    _service = None
+    _service_url: str = ''
+    # The service's resources (e.g. `events`), by name; each call to e.g.
+    # `service.events()` builds a new one
+    _resources: dict | None = None
+    _saved_token: str | None = None
 
     def authenticate(self):
-        """Authenticates the user against the Google Calendar API.
+        """Authenticates the user against the Google Calendar API, once; later calls
+        only refresh the access token, when it's about to expire.
 
         Returns the authenticated credentials."""
+        if self._creds is not None:
+            self._refresh_token_ahead()
+            return self._creds
         # The file token.json stores the user's access and refresh tokens, and is
         # created automatically when the authorization flow completes for the first
         # time.
         creds = None
-        norm_token_path = os.path.normpath(self.tokenStore + '/token.json')
+        norm_token_path = self._get_token_path()
         norm_cred_path = os.path.normpath(
             self.credentialStore + '/' + self.CREDENTIALS_FILENAME)
         if os.path.exists(norm_token_path):
             creds = Credentials.from_authorized_user_file(
-                norm_token_path, self.SCOPES)
+                norm_token_path, self._get_scopes())
+            self._saved_token = creds.token
         # If there are no (valid) credentials available, let the user log in.
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(Request())
             else:
                 flow = InstalledAppFlow.from_client_secrets_file(
-                    norm_cred_path, self.SCOPES)
+                    norm_cred_path, self._get_scopes())
                 creds = flow.run_local_server(port=0)
-            # Save the credentials for the next run
-            # Per the docs, encoding should only be used in 'text' mode, which we are not.
-            with open(norm_token_path, 'w') as token: # pylint: disable=unspecified-encoding
-                token.write(creds.to_json())
+        self._creds = creds
+        self._refresh_token_ahead()
         return creds
 
     def get_calendar_service(self):
-        """Builds the Google Calendar service object.
+        """Builds the Google Calendar service object, once (again only if `apiUrl`
+        changes), since building it parses the whole discovery document.
 
         Returns the Calendar service object."""
         creds = self.authenticate()
 
-        # 79 - Turn off cache_discovery, it's not supported with newer OAuth2 clients.
-        service = build('calendar', 'v3', credentials=creds, cache_discovery=False)
-        return service
+        if self._service is None or self._service_url != self.apiUrl:
+            # 79 - Turn off cache_discovery, it's not supported with newer OAuth2 clients.
+            self._service = build('calendar', 'v3', credentials=creds, cache_discovery=False,
+                                  client_options={'api_endpoint': self.apiUrl})
+            self._service_url = self.apiUrl
+            self._resources = {}
+        return self._service
+
+    def get_resource(self, name: str):
+        """Returns the Calendar service's `name` resource (e.g. `events`), building it
+        once."""
+        service = self.get_calendar_service()
+        if name not in self._resources:  # type: ignore
+            self._resources[name] = getattr(service, name)()  # type: ignore
+        return self._resources[name]  # type: ignore
+
+    def get_next_transition(self) -> datetime | None:
+        """Returns the next time the status returned by `get_current_status` could change,
+        as of the last call to it, or None if no transition is known."""
+        return self._next_transition
 
     def get_current_status(self):
         """Connects to the Google Calendar API to retrieve the user's free/busy
         status within the lookahead period.
 
+        The busy times of every calendar in `calendarIds` are fetched for `cacheWindow`
+        minutes at a time, and each status is worked out from them locally, until they are
+        `cacheLifetime` minutes old or the lookahead runs past their end.
+
+        Also records the next status transition; see `get_next_transition`.
+
         Returns the status returned from Google, or 'unknown' if an error occurs."""
+        self._next_transition = None
         try:
-            service = self.get_calendar_service()
-            now = datetime.utcnow().isoformat() + 'Z'
-            now_plus_lookahead = (datetime.utcnow() +
-                        timedelta(minutes=self.lookahead)).isoformat() + 'Z'
-            query = {
-                "timeMin": now,
-                "timeMax": now_plus_lookahead,
-                "items": [
-                    {
-                        "id": "primary"
-                    }
-                ]
-            }
+            now = datetime.now(timezone.utc)
+            if self.mode == 'sync':
+                return self._get_synced_status(now)
+            # Fetch far enough ahead to know when the status will next change
+            horizon = now + timedelta(minutes=max(self.lookahead, self.transitionHorizon))
+            if self._window_end is None or self._fetch_time is None or \
+                    horizon > self._window_end or \
+                    now - self._fetch_time >= timedelta(minutes=self.cacheLifetime):
+                self._fetch_intervals(now)
 
-            # The Resource type is fully dynamic, so don't listen to PyLint
-            freebusy_result = service.freebusy().query(body=query).execute() # pylint: disable=no-member
-            logger.debug('Got Free/Busy Result: %s', freebusy_result)
-            freebusy = freebusy_result['calendars']['primary']['busy']
-            if freebusy and len(freebusy) > 0:
-                logger.debug('Found Busy Result: %s', freebusy)
+            # Busy periods are clipped to the end of the window, so ignore any edge there
+            self._next_transition = util.get_next_transition(self._intervals, self.lookahead,
+                                                             now, self._window_end)
+
+            # The first interval ending after now is the only one that can be current
+            now_plus_lookahead = now + timedelta(minutes=self.lookahead)
+            index = bisect.bisect_right(self._ends, now)
+            if index < len(self._intervals) and self._intervals[index][0] < now_plus_lookahead:
+                logger.debug('Found Busy Result: %s', self._intervals[index])
                 return enum.Status.BUSY
             else:
                 logger.debug('No Free/Busy Result, assuming Free')
@@ -114,3 +212,284 @@ class GoogleCalendarAPI:
             logger.warning('Exception while getting Google status: %s', ex)
             logger.exception(ex)
             return enum.Status.UNKNOWN
+
+    def _fetch_intervals(self, now: datetime):
+        """Internal Helper Method to fetch the busy times of every calendar from `now` until
+        `cacheWindow` minutes later, with one freebusy query (per `MAX_CALENDARS`
+        calendars), and merge them.
+
+        Raises if none of the calendars could be queried."""
+        freebusy = self.get_resource('freebusy')
+        window_end = now + timedelta(minutes=self.cacheWindow)
+        busy_intervals = []
+        queried = 0
+        for start in range(0, len(self.calendarIds), MAX_CALENDARS):
+            query = {
+                "timeMin": now.isoformat(),
+                "timeMax": window_end.isoformat(),
+                "items": [{"id": calendar_id} for calendar_id
+                          in self.calendarIds[start:start + MAX_CALENDARS]]
+            }
+            # The Resource type is fully dynamic, so don't listen to PyLint
+            freebusy_result = freebusy.query(body=query).execute()
+            logger.debug('Got Free/Busy Result: %s', freebusy_result)
+            for calendar_id, calendar in freebusy_result.get('calendars', {}).items():
+                # e.g. a calendar that doesn't exist, or that the user can't see
+                if calendar.get('errors'):
+                    logger.warning('Unable to get the busy times of Google calendar %s: %s',
+                                   calendar_id, calendar['errors'])
+                    continue
+                queried += 1
+                busy_intervals.extend((datetime.fromisoformat(busy['start']),
+                                       datetime.fromisoformat(busy['end']))
+                                      for busy in calendar.get('busy', []))
+        self._save_token()
+        if queried == 0:
+            raise RuntimeError('Unable to get the busy times of any Google calendar')
+
+        # Merge overlapping (and adjoining) intervals
+        merged: list[tuple[datetime, datetime]] = []
+        for busy_start, busy_end in sorted(busy_intervals):
+            if merged and busy_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], busy_end))
+            else:
+                merged.append((busy_start, busy_end))
+        self._intervals = merged
+        self._ends = [busy_end for _, busy_end in merged]
+        self._window_end = window_end
+        self._fetch_time = now
+        logger.debug('Fetched %d busy interval(s) from %d calendar(s) until %s',
+                     len(merged), queried, window_end)
+
+    def close(self):
+        """Stops watching the calendars, if watched, so Google stops sending
+        notifications."""
+        if self._channels:
+            for channel in self._channels.values():
+                self._stop_channel(channel)
+            self._channels = {}
+
+    def _get_synced_status(self, now: datetime) -> enum.Status:
+        """Internal Helper Method to sync the calendars' changes, and work out the status
+        within the lookahead period from their events.
+
+        Also records the next status transition; see `get_next_transition`."""
+        self._sync(now)
+        self._watch(now)
+
+        # The events are the whole of each event, so there's no horizon to ignore
+        self._next_transition = util.get_next_transition(
+            [(start, end) for start, end, _ in self._event_intervals], self.lookahead, now)
+
+        # Only events starting before the lookahead period ends can overlap it
+        now_plus_lookahead = now + timedelta(minutes=self.lookahead)
+        statuses = {status for start, end, status
+                    in self._event_intervals[:bisect.bisect_left(self._event_starts,
+                                                                 now_plus_lookahead)]
+                    if end > now}
+        for status in SYNC_STATUS_ORDER:
+            if status in statuses:
+                logger.debug('Found %s event(s)', status.name.lower())
+                return status
+        logger.debug('No events, assuming Free')
+        return enum.Status.FREE
+
+    def _sync(self, now: datetime):
+        """Internal Helper Method to bring the local copy of every calendar's events up to
+        date: all of them, the first time, and only what changed since, after that.
+
+        A calendar that can't be synced is logged and skipped, keeping the events it had;
+        raises if none of them can be."""
+        events_api = self.get_resource('events')
+        if self._events is None or self._sync_tokens is None:
+            self._events, self._sync_tokens = {}, {}
+        changed = False
+        synced = 0
+        for calendar_id in self.calendarIds:
+            try:
+                try:
+                    changed |= self._sync_calendar(events_api, calendar_id, now)
+                except HttpError as ex:
+                    if ex.resp.status != 410:
+                        raise
+                    # The sync token has expired, so start again
+                    logger.info('Google calendar %s needs a full sync', calendar_id)
+                    self._sync_tokens.pop(calendar_id, None)
+                    changed |= self._sync_calendar(events_api, calendar_id, now)
+                synced += 1
+            except HttpError as ex:
+                logger.warning('Unable to sync Google calendar %s: %s', calendar_id, ex)
+        self._save_token()
+        if synced == 0:
+            raise RuntimeError('Unable to sync any Google calendar')
+
+        if changed:
+            # Events that are over no longer matter
+            for events in self._events.values():
+                for event_id in [event_id for event_id, (_, end, _) in events.items()
+                                 if end <= now]:
+                    del events[event_id]
+            self._event_intervals = sorted(interval for events in self._events.values()
+                                           for interval in events.values())
+            self._event_starts = [start for start, _, _ in self._event_intervals]
+            logger.debug('Synced %d event(s) from %d calendar(s)',
+                         len(self._event_intervals), synced)
+
+    def _sync_calendar(self, events_api, calendar_id: str, now: datetime) -> bool:
+        """Internal Helper Method to sync one calendar's events, and return whether any
+        changed."""
+        events = self._events.setdefault(calendar_id, {})  # type: ignore
+        sync_token = self._sync_tokens.get(calendar_id)  # type: ignore
+        # Recurring events are synced as their instances, so each has its own times
+        query = {'calendarId': calendar_id, 'singleEvents': True, 'maxResults': 2500}
+        if sync_token is None:
+            events.clear()
+            query['timeMin'] = (now - SYNC_PAST).isoformat()
+        else:
+            query['syncToken'] = sync_token
+        changed = sync_token is None
+        while True:
+            result = events_api.list(**query).execute()
+            for event in result.get('items', []):
+                changed = True
+                status = self._get_event_status(event)
+                if status is enum.Status.FREE:
+                    events.pop(event['id'], None)
+                else:
+                    events[event['id']] = (self._get_event_time(event['start']),
+                                           self._get_event_time(event['end']), status)
+            if 'nextPageToken' not in result:
+                break
+            query['pageToken'] = result['nextPageToken']
+        self._sync_tokens[calendar_id] = result['nextSyncToken']  # type: ignore
+        return changed
+
+    def _get_event_status(self, event: dict) -> enum.Status:
+        """Internal Helper Method to determine the Status-Light status for a single Google
+        Calendar event.
+
+        - `status` of `cancelled` → FREE (the event was cancelled, or deleted)
+        - `transparency` of `transparent` → FREE (the event doesn't block time)
+        - `eventType` of `outOfOffice` → OUTOFOFFICE
+        - `eventType` of `workingLocation` → FREE (it only says where you're working)
+        - The user's own `responseStatus` of `declined` → FREE
+        - The user's own `responseStatus` of `tentative` → TENTATIVE
+        - `status` of `tentative` → TENTATIVE
+        - Anything else → BUSY
+        """
+        if event.get('status') == 'cancelled' or event.get('transparency') == 'transparent':
+            return enum.Status.FREE
+        match event.get('eventType'):
+            case 'outOfOffice':
+                return enum.Status.OUTOFOFFICE
+            case 'workingLocation':
+                return enum.Status.FREE
+        for attendee in event.get('attendees', []):
+            if attendee.get('self'):
+                match attendee.get('responseStatus'):
+                    case 'declined':
+                        return enum.Status.FREE
+                    case 'tentative':
+                        return enum.Status.TENTATIVE
+        if event.get('status') == 'tentative':
+            return enum.Status.TENTATIVE
+        return enum.Status.BUSY
+
+    def _get_event_time(self, value: dict) -> datetime:
+        """Internal Helper Method to parse an event's `start` or `end`; all-day events
+        start and end at local midnight."""
+        if 'dateTime' in value:
+            return datetime.fromisoformat(value['dateTime'])
+        return datetime.fromisoformat(value['date']).astimezone()
+
+    def _watch(self, now: datetime):
+        """Internal Helper Method to open a push channel for each calendar, if a webhook
+        is configured, and open a new one ahead of each one expiring."""
+        if '' in [self.webhookUrl, self.webhookToken] or \
+                time.monotonic() < self._channel_retry_time:
+            return
+        if self._channels is None:
+            self._channels = {}
+        for calendar_id in self.calendarIds:
+            channel = self._channels.get(calendar_id)
+            if channel is not None and channel[2] - now > CHANNEL_RENEW_MARGIN:
+                continue
+            try:
+                channel_id = uuid.uuid4().hex
+                result = self.get_resource('events').watch(
+                    calendarId=calendar_id,
+                    body={'id': channel_id, 'type': 'web_hook', 'address': self.webhookUrl,
+                          'token': self.webhookToken}).execute()
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.warning('Exception while watching Google calendar %s: %s',
+                               calendar_id, ex)
+                logger.exception(ex)
+                self._channel_retry_time = time.monotonic() + CHANNEL_RETRY_SECONDS
+                return
+            expiration = datetime.fromtimestamp(int(result['expiration']) / 1000, timezone.utc)
+            self._channels[calendar_id] = (channel_id, result['resourceId'], expiration)
+            logger.info('Watching Google calendar %s until %s', calendar_id, expiration)
+            # Only stop the old channel once the new one is open, so nothing is missed
+            if channel is not None:
+                self._stop_channel(channel)
+
+    def _stop_channel(self, channel: tuple[str, str, datetime]):
+        """Internal Helper Method to stop a push channel."""
+        try:
+            self.get_resource('channels').stop(
+                body={'id': channel[0], 'resourceId': channel[1]}).execute()
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Exception while stopping a Google push channel: %s', ex)
+            logger.exception(ex)
+
+    def _get_scopes(self) -> list[str]:
+        """Internal Helper Method to get the scopes the credentials need."""
+        if self.mode == 'sync':
+            return self.SCOPES + self.SYNC_SCOPES
+        return self.SCOPES
+
+    def _get_token_path(self) -> str:
+        """Internal Helper Method to get the path to token.json."""
+        return os.path.normpath(self.tokenStore + '/token.json')
+
+    def _refresh_token_ahead(self):
+        """Internal Helper Method to refresh the access token if it's about to expire,
+        and save it if it has changed."""
+        creds = self._creds
+        if creds is None:
+            return
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        if creds.refresh_token and creds.expiry is not None and \
+                creds.expiry - now < TOKEN_REFRESH_MARGIN:
+            logger.debug('Refreshing the Google access token')
+            creds.refresh(Request())
+        self._save_token()
+
+    def _save_token(self):
+        """Internal Helper Method to atomically save the credentials to token.json, if the
+        access token has changed since they were last saved.
+
+        The credentials are written to a temporary file in the same directory, and
+        renamed over token.json, so a crash mid-write never leaves a torn token."""
+        creds = self._creds
+        if creds is None or creds.token == self._saved_token:
+            return
+        path = self._get_token_path()
+        temp_path = None
+        try:
+            directory = os.path.dirname(path) or '.'
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory,
+                                             prefix='token.json.', suffix='.tmp',
+                                             delete=False) as temp_file:
+                temp_path = temp_file.name
+                temp_file.write(creds.to_json())
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_path, path)
+            self._saved_token = creds.token
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Exception while saving the Google token: %s', ex)
+            logger.exception(ex)
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
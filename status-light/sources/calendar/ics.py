@@ -6,9 +6,13 @@ ICS Calendar Source
 """
 
 # Standard imports
+import bisect
 import os
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+import hashlib
+import json
 import logging
+import tempfile
 import urllib.request
 
 # 3rd-party imports
@@ -17,9 +21,17 @@ import recurring_ical_events
 
 # Project imports
 from utility import enum
+from utility import transport
+from utility import util
+from utility.clock import Clock, REAL_CLOCK
 
 logger = logging.getLogger(__name__)
 
+# With several events at once, the status is the first of these any of them has
+STATUS_ORDER: tuple[enum.Status, ...] = (
+    enum.Status.BUSY, enum.Status.OUTOFOFFICE, enum.Status.WORKINGELSEWHERE,
+    enum.Status.TENTATIVE)
+
 
 class Ics:
     """Handles ICS Calendar"""
@@ -33,8 +45,29 @@ class Ics:
     # 81 - Make calendar lookahead configurable
     lookahead: int = 5
 
-    # Cached calendar object
+    # How many minutes past now to search for the next status transition
+    transitionHorizon: int = 60
+
+    # How many minutes past now each expansion of the feed's recurring events covers
+    indexHorizon: int = 2880
+
+    # Tells the time for the lookahead window; replays use a simulated clock
+    clock: Clock = REAL_CLOCK
+
+    # Cached calendar object, and the SHA-256 of the file it was parsed from
     _calendar: icalendar.Calendar | None = None
+    _calendar_hash: str | None = None
+    _next_transition: datetime | None = None
+
+    # The occurrences of every event that isn't free, from `_index_start` to `_index_end`,
+    # as (start, end, status), sorted by start
+    _occurrences: list[tuple[datetime, datetime, enum.Status]] = []
+    _occurrence_starts: list[datetime] = []
+    # The longest occurrence, which bounds how long ago one still under way can have started
+    _longest: timedelta = timedelta(0)
+    _index_start: datetime | None = None
+    _index_end: datetime | None = None
+    _index_tz = None
 
     def _get_cache_path(self) -> str:
         """Returns the full path to the cache file."""
@@ -58,7 +91,7 @@ class Ics:
         try:
             file_mtime = datetime.fromtimestamp(
                 os.stat(cache_path).st_mtime, tz=timezone.utc)
-            cache_expiry = datetime.now(timezone.utc) - timedelta(minutes=self.cacheLifetime)
+            cache_expiry = self.clock.now(timezone.utc) - timedelta(minutes=self.cacheLifetime)
 
             if file_mtime < cache_expiry:
                 logger.debug('Cache file is stale (mtime: %s, expiry: %s)',
@@ -71,9 +104,70 @@ class Ics:
             logger.warning('Error checking cache file: %s', ex)
             return True
 
+    def _get_validators_path(self) -> str:
+        """Returns the full path to the file next to the cache that records its ETag,
+        Last-Modified date and SHA-256."""
+        return self._get_cache_path() + '.json'
+
+    def _load_validators(self) -> dict[str, str]:
+        """Loads the cache's ETag, Last-Modified date and SHA-256, if recorded.
+
+        Returns an empty dictionary if there are none, or they can't be read."""
+        validators_path = self._get_validators_path()
+        if not os.path.exists(validators_path):
+            return {}
+        try:
+            with open(validators_path, 'rb') as validators_file:
+                validators = json.load(validators_file)
+            return validators if isinstance(validators, dict) else {}
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Error loading the ICS cache validators: %s', ex)
+            return {}
+
+    def _save_validators(self, validators: dict[str, str]):
+        """Records the cache's ETag, Last-Modified date and SHA-256 next to it.
+
+        A missing file only costs one unconditional download and parse."""
+        try:
+            self._write_atomically(self._get_validators_path(),
+                                   json.dumps(validators).encode('utf-8'))
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Error saving the ICS cache validators: %s', ex)
+
+    def _write_atomically(self, path: str, content: bytes):
+        """Internal Helper Method to write `content` to `path` through a temporary file in
+        the same directory, renamed over `path`, so that a reader (e.g. another fleet
+        profile's source with the same URL) never sees a torn file.
+
+        Raises on error, after removing the temporary file."""
+        temp_path = None
+        try:
+            with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(path) or '.',
+                                             prefix=os.path.basename(path) + '.',
+                                             suffix='.tmp', delete=False) as temp_file:
+                temp_path = temp_file.name
+                temp_file.write(content)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _touch_cache(self, cache_path: str):
+        """Internal Helper Method to date the cache file at the source clock's time, which
+        its age is measured against."""
+        fetched_at = self.clock.now(timezone.utc).timestamp()
+        os.utime(cache_path, (fetched_at, fetched_at))
+
     def _fetch_and_cache(self) -> bool:
         """Downloads the ICS file and saves it to the cache.
 
+        Over HTTP(S), the download is conditional on the cache's ETag and Last-Modified
+        date; if the server answers 304 Not Modified, or sends the same bytes again, the
+        cache is only touched, and the calendar isn't parsed again.
+
         Returns True on success, False on failure."""
         cache_path = self._get_cache_path()
 
@@ -85,18 +179,47 @@ class Ics:
             if cache_dir and not os.path.exists(cache_dir):
                 os.makedirs(cache_dir)
 
-            # Download the ICS file
-            with urllib.request.urlopen(self.url, timeout=30) as response:
-                ics_content = response.read()
-
-            # Write to cache file
-            with open(cache_path, 'wb') as cache_file:
-                cache_file.write(ics_content)
-
-            # Invalidate cached calendar object
-            self._calendar = None
-
-            logger.debug('Successfully cached ICS file to: %s', cache_path)
+            cache_exists = os.path.exists(cache_path)
+            validators = self._load_validators() if cache_exists else {}
+
+            # Download the ICS file, over the shared connection pools unless it's local
+            if self.url.lower().startswith(('http://', 'https://')):
+                # `requests` already accepts gzip, and brotli through the `brotli` package
+                headers = {}
+                if validators.get('etag'):
+                    headers['If-None-Match'] = validators['etag']
+                if validators.get('last_modified'):
+                    headers['If-Modified-Since'] = validators['last_modified']
+                response = transport.get_session().get(self.url, headers=headers)
+                if response.status_code == 304 and cache_exists:
+                    self._touch_cache(cache_path)
+                    logger.debug('ICS file not modified, touched cache: %s', cache_path)
+                    return True
+                response.raise_for_status()
+                ics_content = response.content
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+            else:
+                with urllib.request.urlopen(self.url, timeout=30) as response:
+                    ics_content = response.read()
+                etag = last_modified = None
+
+            content_hash = hashlib.sha256(ics_content).hexdigest()
+            if cache_exists and content_hash == validators.get('sha256'):
+                # The same bytes again, so there's nothing to write
+                self._touch_cache(cache_path)
+                logger.debug('ICS file unchanged, touched cache: %s', cache_path)
+            else:
+                # Write to cache file
+                self._write_atomically(cache_path, ics_content)
+                self._touch_cache(cache_path)
+                logger.debug('Successfully cached ICS file to: %s', cache_path)
+            self._save_validators({'etag': etag, 'last_modified': last_modified,
+                                   'sha256': content_hash})
+
+            # Invalidate cached calendar object, unless it was parsed from the same bytes
+            if content_hash != self._calendar_hash:
+                self._calendar = None
             return True
 
         except Exception as ex:  # pylint: disable=broad-except
@@ -114,12 +237,63 @@ class Ics:
         cache_path = self._get_cache_path()
         try:
             with open(cache_path, 'rb') as f:
-                self._calendar = icalendar.Calendar.from_ical(f.read())
+                ics_content = f.read()
+            self._calendar = icalendar.Calendar.from_ical(ics_content)
+            self._calendar_hash = hashlib.sha256(ics_content).hexdigest()
+            # The occurrences of the previous calendar no longer apply
+            self._index_end = None
             return self._calendar
         except Exception as ex:  # pylint: disable=broad-except
             logger.warning('Error loading ICS file: %s', ex)
             return None
 
+    def _get_event_times(self, event: icalendar.Event, local_tz) -> tuple[datetime, datetime]:
+        """Returns the timezone-aware start and end of a single iCal event.
+
+        All-day (date-only) and floating (naive) times are treated as local time."""
+        def to_datetime(value) -> datetime:
+            if not isinstance(value, datetime) and isinstance(value, date):
+                value = datetime.combine(value, datetime.min.time())
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=local_tz)
+            return value
+
+        start = to_datetime(event.get('DTSTART').dt)
+        dtend = event.get('DTEND')
+        end = to_datetime(dtend.dt) if dtend else start
+        return (start, end)
+
+    def _build_index(self, calendar: icalendar.Calendar, now: datetime, local_tz):
+        """Internal Helper Method to expand the calendar's events, once, into the sorted
+        occurrences of every event that isn't free from `now` until `indexHorizon` minutes
+        later (or as far as a poll searches, if that's further), each with its status, so
+        that polls only need to search them."""
+        index_end = now + timedelta(minutes=max(
+            self.indexHorizon, self.lookahead + max(self.lookahead, self.transitionHorizon)))
+        occurrences = []
+        for event in recurring_ical_events.of(calendar).between(now, index_end):
+            event_status = self._get_event_status(event)
+            if event_status == enum.Status.FREE:
+                continue
+            event_start, event_end = self._get_event_times(event, local_tz)
+            occurrences.append((event_start, event_end, event_status))
+        occurrences.sort(key=lambda occurrence: occurrence[0])
+
+        self._occurrences = occurrences
+        self._occurrence_starts = [event_start for event_start, _, _ in occurrences]
+        self._longest = max((event_end - event_start for event_start, event_end, _
+                             in occurrences), default=timedelta(0))
+        self._index_start = now
+        self._index_end = index_end
+        self._index_tz = local_tz
+        logger.debug('Indexed %d occurrence(s) between %s and %s', len(occurrences),
+                     now.strftime('%I:%M %p %Z'), index_end.strftime('%I:%M %p %Z'))
+
+    def get_next_transition(self) -> datetime | None:
+        """Returns the next time the status returned by `get_current_status` could change,
+        as of the last call to it, or None if no transition is known."""
+        return self._next_transition
+
     def _get_event_status(self, event: icalendar.Event) -> enum.Status:
         """Determines the Status-Light status for a single iCal event.
 
@@ -175,8 +349,8 @@ class Ics:
                 logger.debug('Event "%s" has CDO busystatus OOF, treating as OUTOFOFFICE', summary)
                 return enum.Status.OUTOFOFFICE
             elif busystatus_str in ('4', 'WORKINGELSEWHERE', 'WORKING-ELSEWHERE'):
-                logger.debug('Event "%s" has CDO busystatus WORKINGELSEWHERE, treating as WORKINGELSEWHERE',
-                           summary)
+                logger.debug('Event "%s" has CDO busystatus WORKINGELSEWHERE, '
+                             'treating as WORKINGELSEWHERE', summary)
                 return enum.Status.WORKINGELSEWHERE
             elif busystatus_str in ('2', 'BUSY'):
                 logger.debug('Event "%s" has CDO busystatus BUSY, treating as BUSY', summary)
@@ -198,7 +372,10 @@ class Ics:
         - Returns UNKNOWN on error
 
         Status precedence: BUSY > OUTOFOFFICE > WORKINGELSEWHERE > TENTATIVE > FREE
+
+        Also records the next status transition; see `get_next_transition`.
         """
+        self._next_transition = None
         try:
             # Refresh cache if needed
             if self._should_refresh_cache():
@@ -216,81 +393,54 @@ class Ics:
                 return enum.Status.UNKNOWN
 
             # Get events within the lookahead window using timezone-aware datetimes
-            # recurring-ical-events handles timezone conversion correctly
-            local_tz = datetime.now().astimezone().tzinfo
-            start_time = datetime.now(local_tz)
+            local_tz = self.clock.now().astimezone().tzinfo
+            start_time = self.clock.now(local_tz)
             end_time = start_time + timedelta(minutes=self.lookahead)
 
             logger.debug('Checking for events between %s and %s',
                         start_time.strftime('%I:%M %p %Z'),
                         end_time.strftime('%I:%M %p %Z'))
 
-            # Use recurring-ical-events to expand recurring events and filter by time
-            calendar_events = recurring_ical_events.of(calendar).between(start_time, end_time)
+            # Search past the lookahead window so we know when the status will next change;
+            # the window starts overlapping an event `lookahead` minutes before it starts, so
+            # events starting up to that long after the horizon count too
+            horizon_time = start_time + timedelta(minutes=max(self.lookahead,
+                                                              self.transitionHorizon))
+            search_end = horizon_time + timedelta(minutes=self.lookahead)
+
+            # Expanding recurring events walks the whole calendar, so it's only done once
+            # per refresh, or when the search passes the end of the last expansion
+            if self._index_end is None or search_end > self._index_end or \
+                    start_time < self._index_start or local_tz != self._index_tz:
+                self._build_index(calendar, start_time, local_tz)
+
+            # Only occurrences starting within the longest one's length of now can still be
+            # under way; zero-length ones count only until they start
+            first = bisect.bisect_left(self._occurrence_starts, start_time - self._longest)
+            last = bisect.bisect_left(self._occurrence_starts, search_end)
+            horizon_events = [(event_start, event_end, event_status)
+                              for event_start, event_end, event_status
+                              in self._occurrences[first:last]
+                              if event_end > start_time or
+                              start_time <= event_start == event_end]
+            self._next_transition = util.get_next_transition(
+                [(event_start, event_end) for event_start, event_end, _ in horizon_events],
+                self.lookahead, start_time, horizon=horizon_time)
+
+            statuses = set()
+            for event_start, event_end, event_status in horizon_events:
+                if event_start < end_time:
+                    logger.debug('Event: %s - %s, %s', event_start.strftime('%I:%M %p'),
+                                 event_end.strftime('%I:%M %p'), event_status.name.lower())
+                    statuses.add(event_status)
 
-            if not calendar_events:
-                logger.debug('No events in lookahead window')
-                return enum.Status.FREE
-
-            logger.debug('Found %d event(s) in lookahead window', len(calendar_events))
-
-            # Determine the "busiest" status from all events
             # Precedence: BUSY > OUTOFOFFICE > WORKINGELSEWHERE > TENTATIVE > FREE
-            has_outofoffice = False
-            has_workingelsewhere = False
-            has_tentative = False
-
-            for event in calendar_events:
-                dtstart = event.get('DTSTART')
-                dtend = event.get('DTEND')
-                summary = str(event.get('SUMMARY', 'Untitled'))
-                transp = str(event.get('TRANSP', 'OPAQUE'))
-                status = str(event.get('STATUS', ''))
-
-                # Convert to local timezone for logging
-                start_dt = dtstart.dt if dtstart else None
-                end_dt = dtend.dt if dtend else start_dt
-                if hasattr(start_dt, 'astimezone'):
-                    start_local = start_dt.astimezone(local_tz)
-                    end_local = end_dt.astimezone(local_tz) if hasattr(end_dt, 'astimezone') else end_dt
-                else:
-                    start_local = start_dt
-                    end_local = end_dt
-
-                logger.debug('Event: %s (%s - %s, transp=%s, status=%s)',
-                            summary,
-                            start_local.strftime('%I:%M %p') if start_local else '?',
-                            end_local.strftime('%I:%M %p') if end_local else '?',
-                            transp, status)
-
-                event_status = self._get_event_status(event)
-
-                if event_status == enum.Status.BUSY:
-                    # BUSY takes highest precedence, return immediately
-                    return enum.Status.BUSY
-
-                if event_status == enum.Status.OUTOFOFFICE:
-                    has_outofoffice = True
-
-                if event_status == enum.Status.WORKINGELSEWHERE:
-                    has_workingelsewhere = True
-
-                if event_status == enum.Status.TENTATIVE:
-                    has_tentative = True
-                # FREE events don't affect the result
-
-            # Return the highest precedence status found
-            # OUTOFOFFICE > WORKINGELSEWHERE > TENTATIVE > FREE
-            if has_outofoffice:
-                return enum.Status.OUTOFOFFICE
-
-            if has_workingelsewhere:
-                return enum.Status.WORKINGELSEWHERE
-
-            if has_tentative:
-                return enum.Status.TENTATIVE
+            for status in STATUS_ORDER:
+                if status in statuses:
+                    return status
 
-            # All events were transparent or cancelled
+            # No events, or only transparent or cancelled ones
+            logger.debug('No busy events in lookahead window')
             return enum.Status.FREE
 
         except (SystemExit, KeyboardInterrupt):
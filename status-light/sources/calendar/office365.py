@@ -6,66 +6,195 @@ Office 365 Source
 """
 
 # Standard imports
+import bisect
 from datetime import datetime
 from datetime import timedelta
 import logging
+import threading
 
 # 3rd-party imports
 from O365 import Account
 from O365 import FileSystemTokenBackend
+from O365.connection import MSGraphProtocol
+from O365.calendar import Schedule
 
 # Project imports
 from utility import enum
+from utility import util
 
 logger = logging.getLogger(__name__)
 
+# How long before the access token expires to refresh it, in the background
+TOKEN_REFRESH_MARGIN: timedelta = timedelta(minutes=5)
+# The statuses of schedule items, by their Graph `status`; anything else is free
+ITEM_STATUSES: dict[str, enum.Status] = {
+    'tentative': enum.Status.TENTATIVE, 'busy': enum.Status.BUSY,
+    'oof': enum.Status.OUTOFOFFICE, 'workingelsewhere': enum.Status.WORKINGELSEWHERE}
+# With overlapping schedule items, the status is the first of these any of them has
+STATUS_ORDER: tuple[enum.Status, ...] = (
+    enum.Status.OUTOFOFFICE, enum.Status.BUSY, enum.Status.TENTATIVE,
+    enum.Status.WORKINGELSEWHERE)
+
 
 class OfficeAPI:
     """Wraps the `O365.Account` class"""
     appID = ''
     appSecret = ''
     tokenStore = '~'
-    account: Account
+    # Microsoft Graph, which only needs changing to point at a stand-in server
+    graphUrl = 'https://graph.microsoft.com/'
+    account: Account | None = None
 
     # 81 - Make calendar lookahead configurable
     lookahead: int
 
+    # How many minutes past now to query for the next status transition
+    transitionHorizon: int = 60
+    _next_transition: datetime | None = None
+
+    # How many minutes of schedule to fetch at once, and how long to keep it for
+    cacheWindow: int = 480
+    cacheLifetime: int = 15
+    # The fetched schedule items, as (start, end, status), sorted by start
+    _intervals: list[tuple[datetime, datetime, enum.Status]] = []
+    _starts: list[datetime] = []
+    _window_end: datetime | None = None
+    _fetch_time: datetime | None = None
+
+    # The signed-in user's mailbox and Schedule, looked up once per sign-in
+    _mailbox: str = ''
+    _schedule: Schedule | None = None
+    # The Graph URL the account was built for
+    _account_url: str = ''
+    _refresh_thread: threading.Thread | None = None
+
     def authenticate(self):
-        """Authenticates against Office 365"""
-        token_backend = FileSystemTokenBackend(token_path=self.tokenStore,
-                                               token_filename='o365_token.txt')
-        self.account = Account((self.appID, self.appSecret),
-                               token_backend=token_backend)
+        """Authenticates against Office 365, once; later calls only sign in again if the
+        account no longer has a usable token"""
+        if self.account is None or self._account_url != self.graphUrl:
+            token_backend = FileSystemTokenBackend(token_path=self.tokenStore,
+                                                   token_filename='o365_token.txt')
+            protocol = MSGraphProtocol()
+            protocol.protocol_url = self.graphUrl
+            protocol.service_url = f'{self.graphUrl}{protocol.api_version}/'
+            self.account = Account((self.appID, self.appSecret),
+                                   token_backend=token_backend, protocol=protocol)
+            self._account_url = self.graphUrl
+            self._mailbox = ''
+            self._schedule = None
+            self._window_end = None
+        # Checks the token in memory, once it's been loaded
         if not self.account.is_authenticated:
             self.account.authenticate(scopes=['basic', 'calendar'])
+            self._mailbox = ''
+            self._schedule = None
 
-    def get_schedule(self):
+    def get_schedule(self) -> Schedule:
         """Retrieves the current Account's Schedule"""
         self.authenticate()
-        return self.account.schedule()
+        if self._schedule is None:
+            self._schedule = self.account.schedule()  # type: ignore
+        return self._schedule
 
     def get_calendar(self):
         """Retrieves the current Account's Calendar from their Schedule"""
+        return self.get_schedule().get_default_calendar()
+
+    def get_mailbox(self) -> str:
+        """Retrieves the current Account's mailbox address, looking it up once"""
         self.authenticate()
-        return self.account.schedule().get_default_calendar()
+        if self._mailbox == '':
+            user = self.account.get_current_user_data()  # type: ignore
+            if user is None:
+                raise RuntimeError('Unable to look up the signed-in Office 365 user')
+            self._mailbox = user.mail or user.user_principal_name
+            logger.debug('Checking the schedule of %s', self._mailbox)
+        return self._mailbox
+
+    def get_next_transition(self) -> datetime | None:
+        """Returns the next time the status returned by `get_current_status` could change,
+        as of the last call to it, or None if no transition is known."""
+        return self._next_transition
 
     def get_current_status(self):
-        """Retrieves the Office 365 status within the lookahead period"""
+        """Retrieves the Office 365 status within the lookahead period
+
+        The schedule is fetched for `cacheWindow` minutes at a time, and each status is
+        worked out from it locally, until it is `cacheLifetime` minutes old or the
+        lookahead runs past its end.
+
+        Also records the next status transition; see `get_next_transition`."""
+        self._next_transition = None
         try:
-            schedule = self.get_schedule()
-            schedules = [self.account.get_current_user().mail]  # type: ignore
-            availability = schedule.get_availability(schedules, datetime.now(),
-                                                     datetime.now() + timedelta(
-                                                            minutes=self.lookahead
-                                                        ),
-                                                     self.lookahead)
-            availability_view = availability[0]["availabilityView"][0]
-            logger.debug('Got availabilityView: %s', availability_view)
-
-            return enum.Status[availability_view.replace(' ', '').lower()]
+            now = datetime.now().astimezone()
+            # Fetch far enough ahead to know when the status will next change
+            horizon = now + timedelta(minutes=max(self.lookahead, self.transitionHorizon))
+            if self._window_end is None or self._fetch_time is None or \
+                    horizon > self._window_end or \
+                    now - self._fetch_time >= timedelta(minutes=self.cacheLifetime):
+                self._fetch_intervals(now)
+            else:
+                self._refresh_token_ahead()
+
+            # Only items starting before the lookahead period ends can overlap it
+            lookahead_end = now + timedelta(minutes=self.lookahead)
+            statuses = {status for start, end, status
+                        in self._intervals[:bisect.bisect_left(self._starts, lookahead_end)]
+                        if end > now}
+            self._next_transition = util.get_next_transition(
+                [(start, end) for start, end, _ in self._intervals], self.lookahead,
+                now, self._window_end)
+
+            for status in STATUS_ORDER:
+                if status in statuses:
+                    return status
+            return enum.Status.FREE
         except (SystemExit, KeyboardInterrupt):
             return enum.Status.UNKNOWN
         except Exception as ex:  # pylint: disable=broad-except
             logger.warning('Exception while getting Office 365 status: %s', ex)
             logger.exception(ex)
             return enum.Status.UNKNOWN
+
+    def _fetch_intervals(self, now: datetime):
+        """Internal Helper Method to fetch the schedule items from `now` until `cacheWindow`
+        minutes later, with one `getSchedule` request."""
+        schedule = self.get_schedule()
+        schedules = [self.get_mailbox()]
+        self._refresh_token_ahead()
+        window_end = now + timedelta(minutes=self.cacheWindow)
+        availability = schedule.get_availability(schedules, now, window_end, self.cacheWindow)
+        if len(availability) == 0:
+            raise RuntimeError('Unable to get the Office 365 schedule')
+        intervals = sorted(
+            (item['start'], item['end'], ITEM_STATUSES[item.get('status', '').casefold()])
+            for item in availability[0].get('scheduleItems', [])
+            if item.get('status', '').casefold() in ITEM_STATUSES)
+        self._intervals = intervals
+        self._starts = [start for start, _, _ in intervals]
+        self._window_end = window_end
+        self._fetch_time = now
+        logger.debug('Fetched %d schedule item(s) until %s', len(intervals), window_end)
+
+    def _refresh_token_ahead(self):
+        """Internal Helper Method to refresh the access token in the background, if it's
+        about to expire, so a poll doesn't have to wait for it (or fail first)."""
+        connection = self.account.con  # type: ignore
+        expiry = connection.token_backend.token_expiration_datetime(
+            username=connection.username)
+        if expiry is None or expiry - datetime.now() > TOKEN_REFRESH_MARGIN or \
+                (self._refresh_thread is not None and self._refresh_thread.is_alive()):
+            return
+        self._refresh_thread = threading.Thread(target=self._refresh_token,
+                                                name='status-light-o365-refresh',
+                                                daemon=True)
+        self._refresh_thread.start()
+
+    def _refresh_token(self):
+        """Internal Helper Method to refresh the access token."""
+        try:
+            logger.debug('Refreshing the Office 365 access token')
+            self.account.con.refresh_token()  # type: ignore
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Exception while refreshing the Office 365 token: %s', ex)
+            logger.exception(ex)
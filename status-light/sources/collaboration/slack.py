@@ -6,22 +6,60 @@ Slack Source
 """
 
 # Standard imports
+import http.client
+import io
 import logging
+import time
+import urllib.error
+import urllib.request
 
 # 3rd-Party imports
 from slack_sdk.web import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.socket_mode.builtin import SocketModeClient
+from slack_sdk.socket_mode.request import SocketModeRequest
+from slack_sdk.socket_mode.response import SocketModeResponse
 
 # Project imports
-from utility import enum
+from utility import enum, matcher, push, transport
 
 logger = logging.getLogger(__name__)
 
+# How long, in seconds, to wait before trying to connect to Socket Mode again
+SOCKET_RETRY_SECONDS: int = 60
+
+
+class PooledWebClient(WebClient):
+    """A `WebClient` that sends its requests through the shared connection pools.
+
+    The SDK opens a new connection (and TLS handshake) for every request with `urlopen`;
+    only that last step is replaced, so its retry handlers and error handling still
+    apply."""
+
+    def _perform_urllib_http_request_internal(self, url: str,
+                                              req: urllib.request.Request) -> dict:
+        response = transport.get_session().request(
+            req.get_method(), url, data=req.data, headers=dict(req.header_items()),
+            timeout=self.timeout)
+        headers = http.client.HTTPMessage()
+        for name, value in response.headers.items():
+            headers[name] = value
+        if response.status_code >= 400:
+            # As `urlopen` would, so the SDK handles it (e.g. a 429's Retry-After)
+            raise urllib.error.HTTPError(url, response.status_code, response.reason, headers,
+                                         io.BytesIO(response.content))
+        return {'status': response.status_code, 'headers': headers,
+                'body': response.content.decode(headers.get_content_charset() or 'utf-8')}
+
 
 class SlackAPI:
     """Wraps the `slack_sdk.web.WebClient` class"""
     user_id: str = ''
     bot_token: str = ''
+    # An app-level token (`xapp-...`) enables Socket Mode
+    app_token: str = ''
+    # The Slack Web API, which only needs changing to point at a stand-in server
+    base_url: str = 'https://slack.com/api/'
     # 66 - Support Slack custom statuses
     custom_available_status: list[str] = []
     custom_available_status_map: enum.Status = enum.Status.UNKNOWN
@@ -31,23 +69,43 @@ class SlackAPI:
     custom_scheduled_status_map: enum.Status = enum.Status.UNKNOWN
     custom_off_status: list[str] = []
     custom_off_status_map: enum.Status = enum.Status.UNKNOWN
+    # Which of the above win when several match, highest first
+    custom_status_priority: list[str] = list(matcher.CATEGORIES)
+    # The custom status and presence last seen, polled or pushed; None until then
+    _last_custom_status: enum.Status | None = None
+    _last_presence: enum.Status | None = None
+    # Socket Mode, and whether it was connected at the last poll
+    _socket_client: SocketModeClient | None = None
+    _socket_was_connected: bool = False
+    _socket_retry_time: float = 0.0
+    # The Web API client, kept for as long as the token and URL stay the same
+    _client: WebClient | None = None
+    # The custom status rules, compiled on first use
+    _matcher: matcher.StatusMatcher | None = None
 
     def get_user_presence(self) -> enum.Status:
-        """Retrieves the user presence info for the defined `user_id`"""
+        """Retrieves the user presence info for the defined `user_id`
+
+        With Socket Mode connected, `user_change` events keep the custom status up to
+        date, so it's only fetched when (re)connecting, in case events were missed."""
         client = self._get_client()
         response = None
         return_value = enum.Status.UNKNOWN
         try:
+            streaming = self._is_streaming()
             # 66: Support Slack custom statuses
-            return_value = self._parse_custom_status(client)
+            if streaming and self._socket_was_connected and \
+                    self._last_custom_status is not None:
+                return_value = self._last_custom_status
+            else:
+                return_value = self._parse_custom_status(client)
+                self._last_custom_status = return_value
+            self._socket_was_connected = streaming
 
             if return_value is enum.Status.UNKNOWN:
                 response = client.users_getPresence(user=self.user_id)
-                match response.data['presence']:  # type: ignore
-                    case "active":
-                        return_value = enum.Status.ACTIVE
-                    case "away":
-                        return_value = enum.Status.INACTIVE
+                return_value = self._parse_presence(response.data['presence'])  # type: ignore
+                self._last_presence = return_value
         except (SystemExit, KeyboardInterrupt):
             pass
         except SlackApiError as ex:
@@ -63,9 +121,92 @@ class SlackAPI:
 
         return return_value
 
+    def get_pushed_status(self, presence: str = '',
+                          user_profile: dict | None = None) -> enum.Status:
+        """Determines the user's status from a Slack event, without calling Slack.
+
+        `user_change` events carry the user's profile, with its custom status, and
+        `presence_change` events carry the presence; a matching custom status takes
+        precedence over the presence, as when polling. Returns UNKNOWN if the event
+        alone can't tell, e.g. a new presence before any custom status is known, in
+        which case the user should be polled."""
+        try:
+            if user_profile is not None:
+                self._last_custom_status = self._match_custom_status(user_profile)
+            if presence != '':
+                self._last_presence = self._parse_presence(presence)
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Exception while parsing a Slack event: %s', ex)
+            logger.exception(ex)
+            return enum.Status.UNKNOWN
+
+        if self._last_custom_status is None:
+            return enum.Status.UNKNOWN
+        if self._last_custom_status is enum.Status.UNKNOWN:
+            # Without a custom status the presence decides, and only a presence event
+            # is sure to have the current one
+            return self._last_presence or enum.Status.UNKNOWN if presence != '' \
+                else enum.Status.UNKNOWN
+        return self._last_custom_status
+
+    def close(self):
+        """Disconnects from Socket Mode, if connected."""
+        if self._socket_client is not None:
+            self._socket_client.close()
+            self._socket_client = None
+
+    def _is_streaming(self) -> bool:
+        """Internal Helper Method to connect to Socket Mode, if enabled and not already
+        connected, and return whether it's connected.
+
+        Dropped connections are reconnected by the client itself; failed connections are
+        retried every `SOCKET_RETRY_SECONDS`, and polled in the meantime."""
+        if self.app_token == '':
+            return False
+        if self._socket_client is not None and self._socket_client.is_connected():
+            return True
+        if time.monotonic() < self._socket_retry_time:
+            return False
+        self._socket_retry_time = time.monotonic() + SOCKET_RETRY_SECONDS
+        try:
+            if self._socket_client is None:
+                self._socket_client = SocketModeClient(
+                    app_token=self.app_token, logger=logger,
+                    web_client=PooledWebClient(token=self.app_token,
+                                               base_url=self.base_url))
+                self._socket_client.socket_mode_request_listeners.append(  # type: ignore
+                    self._on_socket_request)
+            self._socket_client.connect()
+            logger.info('Connected to Slack Socket Mode')
+            return self._socket_client.is_connected()
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Exception while connecting to Slack Socket Mode: %s', ex)
+            logger.exception(ex)
+            return False
+
+    def _on_socket_request(self, client: SocketModeClient, request: SocketModeRequest):
+        """Internal Helper Method to acknowledge a Socket Mode event, and push the user's
+        new status, if it's about them."""
+        client.send_socket_mode_response(SocketModeResponse(envelope_id=request.envelope_id))
+        if request.type != 'events_api':
+            return
+        for event in push.parse_slack(request.payload):
+            if self.user_id not in event.user_ids:
+                continue
+            status = self.get_pushed_status(event.presence, event.user_profile)
+            # An event that doesn't tell the status asks for a poll instead
+            event.status = None if status is enum.Status.UNKNOWN else status
+            # Polling a connected source is nearly free, and catches a dropped connection
+            event.replaces_polling = False
+            push.dispatch(event)
+
     def _get_client(self) -> WebClient:
-        """Internal Helper Method to build and return a Slack `WebClient` object."""
-        return WebClient(token=self.bot_token)
+        """Internal Helper Method to return a Slack `WebClient` object, building it if
+        needed."""
+        if self._client is None or self._client.token != self.bot_token or \
+                self._client.base_url != self.base_url:
+            self._client = PooledWebClient(token=self.bot_token, base_url=self.base_url)
+        return self._client
 
     def _get_user_info(self, client: WebClient) -> dict | None:
         """Internal Helper Method to retrieve user info for the class' defined `user_id`"""
@@ -74,7 +215,7 @@ class SlackAPI:
             response = client.users_info(user=self.user_id)
             return response.data['user']  # type: ignore
         except (SystemExit, KeyboardInterrupt):
-            pass
+            return None
         except SlackApiError as ex:
             logger.warning(
                 'Slack Exception while getting user info: %s', ex.response['error'])
@@ -97,42 +238,7 @@ class SlackAPI:
             if not user_info or not user_info['profile']:
                 return enum.Status.UNKNOWN
 
-            # Join the emoji and text with a space
-            custom_status: str = (user_info['profile']['status_emoji'] + ' '
-                                  + user_info['profile']['status_text']).casefold()
-
-            # For each of the Slack custom statuses, check them in reverse precedence order
-            # Off, Available, Scheduled, Busy
-            if len(self.custom_off_status) > 0 and \
-                    custom_status.startswith(tuple(self.custom_off_status)):
-                logger.debug(
-                    'Custom status matched custom_off_status: %s', custom_status)
-                return_value = self.custom_off_status_map
-
-            if len(self.custom_available_status) > 0 and \
-                    custom_status.startswith(tuple(self.custom_available_status)):
-                logger.debug(
-                    'Custom status matched custom_available_status: %s', custom_status)
-                return_value = self.custom_available_status_map
-
-            if len(self.custom_scheduled_status) > 0 and \
-                    custom_status.startswith(tuple(self.custom_scheduled_status)):
-                logger.debug(
-                    'Custom status matched custom_scheduled_status: %s', custom_status)
-                return_value = self.custom_scheduled_status_map
-
-            if len(self.custom_busy_status) > 0 and \
-                    custom_status.startswith(tuple(self.custom_busy_status)):
-                logger.debug(
-                    'Custom status matched custom_busy_status: %s', custom_status)
-                return_value = self.custom_busy_status_map
-
-            # Check for Huddle and Call
-            if user_info['profile']['huddle_state'] == 'in_a_huddle' or \
-                    user_info['profile']['status_emoji'] == ':slack_call:':
-                logger.debug('Custom status indicates Huddle (%s) or Call (%s)',
-                             user_info['profile']['huddle_state'], custom_status)
-                return_value = enum.Status.CALL
+            return_value = self._match_custom_status(user_info['profile'], default)
 
         except (SystemExit, KeyboardInterrupt):
             pass
@@ -148,3 +254,47 @@ class SlackAPI:
             return_value = enum.Status.UNKNOWN
 
         return return_value
+
+    def _match_custom_status(self, profile: dict,
+                             default: enum.Status = enum.Status.UNKNOWN) -> enum.Status:
+        """Internal Helper Method to match a user profile's custom status to a `Status` enum."""
+        return_value = default
+
+        # Join the emoji and text with a space, dropping it if either is empty
+        custom_status: str = (profile.get('status_emoji', '') + ' '
+                              + profile.get('status_text', '')).strip().casefold()
+
+        # Every rule is checked at once; the highest-priority match wins
+        matched = self._get_matcher().match(custom_status)
+        if matched is not None:
+            logger.debug('Custom status matched custom_%s_status: %s', matched[0],
+                         custom_status)
+            return_value = matched[1]
+
+        # Check for Huddle and Call
+        if profile.get('huddle_state') == 'in_a_huddle' or \
+                profile.get('status_emoji') == ':slack_call:':
+            logger.debug('Custom status indicates Huddle (%s) or Call (%s)',
+                         profile.get('huddle_state'), custom_status)
+            return_value = enum.Status.CALL
+
+        return return_value
+
+    def _get_matcher(self) -> matcher.StatusMatcher:
+        """Internal Helper Method to compile the custom status rules, if needed, and return
+        the matcher."""
+        if self._matcher is None:
+            self._matcher = matcher.compile_rules(tuple(
+                (category, getattr(self, f'custom_{category}_status_map'),
+                 tuple(getattr(self, f'custom_{category}_status')))
+                for category in self.custom_status_priority))
+        return self._matcher
+
+    def _parse_presence(self, presence: str) -> enum.Status:
+        """Internal Helper Method to parse a user's presence into a `Status` enum."""
+        match presence:
+            case "active":
+                return enum.Status.ACTIVE
+            case "away":
+                return enum.Status.INACTIVE
+        return enum.Status.UNKNOWN
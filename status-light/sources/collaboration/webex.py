@@ -7,28 +7,136 @@ Webex Teams Source
 
 # Standard imports
 import logging
+import threading
+import time
 
 # 3rd-Party imports
 from webexteamssdk import WebexTeamsAPI
+from webexteamssdk.exceptions import RateLimitError
 
 # Project imports
-from utility import enum
+from utility import enum, transport
 
 logger = logging.getLogger(__name__)
 
+# The `people` API lists at most this many people by ID per request
+MAX_BATCH_IDS: int = 85
+# Statuses fetched this recently are shared between polls, rather than fetched again
+BATCH_WINDOW_SECONDS: float = 2.0
+# People nobody has asked about for this long are no longer fetched
+WATCH_EXPIRY_SECONDS: int = 900
+# With several people, the status shown is the first of these that any of them has
+COMBINED_STATUS_ORDER: tuple[enum.Status, ...] = (
+    enum.Status.PRESENTING, enum.Status.CALL, enum.Status.MEETING,
+    enum.Status.DONOTDISTURB, enum.Status.PENDING, enum.Status.ACTIVE,
+    enum.Status.INACTIVE, enum.Status.OUTOFOFFICE)
+
+# Each bot's batch, by bot token and API URL
+_batches: dict[tuple[str, str], 'PeopleBatch'] = {}
+_batches_lock = threading.Lock()
+
+
+class PeopleBatch:
+    """Looks up the statuses of everyone watched with one bot, many people per request,
+    with one long-lived client.
+
+    Every lookup fetches everyone asked about recently, by any `WebexAPI` using the bot
+    (e.g. each fleet profile's), so polls made together share one request instead of
+    making one each. After a 429, nothing is fetched until its `Retry-After` has passed."""
+
+    def __init__(self, bot_id: str, base_url: str):
+        # Rate limits are honoured by skipping polls, rather than sleeping through them
+        self.api = WebexTeamsAPI(access_token=bot_id, base_url=base_url,
+                                 wait_on_rate_limit=False)
+        # Reuse the shared connection pools, rather than the SDK's own session's
+        transport.mount(self.api._session._req_session)  # pylint: disable=protected-access
+        # When each person was last asked about, and their status at the last fetch
+        self._watched: dict[str, float] = {}
+        self._statuses: dict[str, enum.Status] = {}
+        self._fetch_time: float | None = None
+        self._retry_time: float = 0.0
+        self._lock = threading.Lock()
+
+    def get_statuses(self, person_ids: list[str]) -> dict[str, enum.Status]:
+        """Returns the status of each of `person_ids`, fetching everyone's if the last
+        fetch is too old or didn't include them.
+
+        Statuses are UNKNOWN while rate limited; raises on any other error."""
+        with self._lock:
+            now = time.monotonic()
+            for person_id in person_ids:
+                self._watched[person_id] = now
+            if self._fetch_time is None or now - self._fetch_time > BATCH_WINDOW_SECONDS or \
+                    any(person_id not in self._statuses for person_id in person_ids):
+                if now < self._retry_time:
+                    logger.debug('Rate limited by Webex for another %.0fs',
+                                 self._retry_time - now)
+                    return dict.fromkeys(person_ids, enum.Status.UNKNOWN)
+                if not self._fetch(now):
+                    return dict.fromkeys(person_ids, enum.Status.UNKNOWN)
+            return {person_id: self._statuses.get(person_id, enum.Status.UNKNOWN)
+                    for person_id in person_ids}
+
+    def _fetch(self, now: float) -> bool:
+        """Internal Helper Method to fetch everyone's status, in as few requests as
+        possible, and forget people nobody has asked about lately.
+
+        Returns False if rate limited."""
+        for person_id, asked_time in list(self._watched.items()):
+            if now - asked_time > WATCH_EXPIRY_SECONDS:
+                del self._watched[person_id]
+        person_ids = sorted(self._watched)
+        # Anyone Webex doesn't return (e.g. an unknown ID) has an unknown status
+        statuses = dict.fromkeys(person_ids, enum.Status.UNKNOWN)
+        try:
+            for start in range(0, len(person_ids), MAX_BATCH_IDS):
+                batch = person_ids[start:start + MAX_BATCH_IDS]
+                for person in self.api.people.list(id=','.join(batch), max=len(batch)):
+                    statuses[person.id] = enum.Status.__members__.get(
+                        str(person.status).upper(), enum.Status.UNKNOWN)
+        except RateLimitError as ex:
+            self._retry_time = now + ex.retry_after
+            logger.warning('Rate limited by Webex, not polling for %ds', ex.retry_after)
+            return False
+        self._statuses = statuses
+        self._fetch_time = now
+        logger.debug('Fetched the Webex status of %d person(s) in %d request(s)',
+                     len(person_ids), -(-len(person_ids) // MAX_BATCH_IDS))
+        return True
+
+
+def get_batch(bot_id: str, base_url: str) -> PeopleBatch:
+    """Returns the batch for `bot_id` at `base_url`, creating it if needed."""
+    with _batches_lock:
+        key = (bot_id, base_url)
+        if key not in _batches:
+            _batches[key] = PeopleBatch(bot_id, base_url)
+        return _batches[key]
+
+
+def combine_statuses(statuses: list[enum.Status]) -> enum.Status:
+    """Returns the status shown for several people: the first in `COMBINED_STATUS_ORDER`
+    that any of them has, or UNKNOWN if none of them do."""
+    for status in COMBINED_STATUS_ORDER:
+        if status in statuses:
+            return status
+    return enum.Status.UNKNOWN
+
 
 class WebexAPI:
     """Wraps the `webexteamssdk.WebexTeamsAPI` class"""
     bot_id = ''
-    person_id: str = ''
+    # One or more people, whose statuses are combined
+    person_ids: list[str] = []
+    # The Webex API, which only needs changing to point at a stand-in server
+    base_url: str = 'https://webexapis.com/v1/'
 
     def get_person_status(self) -> enum.Status:
-        """Retrieves the Webex Teams status for the defined `person_id`"""
-        api = WebexTeamsAPI(access_token=self.bot_id)
+        """Retrieves the Webex Teams status for the defined `person_ids`, combined"""
         return_value = enum.Status.UNKNOWN
         try:
-            return_value = enum.Status[api.people.get(
-                self.person_id).status.lower()]
+            statuses = get_batch(self.bot_id, self.base_url).get_statuses(self.person_ids)
+            return_value = combine_statuses(list(statuses.values()))
         except (SystemExit, KeyboardInterrupt):
             pass
         except Exception as ex: # pylint: disable=broad-except
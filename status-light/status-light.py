@@ -10,157 +10,420 @@ Main Application Entry Point
 # pylint: disable=invalid-name
 
 # Standard imports
+from collections import deque
+from collections.abc import Mapping
+from concurrent import futures
+from datetime import timezone
+import hashlib
 import logging
+import os
 import signal
 import sys
+import threading
 import time
+from typing import TYPE_CHECKING
 
 # Project imports
-# 47 - Add Google support
-from sources.calendar import google, ics, office365
-# 48 - Add Slack support
-from sources.collaboration import slack, webex
-from targets import tuya, virtual
-from utility import enum, env, util, precedence
+from targets import base, replay
+from utility import breaker, clock, debounce, enum, env, fleet, metrics, trace, util, poller, \
+    decisions, precedence, push, registry, scheduler, snapshot
+
+# Sources and targets are only imported once selected, by `registry`
+if TYPE_CHECKING:
+    # 47 - Add Google support
+    from sources.calendar import google, ics, office365
+    # 48 - Add Slack support
+    from sources.collaboration import slack, webex
 
 
 class StatusLight:
     """Provides a structured entry point for the Status-Light application"""
     # Instance Logger
-    logger: logging.Logger = logging.getLogger('status-light')
+    logger: logging.Logger
 
     # Instance Properties
-    local_env = env.Environment()
+    profile: str
+    environ: Mapping[str, str] | None
+    local_env: env.Environment
     current_status: enum.Status = enum.Status.UNKNOWN
     last_status: enum.Status = current_status
     should_continue: bool = True
+    # Set to interrupt the wait between loop iterations, e.g. on a signal
+    wake_event: threading.Event
+    reload_requested: bool = False
+    # Tells the time; replays run on a simulated clock
+    status_clock: clock.Clock
 
     # Source Properties
-    webex_api: webex.WebexAPI = webex.WebexAPI()
-    slack_api: slack.SlackAPI = slack.SlackAPI()
-    office_api: office365.OfficeAPI = office365.OfficeAPI()
-    google_api: google.GoogleCalendarAPI = google.GoogleCalendarAPI()
-    ics_api: ics.Ics = ics.Ics()
+    SOURCE_ATTRIBUTES: dict[enum.StatusSource, str] = {
+        enum.StatusSource.WEBEX: 'webex_api',
+        enum.StatusSource.SLACK: 'slack_api',
+        enum.StatusSource.OFFICE365: 'office_api',
+        enum.StatusSource.GOOGLE: 'google_api',
+        enum.StatusSource.ICS: 'ics_api'
+    }
+    # Only the selected sources are created
+    webex_api: 'webex.WebexAPI | None' = None
+    slack_api: 'slack.SlackAPI | None' = None
+    office_api: 'office365.OfficeAPI | None' = None
+    google_api: 'google.GoogleCalendarAPI | None' = None
+    ics_api: 'ics.Ics | None' = None
 
     # Target Properties
-    light: tuya.TuyaLight | virtual.VirtualLight = tuya.TuyaLight()
+    light: base.LightTarget | None = None
+    # What the light was last successfully set to, e.g. `{'power': False}`
+    light_state: dict | None = None
+    # Set by `stop` to turn the light off on exit, even if `STATE_FILE` is set
+    force_turn_off: bool = False
+    # Set by `restore_snapshot` if the light still shows the restored status
+    light_restored: bool = False
 
-    def init(self):
-        """Initializes all class and environment variables."""
-        # Register for SIGHUP, SIGINT, SIGQUIT, SIGTERM
-        signals: list[signal.Signals] = [signal.SIGHUP,
-                                         signal.SIGINT,
-                                         signal.SIGQUIT,
-                                         signal.SIGTERM]
-        for sig in signals:
-            signal.signal(sig, receive_signal)
+    # The most recent decisions of the main loop, if kept
+    decision_log: decisions.DecisionLog | None = None
+
+    # Snapshot Properties
+    # The last snapshot saved, without its timestamps, and when it was saved
+    last_snapshot: dict | None = None
+    last_snapshot_time: float = 0.0
+
+    # Trace Properties
+    # Records every polled status, if `TRACE_FILE` is set
+    trace_recorder: trace.TraceRecorder | None = None
+    # Replaces the recorded sources and the light, in a replay
+    replay_trace: trace.Trace | None = None
+
+    # Polling Properties
+    # Shares identically configured sources with other profiles in fleet mode
+    source_pool: fleet.SourcePool | None = None
+    executor: futures.ThreadPoolExecutor | None = None
+    source_poller: poller.SourcePoller
+    source_scheduler: scheduler.SourceScheduler
+    source_breakers: dict[enum.StatusSource, breaker.CircuitBreaker] = {}
+    # The freshest known status of every selected source
+    source_statuses: dict[enum.StatusSource, enum.Status] = {}
+    # Suppresses short flaps between the selected status and the light
+    debouncer: debounce.StatusDebouncer
+    # Events pushed by the sources, waiting for the main loop
+    pushed_events: deque[push.PushEvent]
+    # Sources whose pushes cover their whole status, and so are polled less often, with
+    # when they last pushed
+    pushed_sources: dict[enum.StatusSource, float] = {}
+
+    def __init__(self, environ: Mapping[str, str] | None = None, profile: str = '',
+                 replay_trace: trace.Trace | None = None,
+                 status_clock: clock.Clock | None = None):
+        """Args:
+            environ: The environment variables to configure from; defaults to the
+                process environment
+            profile: The profile name in fleet mode, used for logging and metrics
+            replay_trace: A recorded trace to replay onto a virtual light, instead of
+                polling the sources it recorded
+            status_clock: The clock to run on; defaults to the real time
+        """
+        self.logger = logging.getLogger('status-light.' + profile if profile else 'status-light')
+        self.profile = profile or 'default'
+        self.environ = environ
+        self.local_env = env.Environment(environ)
+        self.wake_event = threading.Event()
+        self.status_clock = status_clock or clock.REAL_CLOCK
+        self.replay_trace = replay_trace
+        self.source_scheduler = scheduler.SourceScheduler({})
+        self.source_breakers = {}
+        self.source_statuses = {}
+        self.debouncer = debounce.StatusDebouncer()
+        self.pushed_events = deque()
+        self.pushed_sources = {}
+
+    def init(self, source_pool: fleet.SourcePool | None = None,
+             executor: futures.ThreadPoolExecutor | None = None):
+        """Initializes all class and environment variables.
+
+        In fleet mode, pass the `source_pool` and worker pool shared between profiles."""
+        self.source_pool = source_pool
+        self.executor = executor
+        if not self.configure():
+            sys.exit(1)
+        self.restore_snapshot()
+
+    def reload(self, environ: Mapping[str, str] | None = None):
+        """Asks the main loop to reload its configuration before its next iteration.
+
+        Pass `environ` to replace the environment variables the profile was created with;
+        otherwise they, and any secret files they reference, are simply re-read."""
+        if environ is not None:
+            self.environ = environ
+        self.reload_requested = True
+        self.wake_event.set()
+
+    def configure(self) -> bool:
+        """Reads and validates the environment, then applies it.
+
+        Any source, circuit breaker or target whose settings did not change is kept,
+        along with its clients, caches and connections. Returns False, leaving the
+        current configuration in place, if the environment is not valid."""
+        new_env = env.Environment(self.environ)
 
         # Validate environment variables in a structured way
-        if False in [self.local_env.get_sources(),
-                     self.local_env.get_target(),
-                     self.local_env.get_colors(),
-                     self.local_env.get_status(),
-                     self.local_env.get_active_time(),
-                     self.local_env.get_lookahead(),
-                     self.local_env.get_sleep(),
-                     self.local_env.get_log_level()]:
+        if False in [new_env.get_sources(),
+                     new_env.get_target(),
+                     new_env.get_colors(),
+                     new_env.get_status(),
+                     new_env.get_active_time(),
+                     new_env.get_lookahead(),
+                     new_env.get_sleep(),
+                     new_env.get_poll_intervals(),
+                     new_env.get_poll_timeout(),
+                     new_env.get_circuit(),
+                     new_env.get_debounce(),
+                     new_env.get_push(),
+                     new_env.get_decisions(),
+                     new_env.get_state(),
+                     new_env.get_trace(),
+                     new_env.get_log_level()]:
 
             # We failed to gather some environment variables
             self.logger.error('Failed to find all environment variables!')
-            sys.exit(1)
+            return False
 
         # 23 - Make logging level configurable
-        self.logger.info('Setting log level to %s', self.local_env.log_level.name)
-        # Reset the root logger config to our epxected logging level
-        logging.basicConfig(format='%(asctime)s %(name)s.%(funcName)s %(levelname)s: %(message)s',
-                    datefmt='[%Y-%m-%d %H:%M:%S]', level=self.local_env.log_level.value, force=True)
-        self.logger.setLevel(self.local_env.log_level.value)
+        self.logger.info('Setting log level to %s', new_env.log_level.name)
+        # In fleet mode the root logger is shared, so it keeps the process-wide level set
+        # in `main`, and each profile only sets its own logger's
+        if self.source_pool is None:
+            # Reset the root logger config to our epxected logging level
+            logging.basicConfig(
+                format='%(asctime)s %(name)s.%(funcName)s %(levelname)s: %(message)s',
+                datefmt='[%Y-%m-%d %H:%M:%S]', level=new_env.log_level.value, force=True)
+        self.logger.setLevel(new_env.log_level.value)
+
+        # A replay answers for every source it recorded; any others (e.g. an ICS feed,
+        # which then follows the simulated clock) are configured as usual
+        new_sources: dict[enum.StatusSource, object] = {}
+        if self.replay_trace is not None:
+            new_sources.update(self.replay_trace.get_sources(new_env.selected_sources,
+                                                             self.status_clock))
+        wanted_sources = [source for source in new_env.selected_sources
+                          if source not in new_sources]
 
         # Depending on the selected sources, get the environment
-        if enum.StatusSource.WEBEX in self.local_env.selected_sources:
-            if self.local_env.get_webex():
+        if enum.StatusSource.WEBEX in wanted_sources:
+            if new_env.get_webex():
                 self.logger.info('Requested Webex')
-                self.webex_api.bot_id = self.local_env.webex_bot_id
-                self.webex_api.person_id = self.local_env.webex_person_id
+                webex_api = registry.create_source(enum.StatusSource.WEBEX)
+                webex_api.bot_id = new_env.webex_bot_id
+                webex_api.person_ids = new_env.webex_person_ids
+                new_sources[enum.StatusSource.WEBEX] = webex_api
             else:
                 self.logger.error(
                     'Requested Webex, but could not find all environment variables!')
-                sys.exit(1)
+                return False
 
-        if enum.StatusSource.SLACK in self.local_env.selected_sources:
-            if self.local_env.get_slack():
+        if enum.StatusSource.SLACK in wanted_sources:
+            if new_env.get_slack():
                 self.logger.info('Requested Slack')
-                self.slack_api.user_id = self.local_env.slack_user_id
-                self.slack_api.bot_token = self.local_env.slack_bot_token
+                slack_api = registry.create_source(enum.StatusSource.SLACK)
+                slack_api.user_id = new_env.slack_user_id
+                slack_api.bot_token = new_env.slack_bot_token
+                slack_api.app_token = new_env.slack_app_token
                 # 66 - Support Slack custom statuses
-                self.slack_api.custom_available_status = self.local_env.slack_available_status
-                self.slack_api.custom_available_status_map = self.local_env.available_status[
-                    0]
-                self.slack_api.custom_busy_status = self.local_env.slack_busy_status
-                self.slack_api.custom_busy_status_map = self.local_env.busy_status[0]
-                self.slack_api.custom_off_status = self.local_env.slack_off_status
-                self.slack_api.custom_off_status_map = self.local_env.off_status[0]
-                self.slack_api.custom_scheduled_status = self.local_env.slack_scheduled_status
-                self.slack_api.custom_scheduled_status_map = self.local_env.scheduled_status[
-                    0]
+                slack_api.custom_available_status = new_env.slack_available_status
+                slack_api.custom_available_status_map = new_env.available_status[0]
+                slack_api.custom_busy_status = new_env.slack_busy_status
+                slack_api.custom_busy_status_map = new_env.busy_status[0]
+                slack_api.custom_off_status = new_env.slack_off_status
+                slack_api.custom_off_status_map = new_env.off_status[0]
+                slack_api.custom_scheduled_status = new_env.slack_scheduled_status
+                slack_api.custom_scheduled_status_map = new_env.scheduled_status[0]
+                slack_api.custom_status_priority = new_env.slack_status_priority
+                new_sources[enum.StatusSource.SLACK] = slack_api
             else:
                 self.logger.error(
                     'Requested Slack, but could not find all environment variables!')
-                sys.exit(1)
+                return False
 
-        if enum.StatusSource.OFFICE365 in self.local_env.selected_sources:
-            if self.local_env.get_office():
+        if enum.StatusSource.OFFICE365 in wanted_sources:
+            if new_env.get_office():
                 self.logger.info('Requested Office 365')
-                self.office_api.appID = self.local_env.office_app_id
-                self.office_api.appSecret = self.local_env.office_app_secret
-                self.office_api.tokenStore = self.local_env.office_token_store
+                office_api = registry.create_source(enum.StatusSource.OFFICE365)
+                office_api.appID = new_env.office_app_id
+                office_api.appSecret = new_env.office_app_secret
+                office_api.tokenStore = new_env.office_token_store
+                office_api.cacheWindow = new_env.office_cache_window
+                office_api.cacheLifetime = new_env.office_cache_lifetime
                 # 81 - Make calendar lookahead configurable
-                self.office_api.lookahead = self.local_env.calendar_lookahead
-                self.office_api.authenticate()
+                office_api.lookahead = new_env.calendar_lookahead
+                new_sources[enum.StatusSource.OFFICE365] = office_api
             else:
                 self.logger.error(
                     'Requested Office 365, but could not find all environment variables!')
-                sys.exit(1)
+                return False
 
         # 47 - Add Google support
-        if enum.StatusSource.GOOGLE in self.local_env.selected_sources:
-            if self.local_env.get_google():
+        if enum.StatusSource.GOOGLE in wanted_sources:
+            if new_env.get_google():
                 self.logger.info('Requested Google')
-                self.google_api.credentialStore = self.local_env.google_credential_store
-                self.google_api.tokenStore = self.local_env.google_token_store
+                google_api = registry.create_source(enum.StatusSource.GOOGLE)
+                google_api.credentialStore = new_env.google_credential_store
+                google_api.tokenStore = new_env.google_token_store
+                google_api.calendarIds = new_env.google_calendar_ids
+                google_api.cacheWindow = new_env.google_cache_window
+                google_api.cacheLifetime = new_env.google_cache_lifetime
+                google_api.mode = new_env.google_mode
+                # Push channels need somewhere to send their notifications
+                if new_env.google_webhook_secret != '':
+                    google_api.webhookUrl = new_env.google_webhook_url
+                    google_api.webhookToken = new_env.google_webhook_secret
                 # 81 - Make calendar lookahead configurable
-                self.google_api.lookahead = self.local_env.calendar_lookahead
+                google_api.lookahead = new_env.calendar_lookahead
+                new_sources[enum.StatusSource.GOOGLE] = google_api
             else:
                 self.logger.error(
                     'Requested Google, but could not find all environment variables!')
-                sys.exit(1)
+                return False
 
         # ICS Calendar support
-        if enum.StatusSource.ICS in self.local_env.selected_sources:
-            if self.local_env.get_ics():
+        if enum.StatusSource.ICS in wanted_sources:
+            if new_env.get_ics():
                 self.logger.info('Requested ICS')
-                self.ics_api.url = self.local_env.ics_url
-                self.ics_api.cacheStore = self.local_env.ics_cache_store
-                self.ics_api.cacheLifetime = self.local_env.ics_cache_lifetime
+                ics_api = registry.create_source(enum.StatusSource.ICS)
+                ics_api.url = new_env.ics_url
+                ics_api.cacheStore = new_env.ics_cache_store
+                ics_api.cacheLifetime = new_env.ics_cache_lifetime
                 # 81 - Make calendar lookahead configurable
-                self.ics_api.lookahead = self.local_env.calendar_lookahead
+                ics_api.lookahead = new_env.calendar_lookahead
+                ics_api.clock = self.status_clock
+                # Key the cache file by URL, so a reload with a new URL (or another fleet
+                # profile sharing the cache store) never reads another feed's cache
+                ics_api.cacheFile = 'status-light-ics-cache-' + hashlib.sha256(
+                    ics_api.url.encode()).hexdigest()[:16] + '.ics'
+                new_sources[enum.StatusSource.ICS] = ics_api
             else:
                 self.logger.error(
                     'Requested ICS, but could not find all environment variables!')
-                sys.exit(1)
+                return False
 
         # Target initialization
-        if self.local_env.target == 'virtual':
+        if self.replay_trace is not None:
+            # Keep the light from an earlier configuration, so its counts carry on
+            new_light = self.light if isinstance(self.light, replay.ReplayLight) \
+                else replay.ReplayLight(self.status_clock)
+        elif new_env.target == 'virtual':
             self.logger.info('Using virtual light target')
-            self.light = virtual.VirtualLight()
+            new_light = registry.create_target('virtual')
         else:
             # Tuya target (requires TUYA_DEVICE)
-            if not self.local_env.get_tuya():
+            if not new_env.get_tuya():
                 self.logger.error(
                     'TUYA_DEVICE is required when TARGET=tuya!')
-                sys.exit(1)
-            self.light.device = self.local_env.tuya_device
-            self.logger.debug('Retrieved TUYA_DEVICE variable: %s', self.light.device)
+                return False
+            new_light = registry.create_target('tuya')
+            new_light.device = new_env.tuya_device
+            self.logger.debug('Retrieved TUYA_DEVICE variable: %s', new_light.device)
+
+        self._apply_configuration(new_env, new_sources, new_light)
+        return True
+
+    def _apply_configuration(self, new_env: env.Environment,
+                             new_sources: dict[enum.StatusSource, object],
+                             new_light: base.LightTarget):
+        """Internal Helper Method to swap in a validated configuration, keeping every
+        source, circuit breaker and target whose settings did not change."""
+        # Nothing has been configured yet on the first call
+        reloading = bool(self.source_breakers)
+        reused_sources = []
+        for source, new_api in new_sources.items():
+            attribute = self.SOURCE_ATTRIBUTES[source]
+            current_api = getattr(self, attribute)
+            if source in self.source_breakers and \
+                    util.is_same_configuration(current_api, new_api):
+                self.logger.debug('Keeping the existing %s source', source.name.capitalize())
+                reused_sources.append(source)
+                continue
+            if reloading and source in self.source_breakers:
+                self.logger.info('%s settings changed, replacing it', source.name.capitalize())
+
+            # In fleet mode, reuse any source another profile configured identically
+            api = new_api
+            if self.source_pool is not None:
+                api = self.source_pool.share(new_api)
+            if api is new_api and source is enum.StatusSource.OFFICE365 and \
+                    not isinstance(api, trace.TraceSource):
+                api.authenticate()
+            self._close_source(current_api)
+            setattr(self, attribute, api)
+
+        # Sources that are no longer selected are let go
+        for source in self.source_breakers:
+            if source not in new_sources:
+                self._close_source(getattr(self, self.SOURCE_ATTRIBUTES[source]))
+                setattr(self, self.SOURCE_ATTRIBUTES[source], None)
+
+        if util.is_same_configuration(self.light, new_light):
+            self.logger.debug('Keeping the existing light target')
+        else:
+            if reloading:
+                # Don't leave the old light on
+                self.light.turn_off()
+            self.light = new_light
+
+        # Poll all selected sources concurrently, each with its own deadline
+        new_poller = poller.SourcePoller(self._get_source_calls(new_env),
+                                         new_env.source_timeouts,
+                                         new_env.poll_timeout_seconds, self.executor)
+        if reloading:
+            # Unchanged sources still hung from before the reload aren't called again
+            new_poller.adopt_pending(self.source_poller, reused_sources)
+            self.source_poller.shutdown()
+        self.source_poller = new_poller
+
+        # Each source is polled on its own interval; unchanged sources keep their schedule.
+        # The intervals are copied, as pushes relax them for the sources they cover
+        new_scheduler = scheduler.SourceScheduler(dict(new_env.source_poll_seconds))
+        for source in reused_sources:
+            if source in self.source_scheduler.intervals and \
+                    self.source_scheduler.intervals[source] == new_env.source_poll_seconds[source]:
+                new_scheduler.next_due[source] = self.source_scheduler.next_due[source]
+        self.source_scheduler = new_scheduler
+        self.pushed_sources = {source: pushed_at for source, pushed_at
+                               in self.pushed_sources.items()
+                               if source in new_env.selected_sources}
+        for source in self.pushed_sources:
+            new_scheduler.intervals[source] = max(new_scheduler.intervals[source],
+                                                  new_env.push_poll_seconds)
+
+        # Failing sources back off instead of being hammered every poll
+        new_breakers = {}
+        for source in new_env.selected_sources:
+            if source in reused_sources:
+                source_breaker = self.source_breakers[source]
+            else:
+                source_breaker = breaker.CircuitBreaker(source, 0)
+            source_breaker.base_backoff = new_env.source_poll_seconds[source]
+            source_breaker.failure_threshold = new_env.circuit_threshold
+            source_breaker.max_backoff = new_env.circuit_max_backoff_seconds
+            source_breaker.stale_seconds = new_env.circuit_stale_seconds
+            new_breakers[source] = source_breaker
+        self.source_breakers = new_breakers
+
+        self.source_statuses = {source: self.source_statuses.get(source, enum.Status.UNKNOWN)
+                                if source in reused_sources else enum.Status.UNKNOWN
+                                for source in new_env.selected_sources}
+
+        self.debouncer.samples = new_env.debounce_samples
+        self.debouncer.dwell_seconds = new_env.debounce_dwell_seconds
+        self.debouncer.exempt_status = new_env.debounce_exempt_status
+
+        self.decision_log = decisions.get_log(self.profile, new_env.decision_log_size)
+        push.register(self.profile, self.receive_push)
+
+        # Record every polled status, if asked to
+        if self.trace_recorder is not None and self.trace_recorder.path != new_env.trace_file:
+            self.trace_recorder.close(self.status_clock.now(timezone.utc))
+            self.trace_recorder = None
+        if self.trace_recorder is None and new_env.trace_file != '':
+            self.logger.info('Recording statuses to %s', new_env.trace_file)
+            self.trace_recorder = trace.TraceRecorder(new_env.trace_file)
+        self.local_env = new_env
 
     def run(self):
         """Runs the main loop of the application"""
@@ -168,87 +431,90 @@ class StatusLight:
         already_handled_inactive_hours = False
         # Init to True so we don't panic the first time
         last_transition_result = True
+        # A previous run may have left the light on, so set it on the first iteration,
+        # even if the status is still UNKNOWN, unless a snapshot says what it shows
+        force_transition = not self.light_restored
         while self.should_continue:
+            iteration_start = time.monotonic()
             try:
+                if self.reload_requested:
+                    self.reload_requested = False
+                    self.logger.info('Reloading configuration')
+                    if self.configure():
+                        force_transition = True
+                        # Re-evaluate active hours, too
+                        already_handled_inactive_hours = False
+                    else:
+                        self.logger.error('Failed to reload configuration, keeping the current one')
+
                 # Decide if we need to poll at this time
                 if util.is_active_hours(self.local_env.active_days,
                                         self.local_env.active_hours_start,
-                                        self.local_env.active_hours_end):
+                                        self.local_env.active_hours_end,
+                                        self.status_clock.now()):
 
                     self.logger.debug('Within Active Hours, polling')
 
                     # Reset the "outside of active hours" handler
                     already_handled_inactive_hours = False
 
-                    webex_status = enum.Status.UNKNOWN
-                    slack_status = enum.Status.UNKNOWN
-                    office_status = enum.Status.UNKNOWN
-                    google_status = enum.Status.UNKNOWN
-                    ics_status = enum.Status.UNKNOWN
-
-                    logger_format = " {}: {} |"
-                    logger_string = ""
-
-                    # Webex Status
-                    if enum.StatusSource.WEBEX in self.local_env.selected_sources:
-                        webex_status = self.webex_api.get_person_status()
-                        logger_string += \
-                            logger_format.format(enum.StatusSource.WEBEX.name.capitalize(),
-                                                 webex_status.name.lower())
-
-                    # Slack Status
-                    if enum.StatusSource.SLACK in self.local_env.selected_sources:
-                        slack_status = self.slack_api.get_user_presence()
-                        logger_string += \
-                            logger_format.format(enum.StatusSource.SLACK.name.capitalize(),
-                                                 slack_status.name.lower())
-
-                    # O365 Status (based on calendar)
-                    if enum.StatusSource.OFFICE365 in self.local_env.selected_sources:
-                        office_status = self.office_api.get_current_status()
-                        logger_string += \
-                            logger_format.format(enum.StatusSource.OFFICE365.name.capitalize(),
-                                                 office_status.name.lower())
-
-                    # Google Status (based on calendar)
-                    if enum.StatusSource.GOOGLE in self.local_env.selected_sources:
-                        google_status = self.google_api.get_current_status()
-                        logger_string += \
-                            logger_format.format(enum.StatusSource.GOOGLE.name.capitalize(),
-                                                 google_status.name.lower())
-
-                    # ICS Status (based on calendar)
-                    if enum.StatusSource.ICS in self.local_env.selected_sources:
-                        ics_status = self.ics_api.get_current_status()
-                        logger_string += \
-                            logger_format.format(enum.StatusSource.ICS.name.capitalize(),
-                                                 ics_status.name.lower())
-
-                    # 74: Log enums as names, not values
-                    self.logger.debug(logger_string.lstrip().rstrip(' |'))
-
-                    # Build input dictionaries from retrieved statuses
-                    collaboration_statuses = {}
-                    if enum.StatusSource.WEBEX in self.local_env.selected_sources:
-                        collaboration_statuses[enum.StatusSource.WEBEX] = webex_status
-                    if enum.StatusSource.SLACK in self.local_env.selected_sources:
-                        collaboration_statuses[enum.StatusSource.SLACK] = slack_status
-
-                    calendar_statuses = {}
-                    if enum.StatusSource.OFFICE365 in self.local_env.selected_sources:
-                        calendar_statuses[enum.StatusSource.OFFICE365] = office_status
-                    if enum.StatusSource.GOOGLE in self.local_env.selected_sources:
-                        calendar_statuses[enum.StatusSource.GOOGLE] = google_status
-                    if enum.StatusSource.ICS in self.local_env.selected_sources:
-                        calendar_statuses[enum.StatusSource.ICS] = ics_status
+                    # Pushed statuses are taken as if just polled
+                    results = self._apply_pushed_events()
+
+                    # Only poll the sources that are due and whose circuit allows it;
+                    # the rest keep their cached status
+                    now = self.status_clock.monotonic()
+                    due_sources = []
+                    for source in self.source_scheduler.due(now):
+                        if self.source_breakers[source].allow_request(now):
+                            due_sources.append(source)
+                        else:
+                            self.source_scheduler.defer_until(
+                                source, self.source_breakers[source].retry_at)
+                    if due_sources:
+                        polled, total_latency = self.source_poller.poll(due_sources)
+                        for source, result in polled.items():
+                            self._update_source_status(source, result)
+                        results.update(polled)
+
+                        # 74: Log enums as names, not values
+                        if self.logger.isEnabledFor(logging.DEBUG):
+                            self.logger.debug('%s | Total: %.0fms', ' | '.join(
+                                f'{source.name.capitalize()}: {result.status.name.lower()} '
+                                f'({result.latency * 1000:.0f}ms'
+                                f'{", timed out" if result.timed_out else ""}, '
+                                f'circuit {self.source_breakers[source].state.name.lower()})'
+                                for source, result in polled.items()), total_latency * 1000)
+
+                    # Sources with an open circuit serve their last good status until it's stale
+                    now = self.status_clock.monotonic()
+                    for source, source_breaker in self.source_breakers.items():
+                        if source_breaker.state is not enum.CircuitState.CLOSED:
+                            self.source_statuses[source] = source_breaker.fallback(now)
+
+                    # Build input dictionaries from the freshest cached statuses
+                    collaboration_statuses = {source: self.source_statuses[source]
+                                              for source in precedence.COLLABORATION_SOURCES
+                                              if source in self.source_statuses}
+                    calendar_statuses = {source: self.source_statuses[source]
+                                         for source in precedence.CALENDAR_SOURCES
+                                         if source in self.source_statuses}
 
                     # Call precedence module to select winning status
-                    self.current_status, winning_source = precedence.select_status(
+                    select_start = time.perf_counter()
+                    selected_status, winning_source = precedence.select_status(
                         collaboration_statuses,
                         calendar_statuses,
                         self.local_env.off_status,
                         self.local_env.available_status
                     )
+                    metrics.SELECT_STATUS_SECONDS.observe(time.perf_counter() - select_start,
+                                                          profile=self.profile)
+
+                    # Only show a new status once it has settled, unless it's exempt
+                    self.current_status = self.debouncer.update(selected_status,
+                                                                self.status_clock.monotonic(),
+                                                                bool(results))
 
                     status_changed = False
                     if self.last_status != self.current_status:
@@ -265,11 +531,31 @@ class StatusLight:
 
                     # If status changed this loop
                     # 40: or the last transition failed,
-                    if status_changed or not last_transition_result:
+                    # or the configuration was reloaded
+                    transition_result = None
+                    if status_changed or force_transition or not last_transition_result:
                         # 74: Log enums as names, not values
                         self.logger.info('Transitioning to %s',
                                     self.current_status.name.lower())
                         last_transition_result = self._transition_status()
+                        transition_result = last_transition_result
+                    # Set the light again after a reload, even if the status didn't change
+                    force_transition = False
+
+                    if self.decision_log is not None:
+                        self.decision_log.record(
+                            self.status_clock.now(timezone.utc).timestamp(),
+                            tuple((source, status,
+                                   results[source].latency if source in results else None,
+                                   self.source_breakers[source].state)
+                                  for source, status in self.source_statuses.items()),
+                            selected_status, winning_source, self.current_status,
+                            self.light_state.get('color') if self.light_state else None,
+                            transition_result)
+
+                    iteration_time = time.monotonic() - iteration_start
+                    metrics.LOOP_ITERATION_SECONDS.observe(iteration_time, profile=self.profile)
+                    self.logger.debug('Iteration took %.0fms', iteration_time * 1000)
 
                 else:
                     self.logger.debug('Outside Active Hours, pausing')
@@ -277,16 +563,39 @@ class StatusLight:
                     if not already_handled_inactive_hours:
                         self.logger.info(
                             'Outside of active hours, transitioning to off')
-                        last_transition_result = self.light.turn_off()
+                        last_transition_result = self._turn_off()
                         self.last_status = enum.Status.UNKNOWN
+                        # Forget the cached statuses and poll everything as soon as we're back
+                        self.source_statuses = dict.fromkeys(self.source_statuses,
+                                                             enum.Status.UNKNOWN)
+                        self.source_scheduler.reset()
+                        self.debouncer.reset()
                         already_handled_inactive_hours = True
+                        # The light is off, so there's nothing left to set again
+                        force_transition = False
+
+                    # Nothing is shown outside of active hours, so neither are pushed statuses
+                    self.pushed_events.clear()
 
                     # 40: If the last transition failed, try again
                     if not last_transition_result:
-                        last_transition_result = self.light.turn_off()
+                        last_transition_result = self._turn_off()
 
-                # Sleep for a few seconds
-                time.sleep(self.local_env.sleep_seconds)
+                self._save_snapshot()
+
+                # Wait until the next source or calendar edge is due, or a held status
+                # may be shown, or for a few seconds while inactive.
+                # A signal sets `wake_event` and interrupts the wait.
+                if already_handled_inactive_hours:
+                    self.status_clock.wait(self.wake_event, self.local_env.sleep_seconds)
+                else:
+                    next_wakeup = self.source_scheduler.next_wakeup()
+                    next_decision = self.debouncer.next_decision()
+                    if next_decision is not None:
+                        next_wakeup = min(next_wakeup, next_decision)
+                    self.status_clock.wait(self.wake_event,
+                                    max(0, next_wakeup - self.status_clock.monotonic()))
+                self.wake_event.clear()
             except (SystemExit, KeyboardInterrupt) as ex:
                 self.logger.info('%s received; shutting down...',
                             ex.__class__.__name__)
@@ -295,45 +604,433 @@ class StatusLight:
                 self.logger.warning('Exception during main loop: %s', ex)
                 self.logger.exception(ex)
 
-        self.logger.debug('Turning light off')
-        self.light.turn_off()
+        self.source_poller.shutdown()
+        for source in self.source_breakers:
+            self._close_source(getattr(self, self.SOURCE_ATTRIBUTES[source]))
+        if self.local_env.state_file != '' and not self.force_turn_off:
+            # Leave the light as it is, so a restart can pick up where this run left off
+            self.logger.debug('Leaving light as it is')
+        else:
+            self.logger.debug('Turning light off')
+            self._turn_off()
+        self._save_snapshot(force=True)
+        metrics.LIGHT_COLOR_SECONDS.leave(profile=self.profile)
+        if self.trace_recorder is not None:
+            self.trace_recorder.close(self.status_clock.now(timezone.utc))
+
+    def stop(self, turn_off: bool = False):
+        """Signals the main loop to exit, interrupting any wait in progress.
+
+        The light is turned off on exit, unless `STATE_FILE` is set, in which case it is
+        left as it is for the next run; pass `turn_off=True` to turn it off regardless."""
+        self.force_turn_off = turn_off
+        self.should_continue = False
+        self.wake_event.set()
+
+    def restore_snapshot(self) -> bool:
+        """Restores the source statuses, circuit breakers and light state saved by a
+        previous run to `STATE_FILE`, if it is fresh enough, so a restart doesn't flash
+        the light or hammer a failing source.
+
+        The saved status is only treated as shown if the light was left showing what that
+        status calls for now; otherwise the first iteration sets the light as usual.
+        Returns True if a snapshot was restored."""
+        if self.local_env.state_file == '':
+            return False
+        wall_now = self.status_clock.now(timezone.utc).timestamp()
+        saved = snapshot.load_snapshot(self._get_state_path(),
+                                       self.local_env.state_max_age_seconds, wall_now)
+        if saved is None:
+            return False
+
+        monotonic_now = self.status_clock.monotonic()
+        def to_monotonic(timestamp: float | None) -> float | None:
+            return None if timestamp is None else monotonic_now - (wall_now - timestamp)
+
+        try:
+            for name, saved_source in saved['sources'].items():
+                source = enum.StatusSource[name.upper()]
+                if source not in self.source_breakers:
+                    continue
+                source_breaker = self.source_breakers[source]
+                source_breaker.state = enum.CircuitState[saved_source['circuit'].upper()]
+                source_breaker.failures = saved_source['failures']
+                source_breaker.retry_at = to_monotonic(saved_source['retry_at']) or 0.0
+                source_breaker.last_good = enum.Status[saved_source['last_good'].upper()]
+                source_breaker.last_good_time = to_monotonic(saved_source['last_good_at'])
+                self.source_statuses[source] = enum.Status[saved_source['status'].upper()]
+                metrics.CIRCUIT_STATE.set(source_breaker.state.value, profile=self.profile,
+                                          source=source.name.lower())
+                if source_breaker.state is enum.CircuitState.OPEN:
+                    self.source_scheduler.defer_until(source, source_breaker.retry_at)
+
+            current_status = enum.Status[saved['current_status'].upper()]
+            if saved['light'] is not None and \
+                    saved['light'] == self._get_light_state(current_status):
+                self.current_status = current_status
+                self.last_status = enum.Status[saved['last_status'].upper()]
+                self.debouncer.stable = current_status
+                self.debouncer.stable_since = monotonic_now
+                self._set_light_state(saved['light'])
+                self.light_restored = True
+        except Exception as ex:  # pylint: disable=broad-except
+            self.logger.warning('Exception while restoring the state snapshot: %s', ex)
+            self.logger.exception(ex)
+            return False
+
+        # 74: Log enums as names, not values
+        self.logger.info('Restored %s from a snapshot saved %.0fs ago',
+                         self.current_status.name.lower(), wall_now - saved['saved_at'])
+        return True
+
+    def _save_snapshot(self, force: bool = False):
+        """Internal Helper Method to save a snapshot to `STATE_FILE`, if it is set.
+
+        Timestamps change on nearly every poll, so a snapshot that is otherwise unchanged
+        is only rewritten every `snapshot.REFRESH_SECONDS`, unless `force` is set."""
+        if self.local_env.state_file == '':
+            return
+        wall_now = self.status_clock.now(timezone.utc).timestamp()
+        monotonic_now = self.status_clock.monotonic()
+        def to_timestamp(monotonic: float | None) -> float | None:
+            return None if monotonic is None else round(wall_now - (monotonic_now - monotonic), 1)
+
+        current = {
+            'saved_at': wall_now,
+            'current_status': self.current_status.name.lower(),
+            'last_status': self.last_status.name.lower(),
+            'light': self.light_state,
+            'sources': {source.name.lower(): {
+                'status': self.source_statuses.get(source, enum.Status.UNKNOWN).name.lower(),
+                'circuit': source_breaker.state.name.lower(),
+                'failures': source_breaker.failures,
+                'retry_at': None if source_breaker.state is enum.CircuitState.CLOSED
+                            else to_timestamp(source_breaker.retry_at),
+                'last_good': source_breaker.last_good.name.lower(),
+                'last_good_at': to_timestamp(source_breaker.last_good_time)
+            } for source, source_breaker in self.source_breakers.items()}
+        }
+        comparable = snapshot.without_timestamps(current)
+        if not force and comparable == self.last_snapshot and \
+                wall_now - self.last_snapshot_time < snapshot.REFRESH_SECONDS:
+            return
+        if snapshot.save_snapshot(self._get_state_path(), current):
+            self.last_snapshot = comparable
+            self.last_snapshot_time = wall_now
+
+    def _get_state_path(self) -> str:
+        """Internal Helper Method to get the snapshot path; fleet profiles may share
+        `STATE_FILE`, so each gets its own file alongside it."""
+        if self.source_pool is None:
+            return self.local_env.state_file
+        root, extension = os.path.splitext(self.local_env.state_file)
+        return f'{root}-{self.profile}{extension}'
+
+    def receive_push(self, event: push.PushEvent) -> bool:
+        """Queues an event pushed by a source for the main loop, and wakes it, if the
+        event is for this profile. Called from the push server's threads."""
+        if event.source not in self.local_env.selected_sources or \
+                event.profile not in ['', self.profile]:
+            return False
+        user_ids = {enum.StatusSource.WEBEX: self.local_env.webex_person_ids,
+                    enum.StatusSource.SLACK: [self.local_env.slack_user_id]}.get(event.source, [])
+        if event.user_ids and event.user_ids.isdisjoint(user_ids):
+            return False
+        self.pushed_events.append(event)
+        self.wake_event.set()
+        return True
+
+    def _apply_pushed_events(self) -> dict[enum.StatusSource, poller.PollResult]:
+        """Internal Helper Method to take the statuses pushed since the last iteration as
+        if they were just polled, and returns them.
+
+        Events that don't say what the new status is bring the source's next poll forward
+        to now, instead. While a source keeps pushing its whole status, it is only polled
+        every `PUSH_POLL_SECONDS`, as a safety net; once it has been quiet that long, or
+        pushes an event without a status (e.g. a cleared Slack custom status), it is
+        polled on its own interval again."""
+        results = {}
+        now = self.status_clock.monotonic()
+        for source, pushed_at in list(self.pushed_sources.items()):
+            if now - pushed_at >= self.local_env.push_poll_seconds:
+                self._restore_polling(source, now)
+        while self.pushed_events:
+            event = self.pushed_events.popleft()
+            # The source may have been removed by a reload since
+            if event.source not in self.source_breakers:
+                continue
+            status = event.status
+            if status is None and event.source is enum.StatusSource.SLACK:
+                status = self.slack_api.get_pushed_status(  # type: ignore
+                    event.presence, event.user_profile)
+            # 74: Log enums as names, not values
+            if status is None or status is enum.Status.UNKNOWN:
+                self.logger.debug('%s pushed a change, polling it',
+                                  event.source.name.capitalize())
+                self._restore_polling(event.source, now)
+                self.source_scheduler.schedule_at(event.source, now)
+                continue
+            self.logger.debug('%s pushed %s', event.source.name.capitalize(),
+                              status.name.lower())
+            results[event.source] = poller.PollResult(status, 0.0)
+            if event.replaces_polling:
+                if event.source not in self.pushed_sources:
+                    self.source_scheduler.intervals[event.source] = max(
+                        self.source_scheduler.intervals[event.source],
+                        self.local_env.push_poll_seconds)
+                self.pushed_sources[event.source] = now
+
+        for source, result in results.items():
+            self._update_source_status(source, result)
+        return results
+
+    def _restore_polling(self, source: enum.StatusSource, now: float):
+        """Internal Helper Method to poll a pushed source on its own interval again."""
+        if self.pushed_sources.pop(source, None) is None:
+            return
+        self.logger.debug('%s stopped pushing its status, polling it every %s seconds',
+                          source.name.capitalize(), self.local_env.source_poll_seconds[source])
+        self.source_scheduler.intervals[source] = self.local_env.source_poll_seconds[source]
+        self.source_scheduler.schedule_at(source, now + self.source_scheduler.intervals[source])
+
+    def _update_source_status(self, source: enum.StatusSource, result: poller.PollResult):
+        """Internal Helper Method to cache a source's poll result and schedule its next poll.
+
+        Sources report failures (and missed deadlines) as UNKNOWN, which counts against
+        their circuit breaker and is replaced with their last good status."""
+        now = self.status_clock.monotonic()
+        if self.trace_recorder is not None:
+            self.trace_recorder.record(source, result.status, self.status_clock.now(timezone.utc))
+        source_breaker = self.source_breakers[source]
+        metrics.SOURCE_POLL_SECONDS.observe(result.latency, profile=self.profile,
+                                            source=source.name.lower())
+        if result.status == enum.Status.UNKNOWN:
+            metrics.SOURCE_POLL_ERRORS.inc(profile=self.profile, source=source.name.lower(),
+                                           reason='timeout' if result.timed_out else 'error')
+            source_breaker.record_failure(now)
+            self.source_statuses[source] = source_breaker.fallback(now)
+        else:
+            source_breaker.record_success(result.status, now)
+            self.source_statuses[source] = result.status
+
+        metrics.CIRCUIT_STATE.set(source_breaker.state.value, profile=self.profile,
+                                  source=source.name.lower())
+
+        self.source_scheduler.mark_polled(source, now)
+        if source_breaker.state is enum.CircuitState.OPEN:
+            self.source_scheduler.defer_until(source, source_breaker.retry_at)
+        else:
+            # Calendar sources are polled again right at their next edge
+            self._schedule_transition(source)
+
+    def _schedule_transition(self, source: enum.StatusSource):
+        """Internal Helper Method to schedule a calendar source's next poll at its next
+        known status transition, if any."""
+        if source not in precedence.CALENDAR_SOURCES:
+            return
+
+        next_transition = getattr(self, self.SOURCE_ATTRIBUTES[source]).get_next_transition()
+        if next_transition is not None:
+            self.logger.debug('Next %s transition at %s', source.name.capitalize(),
+                              next_transition.astimezone().strftime('%I:%M:%S %p'))
+            delay = (next_transition - self.status_clock.now(timezone.utc)).total_seconds()
+            self.source_scheduler.schedule_at(source, self.status_clock.monotonic() + max(0, delay))
+
+    def _close_source(self, api: object | None):
+        """Internal Helper Method to let a source that's being replaced or stopped close its
+        connections (e.g. Slack's Socket Mode, or Google's push channels), unless other
+        profiles still share it."""
+        if api is None:
+            return
+        if self.source_pool is not None and not self.source_pool.release(api):
+            return
+        if hasattr(api, 'close'):
+            api.close()
+
+    def _get_source_calls(self, local_env: env.Environment) -> dict:
+        """Internal Helper Method to map each selected source to the call that polls it."""
+        source_calls = {source: registry.get_poll_call(
+                            source, getattr(self, self.SOURCE_ATTRIBUTES[source]))
+                        for source in local_env.selected_sources}
+        # Concurrent polls of a source shared by several profiles are made only once
+        if self.source_pool is not None:
+            return {source: self.source_pool.coalesce(call)
+                    for source, call in source_calls.items()}
+        return source_calls
 
     def _transition_status(self) -> bool:
         """Internal Helper Method to determine the correct color for the light
         and transition to it."""
-        # 43: Coalesce the statuses and only execute setState once.
-        # This will still allow a single status to be in more than one list,
-        # but will not cause the light to rapidly switch between states.
-        color = None
         return_value = False
+        transition_start = time.monotonic()
 
-        if self.current_status in self.local_env.available_status:
-            color = self.local_env.available_color
-
-        if self.current_status in self.local_env.scheduled_status:
-            color = self.local_env.scheduled_color
-
-        if self.current_status in self.local_env.busy_status:
-            color = self.local_env.busy_color
-
-        if color is not None:
-            return_value = self.light.set_color(color, self.local_env.light_brightness)
+        light_state = self._get_light_state(self.current_status)
+        if light_state['power']:
+            return_value = self.light.set_color(light_state['color'], light_state['brightness'])
+            if return_value:
+                self._set_light_state(light_state)
         # OffStatus has the lowest priority, so only check it if none of the others are valid
         elif self.current_status in self.local_env.off_status:
-            return_value = self.light.turn_off()
+            return_value = self._turn_off()
         # In the case that we made it here without a valid state,
         # just turn the light off and warn about it
         # 74: Log enums as names, not values
         else:
             self.logger.warning('Called with an invalid status: %s',
                            self.current_status.name.lower())
-            return_value = self.light.turn_off()
+            return_value = self._turn_off()
+
+        metrics.TRANSITION_SECONDS.observe(time.monotonic() - transition_start,
+                                           profile=self.profile)
+        metrics.TRANSITIONS.inc(profile=self.profile,
+                                result='success' if return_value else 'failure')
+        return return_value
 
+    def _turn_off(self) -> bool:
+        """Internal Helper Method to turn the light off and record it."""
+        return_value = self.light.turn_off()
+        if return_value:
+            self._set_light_state({'power': False})
         return return_value
 
+    def _get_light_state(self, status: enum.Status) -> dict:
+        """Internal Helper Method to determine what the light should show for `status`."""
+        # 43: Coalesce the statuses and only execute setState once.
+        # This will still allow a single status to be in more than one list,
+        # but will not cause the light to rapidly switch between states.
+        color = None
+
+        if status in self.local_env.available_status:
+            color = self.local_env.available_color
+
+        if status in self.local_env.scheduled_status:
+            color = self.local_env.scheduled_color
+
+        if status in self.local_env.busy_status:
+            color = self.local_env.busy_color
+
+        # Every other status turns the light off
+        if color is None:
+            return {'power': False}
+        return {'power': True, 'color': color, 'brightness': self.local_env.light_brightness}
+
+    def _set_light_state(self, light_state: dict):
+        """Internal Helper Method to record what the light was successfully set to."""
+        self.light_state = light_state
+        if not light_state['power']:
+            metrics.LIGHT_COLOR_SECONDS.enter('off', profile=self.profile)
+            return
+        # Name the default colors, e.g. `red` rather than `ff0000`
+        color_name = enum.Color(light_state['color']).name.lower()
+        metrics.LIGHT_COLOR_SECONDS.enter(light_state['color'] if color_name == 'unknown'
+                                          else color_name, profile=self.profile)
+
+
+class Fleet:
+    """Runs one `StatusLight` per user profile in a single process.
+
+    Profiles share one worker pool for polling, and any sources they configure
+    identically, so each additional user costs a thread and a handful of objects
+    rather than a whole process and its own set of clients."""
+    logger: logging.Logger = logging.getLogger('status-light')
+
+    def __init__(self, fleet_config: str, profiles: dict[str, Mapping[str, str]]):
+        """Args:
+            fleet_config: The path of the fleet profiles file, re-read on reload
+            profiles: Dictionary mapping each profile name to its environment variables
+        """
+        self.fleet_config = fleet_config
+        self.source_pool = fleet.SourcePool()
+        self.status_lights = {name: StatusLight(environ, name)
+                              for name, environ in profiles.items()}
+        self.threads: dict[str, threading.Thread] = {}
+        self.should_continue = True
+        self.reload_requested = False
+        self.wake_event = threading.Event()
+        # Threads are only started as needed, so size the pool for the worst case:
+        # every profile polling every source at once
+        self.executor = futures.ThreadPoolExecutor(
+            max_workers=len(self.status_lights) * len(enum.StatusSource),
+            thread_name_prefix='status-light-poll')
+
+    def init(self):
+        """Initializes every profile."""
+        for status_light in self.status_lights.values():
+            status_light.init(self.source_pool, self.executor)
+        self.logger.info('Running %d profile(s) with %d shared source(s)',
+                         len(self.status_lights), len(self.source_pool))
+
+    def run(self):
+        """Runs the main loop of every profile, until all of them exit."""
+        for name in self.status_lights:
+            self._start(name)
+
+        while self.should_continue:
+            self.wake_event.wait()
+            self.wake_event.clear()
+            if self.reload_requested:
+                self.reload_requested = False
+                self._reload_profiles()
+
+        for thread in self.threads.values():
+            thread.join()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def reload(self):
+        """Asks the fleet to re-read its profiles and reload every profile's configuration."""
+        self.reload_requested = True
+        self.wake_event.set()
+
+    def stop(self):
+        """Signals every profile's main loop to exit."""
+        self.should_continue = False
+        for status_light in self.status_lights.values():
+            status_light.stop()
+        self.wake_event.set()
+
+    def _start(self, name: str):
+        """Internal Helper Method to run a profile's main loop on its own thread."""
+        status_light = self.status_lights[name]
+        self.threads[name] = threading.Thread(target=status_light.run,
+                                              name=status_light.logger.name)
+        self.threads[name].start()
+
+    def _reload_profiles(self):
+        """Internal Helper Method to re-read the fleet profiles, reloading existing profiles
+        and starting or stopping any that were added or removed."""
+        self.logger.info('Reloading fleet profiles from %s', self.fleet_config)
+        profiles = fleet.load_profiles(self.fleet_config, os.environ)
+        if not profiles:
+            self.logger.error('Failed to reload fleet profiles, keeping the current ones')
+            return
+
+        for name in [name for name in self.status_lights if name not in profiles]:
+            self.logger.info('Removing profile %s', name)
+            # Don't leave a removed profile's light on, waiting for a restart
+            self.status_lights.pop(name).stop(turn_off=True)
+            self.threads.pop(name).join()
+            decisions.remove_log(name)
+            push.unregister(name)
+
+        for name, environ in profiles.items():
+            if name in self.status_lights:
+                self.status_lights[name].reload(environ)
+                continue
+
+            self.logger.info('Adding profile %s', name)
+            status_light = StatusLight(environ, name)
+            status_light.source_pool = self.source_pool
+            status_light.executor = self.executor
+            if status_light.configure():
+                status_light.restore_snapshot()
+                self.status_lights[name] = status_light
+                self._start(name)
+            else:
+                self.logger.error('Failed to configure profile %s, skipping it', name)
+
 
 # Globals
-status_light: StatusLight = StatusLight()
+application: StatusLight | Fleet | None = None
 
 # 67 - Include function name in the basic logger format
 # Default to INFO level until we load the environment
@@ -343,9 +1040,10 @@ global_logger: logging.Logger = logging.getLogger('status-light')
 
 
 def receive_signal(signal_number, frame):  # pylint: disable=unused-argument
-    """Signals the endless while loop to exit, allowing a clean shutdown."""
+    """Signals the endless while loop to exit, allowing a clean shutdown,
+    or, for SIGHUP, to reload its configuration."""
     # Register for SIGHUP, SIGINT, SIGQUIT, SIGTERM
-    # At the moment, we'll treat them all the same and exit cleanly
+    # SIGHUP reloads the configuration in place; the rest exit cleanly
     # Since these are OS-level calls, we'll just ignore the argument issues
 
     # 74: Convert integer to signal name
@@ -357,7 +1055,12 @@ def receive_signal(signal_number, frame):  # pylint: disable=unused-argument
         global_logger.warning(
             'Exception encountered converting %s to signal.Signals: %s', signal_number, value_ex)
     global_logger.warning('Signal received: %s', signal_name)
-    status_light.should_continue = False
+    if application is None:
+        return
+    if signal_number == signal.SIGHUP:
+        application.reload()
+    else:
+        application.stop()
 
 
 # Main Methods
@@ -365,9 +1068,88 @@ def receive_signal(signal_number, frame):  # pylint: disable=unused-argument
 
 def main():
     """Provides the entry point for the application"""
+    global application  # pylint: disable=global-statement
     global_logger.info('Startup')
-    status_light.init()
-    status_light.run()
+
+    # Register for SIGHUP, SIGINT, SIGQUIT, SIGTERM
+    signals: list[signal.Signals] = [signal.SIGHUP,
+                                     signal.SIGINT,
+                                     signal.SIGQUIT,
+                                     signal.SIGTERM]
+    for sig in signals:
+        signal.signal(sig, receive_signal)
+
+    # The metrics and push endpoints, decision socket, HTTP connection pools and replays
+    # apply to the whole process, so they're configured once
+    process_env = env.Environment()
+    if False in [process_env.get_metrics(), process_env.get_push(),
+                 process_env.get_decisions(), process_env.get_http(),
+                 process_env.get_replay(), process_env.get_log_level()]:
+        global_logger.error('Failed to find all environment variables!')
+        sys.exit(1)
+    logging.getLogger().setLevel(process_env.log_level.value)
+
+    # Replay mode runs a recorded trace through a single profile, on a simulated clock
+    fleet_config = os.environ.get('FLEET_CONFIG', '')
+    if process_env.replay_file != '':
+        replay_trace = trace.load_trace(process_env.replay_file)
+        if replay_trace is None:
+            global_logger.error('Failed to load the trace from %s!', process_env.replay_file)
+            sys.exit(1)
+        global_logger.info('Replaying %s to %s at %s', replay_trace.start.isoformat(),
+                           replay_trace.end.isoformat(),
+                           f'{process_env.replay_speed}x' if process_env.replay_speed
+                           else 'full speed')
+        replay_clock = clock.SimulatedClock(replay_trace.start, replay_trace.end,
+                                            process_env.replay_speed)
+        # Replay every recorded source, unless SOURCES picks some
+        environ = dict(os.environ)
+        environ.setdefault('SOURCES', ','.join(source.name.lower()
+                                               for source in replay_trace.sources))
+        application = StatusLight(environ, replay_trace=replay_trace, status_clock=replay_clock)
+        replay_clock.on_end = application.stop
+    # Fleet mode runs one profile per user in this process
+    elif fleet_config != '':
+        profiles = fleet.load_profiles(fleet_config, os.environ)
+        if not profiles:
+            global_logger.error('Failed to load fleet profiles from %s!', fleet_config)
+            sys.exit(1)
+        application = Fleet(fleet_config, profiles)
+    else:
+        application = StatusLight()
+
+    application.init()
+
+    metrics_server = None
+    if process_env.metrics_port != 0:
+        metrics_server = metrics.start_server(process_env.metrics_address,
+                                              process_env.metrics_port)
+
+    push_server = None
+    if process_env.push_port != 0 and process_env.replay_file == '':
+        push_server = push.start_server(process_env.push_address, process_env.push_port,
+                                        process_env.webex_webhook_secret,
+                                        process_env.slack_signing_secret,
+                                        process_env.push_secret,
+                                        process_env.google_webhook_secret)
+
+    decision_server = None
+    if process_env.decision_socket != '':
+        decision_server = decisions.start_server(process_env.decision_socket)
+
+    application.run()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    if push_server is not None:
+        push_server.shutdown()
+    if decision_server is not None:
+        decisions.stop_server(decision_server)
+
+    # The replay's results are the point, so they're printed regardless of LOGLEVEL
+    if isinstance(application, StatusLight) and isinstance(application.light,
+                                                           replay.ReplayLight):
+        for key, value in application.light.get_summary().items():
+            print(f'{key}: {value}')
     global_logger.info('Shutdown')
 
 
@@ -0,0 +1,63 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Replay Light Target for trace replays
+"""
+
+import logging
+
+from targets.virtual import VirtualLight
+from utility import clock, enum
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayLight(VirtualLight):
+    """Virtual light target that counts device writes and the (simulated) time spent
+    in each color, so that policies replayed against the same trace can be compared.
+    """
+
+    def __init__(self, light_clock: clock.Clock):
+        """Args:
+            light_clock: The clock the replay runs on
+        """
+        self.clock = light_clock
+        self.writes: int = 0
+        self.state: str = 'off'
+        self.state_since: float = light_clock.monotonic()
+        self.state_seconds: dict[str, float] = {}
+
+    def set_color(self, color: str, brightness: int) -> bool:
+        """Set the virtual light, counting the write."""
+        return_value = super().set_color(color, brightness)
+        if return_value:
+            self._enter(color)
+        return return_value
+
+    def turn_off(self) -> bool:
+        """Turn the virtual light off, counting the write."""
+        return_value = super().turn_off()
+        self._enter('off')
+        return return_value
+
+    def get_summary(self) -> dict[str, int]:
+        """Returns the number of device writes, and the whole seconds spent in each color,
+        longest first."""
+        self._enter(self.state, count=False)
+        summary = {'writes': self.writes}
+        for state, seconds in sorted(self.state_seconds.items(), key=lambda item: -item[1]):
+            # Name the default colors, e.g. `red` rather than `ff0000`
+            name = state if state == 'off' else enum.Color(state).name.lower()
+            summary[(state if name == 'unknown' else name) + '_seconds'] = round(seconds)
+        return summary
+
+    def _enter(self, state: str, count: bool = True):
+        """Internal Helper Method to end the current state and start `state`."""
+        now = self.clock.monotonic()
+        self.state_seconds[self.state] = self.state_seconds.get(self.state, 0.0) + \
+            now - self.state_since
+        self.state = state
+        self.state_since = now
+        if count:
+            self.writes += 1
@@ -14,6 +14,7 @@ import tuyaface
 
 # Project imports
 from targets.base import LightTarget
+from utility import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -110,6 +111,7 @@ class TuyaLight(LightTarget):
                 logger.warning('Exception sending to Tuya device, will retry %s more times: %s',
                                (retry - count), ex)
                 count = count + 1
+                metrics.TUYA_RETRIES.inc()
                 time.sleep(1)
 
         # Still some strangeness; reusing the built-in connection in the "tuyaface" key
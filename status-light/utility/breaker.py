@@ -0,0 +1,100 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Per-Source Circuit Breaker
+"""
+
+# Standard imports
+import logging
+import random
+
+# Project imports
+from utility import enum
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Tracks consecutive failures of a single status source.
+
+    After `failure_threshold` consecutive failures the circuit opens, and the source
+    is not polled again until an exponentially increasing, jittered backoff has passed.
+    The next poll after that is a single half-open probe: success closes the circuit,
+    failure re-opens it with a longer backoff. While the circuit is not closed, the
+    source's last good status is served in its place, until it is older than
+    `stale_seconds`. All times are `time.monotonic()` seconds.
+    """
+
+    def __init__(self, source: enum.StatusSource, base_backoff: int,
+                 failure_threshold: int = 3, max_backoff: int = 300, stale_seconds: int = 300):
+        """Args:
+            source: The StatusSource this breaker protects, used for logging
+            base_backoff: The shortest backoff, in seconds, once the circuit first opens;
+                jitter stretches each backoff by up to as long again
+            failure_threshold: Consecutive failures before the circuit opens
+            max_backoff: The upper limit, in seconds, of the backoff
+            stale_seconds: How long, in seconds, the last good status may be served
+        """
+        self.source = source
+        self.base_backoff = base_backoff
+        self.failure_threshold = failure_threshold
+        self.max_backoff = max_backoff
+        self.stale_seconds = stale_seconds
+
+        self.state: enum.CircuitState = enum.CircuitState.CLOSED
+        self.failures: int = 0
+        self.retry_at: float = 0.0
+        self.last_good: enum.Status = enum.Status.UNKNOWN
+        self.last_good_time: float | None = None
+
+    def allow_request(self, now: float) -> bool:
+        """Returns True if the source may be polled at `now`.
+
+        An open circuit whose backoff has passed moves to half-open and allows one probe."""
+        if self.state is enum.CircuitState.OPEN:
+            if now < self.retry_at:
+                return False
+            logger.info('%s circuit half-open, probing', self.source.name.capitalize())
+            self.state = enum.CircuitState.HALF_OPEN
+        return True
+
+    def record_success(self, status: enum.Status, now: float):
+        """Records a successful poll and closes the circuit."""
+        if self.state is not enum.CircuitState.CLOSED:
+            logger.info('%s circuit closed after %d failure(s)',
+                        self.source.name.capitalize(), self.failures)
+        self.state = enum.CircuitState.CLOSED
+        self.failures = 0
+        self.last_good = status
+        self.last_good_time = now
+
+    def record_failure(self, now: float):
+        """Records a failed poll, opening the circuit once the threshold is reached."""
+        self.failures += 1
+        if self.state is enum.CircuitState.CLOSED and self.failures < self.failure_threshold:
+            logger.debug('%s failure %d of %d before opening circuit',
+                         self.source.name.capitalize(), self.failures, self.failure_threshold)
+            return
+
+        # Double the backoff for every failure past the threshold, then apply "equal jitter"
+        # so that several failing sources (or instances) don't retry in lockstep: the wait is
+        # between the backoff and twice it, or between half of `max_backoff` and all of it
+        exponent = min(self.failures - self.failure_threshold, 16)
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** (exponent + 1))
+        backoff = random.uniform(backoff / 2, backoff)
+        self.retry_at = now + backoff
+
+        if self.state is enum.CircuitState.CLOSED:
+            logger.warning('%s circuit opened after %d failure(s), retrying in %.0fs',
+                           self.source.name.capitalize(), self.failures, backoff)
+        else:
+            logger.warning('%s still failing (%d failure(s)), retrying in %.0fs',
+                           self.source.name.capitalize(), self.failures, backoff)
+        self.state = enum.CircuitState.OPEN
+
+    def fallback(self, now: float) -> enum.Status:
+        """Returns the last good status if it is still fresh enough, otherwise UNKNOWN."""
+        if self.last_good_time is not None and now - self.last_good_time <= self.stale_seconds:
+            return self.last_good
+        return enum.Status.UNKNOWN
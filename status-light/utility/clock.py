@@ -0,0 +1,101 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Real and Simulated Clocks
+"""
+
+# Standard imports
+from datetime import datetime, timedelta, tzinfo
+import logging
+import threading
+import time
+from typing import Callable
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class Clock:
+    """Tells the time and waits, using the real time.
+
+    Everything that decides *when* something happens (active hours, calendar
+    lookahead windows, poll scheduling, debouncing and the wait between loop
+    iterations) asks a clock rather than the `datetime` and `time` modules, so a
+    `SimulatedClock` can stand in for it. Durations that are only measured for
+    logging and metrics keep using the real time."""
+
+    def now(self, tz: tzinfo | None = None) -> datetime:
+        """Returns the current time, like `datetime.now(tz)`."""
+        return datetime.now(tz)
+
+    def monotonic(self) -> float:
+        """Returns the current time in seconds, like `time.monotonic()`."""
+        return time.monotonic()
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        """Waits until `event` is set, or `timeout` seconds have passed.
+
+        Returns True if the event was set, like `threading.Event.wait`."""
+        return event.wait(timeout)
+
+
+class SimulatedClock(Clock):
+    """Runs simulated time from `start`, `speed` times faster than real time.
+
+    At a speed of 0, every wait completes immediately, so simulated time runs as fast
+    as the application can keep up. Once simulated time reaches `end`, `on_end` is
+    called (e.g. to stop the main loop) and every further wait returns immediately."""
+
+    def __init__(self, start: datetime, end: datetime | None = None, speed: float = 0,
+                 on_end: Callable[[], None] | None = None):
+        """Args:
+            start: The timezone-aware time at which the simulation starts
+            end: The timezone-aware time at which the simulation ends, if any
+            speed: How many times faster than real time to run, or 0 for no limit
+            on_end: Called once, when simulated time reaches `end`
+        """
+        self.start = start
+        self.end = end
+        self.speed = speed
+        self.on_end = on_end
+        self.elapsed: float = 0.0
+        self.finished: bool = False
+
+    def now(self, tz: tzinfo | None = None) -> datetime:
+        current = self.start + timedelta(seconds=self.elapsed)
+        if tz is None:
+            # Like `datetime.now()`, a naive local time
+            return current.astimezone().replace(tzinfo=None)
+        return current.astimezone(tz)
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        if self.finished:
+            return True
+
+        if self.end is not None:
+            timeout = min(timeout, (self.end - self.start).total_seconds() - self.elapsed)
+        if self.speed > 0:
+            wait_start = time.monotonic()
+            interrupted = event.wait(timeout / self.speed)
+            self.elapsed += (time.monotonic() - wait_start) * self.speed if interrupted \
+                else timeout
+        else:
+            interrupted = event.is_set()
+            if not interrupted:
+                self.elapsed += timeout
+
+        if self.end is not None and self.elapsed >= (self.end - self.start).total_seconds():
+            logger.debug('Simulation reached %s', self.end.isoformat())
+            self.finished = True
+            if self.on_end is not None:
+                self.on_end()
+            return True
+        return interrupted
+
+
+# The real clock, shared by everything not running on a simulated one, so that sources
+# configured alike (e.g. by several fleet profiles) also compare alike
+REAL_CLOCK: Clock = Clock()
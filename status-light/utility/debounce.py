@@ -0,0 +1,87 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Status Debouncing and Hysteresis
+"""
+
+# Standard imports
+import logging
+
+# Project imports
+from utility import enum
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class StatusDebouncer:
+    """Sits between status selection and the light, suppressing short flaps.
+
+    A new status only replaces the one on the light once it has been selected for
+    `samples` consecutive polls, and the current status has been shown for at least
+    `dwell_seconds`. Statuses in `exempt_status` (e.g. a call) always take effect
+    immediately, as does the first status after a reset. All times are
+    `time.monotonic()` seconds.
+    """
+
+    def __init__(self, samples: int = 1, dwell_seconds: int = 0,
+                 exempt_status: list[enum.Status] | None = None):
+        """Args:
+            samples: Consecutive polls that must agree on a new status before it is shown
+            dwell_seconds: Minimum time, in seconds, to show a status before changing it
+            exempt_status: Statuses that are shown immediately, regardless of the above
+        """
+        self.samples = samples
+        self.dwell_seconds = dwell_seconds
+        self.exempt_status = exempt_status or []
+
+        self.stable: enum.Status = enum.Status.UNKNOWN
+        self.stable_since: float | None = None
+        self.candidate: enum.Status | None = None
+        self.candidate_samples: int = 0
+
+    def reset(self):
+        """Forgets the current status, so that the next one is shown immediately."""
+        self.stable = enum.Status.UNKNOWN
+        self.stable_since = None
+        self.candidate = None
+        self.candidate_samples = 0
+
+    def update(self, status: enum.Status, now: float, new_sample: bool = True) -> enum.Status:
+        """Offers the newly selected `status`, and returns the status to show.
+
+        Pass `new_sample=False` when no source was polled since the last call, so that
+        re-evaluating the same data doesn't count towards `samples`."""
+        if status == self.stable and self.stable_since is not None:
+            if self.candidate is not None:
+                logger.debug('Ignored a flap to %s', self.candidate.name.lower())
+            self.candidate = None
+            self.candidate_samples = 0
+            return self.stable
+
+        if status != self.candidate:
+            self.candidate = status
+            self.candidate_samples = 1
+        elif new_sample:
+            self.candidate_samples += 1
+
+        if self.stable_since is None or status in self.exempt_status or \
+                (self.candidate_samples >= self.samples and
+                 now >= self.stable_since + self.dwell_seconds):
+            self.stable = status
+            self.stable_since = now
+            self.candidate = None
+            self.candidate_samples = 0
+        else:
+            # 74: Log enums as names, not values
+            logger.debug('Holding %s; %s seen %d of %d time(s)', self.stable.name.lower(),
+                         status.name.lower(), self.candidate_samples, self.samples)
+        return self.stable
+
+    def next_decision(self) -> float | None:
+        """Returns when a pending status that has enough samples may be shown,
+        or None if nothing is waiting on the dwell time."""
+        if self.candidate is None or self.stable_since is None or \
+                self.candidate_samples < self.samples:
+            return None
+        return self.stable_since + self.dwell_seconds
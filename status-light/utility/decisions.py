@@ -0,0 +1,238 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Decision Log and Inspection Socket
+
+Run `python -m utility.decisions` from the Status-Light directory to print the most
+recent decisions of a running Status-Light.
+"""
+
+# Standard imports
+import argparse
+from collections import deque
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+# Project imports
+from utility import enum
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Each profile's decision log, by profile name (`default` outside of fleet mode)
+_logs: dict[str, 'DecisionLog'] = {}
+_logs_lock = threading.Lock()
+
+
+class DecisionLog:
+    """Keeps the main loop's most recent decisions in a fixed-size ring buffer.
+
+    Recording a decision only stores a tuple of the values the loop already has at hand;
+    they're formatted when the log is queried, so it costs next to nothing to keep it on
+    at any log level."""
+
+    def __init__(self, size: int):
+        """Args:
+            size: The number of decisions to keep; the oldest are dropped first
+        """
+        self.size = size
+        self._records: deque[tuple] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, timestamp: float,
+               sources: tuple[tuple[enum.StatusSource, enum.Status, float | None,
+                                    enum.CircuitState], ...],
+               selected: enum.Status, winner: enum.StatusSource, shown: enum.Status,
+               color: str | None, transition: bool | None):
+        """Records one iteration of the main loop.
+
+        Args:
+            timestamp: When the decision was made, as a POSIX timestamp
+            sources: Each source's status, poll latency in seconds (None if its cached
+                status was used) and circuit state
+            selected: The status selected from the sources
+            winner: The source of the selected status
+            shown: The status shown after debouncing
+            color: The color the light was set to, or None if it's off or unknown
+            transition: Whether the light was set successfully, or None if it wasn't set
+        """
+        with self._lock:
+            self._records.append((timestamp, sources, selected, winner, shown, color,
+                                  transition))
+
+    def resize(self, size: int):
+        """Changes the number of decisions kept, keeping the most recent ones."""
+        with self._lock:
+            if size != self.size:
+                self.size = size
+                self._records = deque(self._records, maxlen=size)
+
+    def get_records(self, count: int | None = None) -> list[dict]:
+        """Returns the `count` most recent decisions (or all of them), oldest first."""
+        with self._lock:
+            records = list(self._records)
+        if count is not None:
+            records = records[-count:] if count > 0 else []
+        return [_format_record(record) for record in records]
+
+
+def _format_record(record: tuple) -> dict:
+    """Internal Helper Method to turn a recorded decision into a JSON-friendly dict."""
+    timestamp, sources, selected, winner, shown, color, transition = record
+    return {
+        'time': datetime.fromtimestamp(timestamp, timezone.utc).isoformat(
+            timespec='milliseconds'),
+        'sources': {source.name.lower(): {
+            'status': status.name.lower(),
+            'latency_ms': None if latency is None else round(latency * 1000, 1),
+            'circuit': circuit.name.lower()
+        } for source, status, latency, circuit in sources},
+        'selected': selected.name.lower(),
+        'winner': winner.name.lower(),
+        'shown': shown.name.lower(),
+        'color': color,
+        'transition': None if transition is None else
+                      'success' if transition else 'failure'
+    }
+
+
+def get_log(profile: str, size: int) -> DecisionLog | None:
+    """Returns the decision log for `profile`, creating or resizing it as needed.
+
+    Returns None, and forgets any existing log, if `size` is 0."""
+    with _logs_lock:
+        if size == 0:
+            _logs.pop(profile, None)
+            return None
+        if profile not in _logs:
+            _logs[profile] = DecisionLog(size)
+        else:
+            _logs[profile].resize(size)
+        return _logs[profile]
+
+
+def remove_log(profile: str):
+    """Forgets the decision log for `profile`, e.g. when a fleet profile is removed."""
+    with _logs_lock:
+        _logs.pop(profile, None)
+
+
+def query(count: int | None = None, profile: str | None = None) -> list[dict]:
+    """Returns the `count` most recent decisions of `profile` (or of every profile),
+    each with a `profile` key, oldest first."""
+    with _logs_lock:
+        logs = dict(_logs)
+    records = []
+    for name, decision_log in logs.items():
+        if profile is None or name == profile:
+            records.extend(dict(record, profile=name)
+                           for record in decision_log.get_records(count))
+    records.sort(key=lambda record: record['time'])
+    return records
+
+
+class _DecisionHandler(socketserver.StreamRequestHandler):
+    """Answers a query line of `[count] [profile]` with one JSON decision per line."""
+
+    # Don't let an idle client hold a thread forever
+    timeout = 5
+
+    def handle(self):
+        """Handles a query."""
+        try:
+            fields = self.rfile.readline(256).decode().split()
+            count = int(fields[0]) if fields else None
+            profile = fields[1] if len(fields) > 1 else None
+        except (ValueError, UnicodeDecodeError, OSError):
+            self.wfile.write(b'{"error": "expected a line of [count] [profile]"}\n')
+            return
+        for record in query(count, profile):
+            self.wfile.write((json.dumps(record) + '\n').encode())
+
+
+class _DecisionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves the decision logs on a Unix socket, removing it on shutdown."""
+    daemon_threads = True
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.remove(self.server_address)  # type: ignore
+        except OSError:
+            pass
+
+
+def start_server(path: str) -> socketserver.BaseServer | None:
+    """Serves the decision logs on the Unix socket `path` from a background thread.
+
+    The socket is only accessible to the user Status-Light runs as. Returns the server,
+    so it can be shut down, or None on error."""
+    path = os.path.expanduser(path)
+    try:
+        # A previous run that didn't stop cleanly leaves its socket behind
+        if os.path.exists(path):
+            os.remove(path)
+        server = _DecisionServer(path, _DecisionHandler)
+        os.chmod(path, 0o600)
+        threading.Thread(target=server.serve_forever, name='status-light-decisions',
+                         daemon=True).start()
+        logger.info('Serving decisions on %s', path)
+        return server
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.warning('Exception while starting the decision server: %s', ex)
+        logger.exception(ex)
+        return None
+
+
+def stop_server(server: socketserver.BaseServer):
+    """Stops a server started by `start_server`, and removes its socket."""
+    server.shutdown()
+    server.server_close()
+
+
+def main():
+    """Prints the most recent decisions of a running Status-Light."""
+    parser = argparse.ArgumentParser(
+        description='Prints the most recent decisions of a running Status-Light.')
+    parser.add_argument('--socket', default=os.environ.get('DECISION_SOCKET', ''),
+                        help='the DECISION_SOCKET of the running Status-Light '
+                             '(default: $DECISION_SOCKET)')
+    parser.add_argument('--count', type=int, default=20,
+                        help='number of decisions to print per profile (default: 20)')
+    parser.add_argument('--profile', help='only print decisions of this fleet profile')
+    parser.add_argument('--json', action='store_true', help='print one JSON object per line')
+    args = parser.parse_args()
+    if args.socket == '':
+        parser.error('DECISION_SOCKET is not set; pass --socket')
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(5)
+        client.connect(os.path.expanduser(args.socket))
+        client.sendall(f'{args.count} {args.profile or ""}\n'.encode())
+        with client.makefile('r', encoding='utf-8') as response:
+            for line in response:
+                if args.json:
+                    print(line, end='')
+                    continue
+                record = json.loads(line)
+                if 'error' in record:
+                    sys.exit(record['error'])
+                sources = ' '.join(
+                    f'{name}={source["status"]}'
+                    f'({"cached" if source["latency_ms"] is None else source["latency_ms"]}'
+                    f'{"" if source["circuit"] == "closed" else ", " + source["circuit"]})'
+                    for name, source in record['sources'].items())
+                print(f'{record["time"]} {record["profile"]} {sources} '
+                      f'-> {record["selected"]} ({record["winner"]}) '
+                      f'shown={record["shown"]} color={record["color"] or "off"} '
+                      f'transition={record["transition"] or "-"}')
+
+
+if __name__ == '__main__':
+    main()
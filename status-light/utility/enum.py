@@ -97,6 +97,19 @@ class Weekday(enum.IntEnum):
         return cls.UNKNOWN
 
 
+class CircuitState(enum.IntEnum):
+    """Source Circuit Breaker States"""
+    UNKNOWN = 0
+
+    CLOSED = enum.auto()
+    OPEN = enum.auto()
+    HALF_OPEN = enum.auto()
+
+    @classmethod
+    def _missing_(cls, value):
+        return cls.UNKNOWN
+
+
 class LogLevel(enum.IntEnum):
     """Log Levels"""
     CRITICAL = 50
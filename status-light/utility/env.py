@@ -6,13 +6,17 @@ Environment Variable Management
 """
 
 # Standard imports
+from collections.abc import Mapping
 from datetime import datetime, time
 import json
 import os
 import logging
+import re
 
 # Project imports
 from utility import enum
+from utility import matcher
+from utility import precedence
 from utility import util
 
 logger = logging.getLogger(__name__)
@@ -20,6 +24,9 @@ logger = logging.getLogger(__name__)
 
 class Environment:
     """Represents a structured set of environment variables passed to the application."""
+    # The variables to read; defaults to the process environment
+    environ: Mapping[str, str] = os.environ
+
     tuya_device: dict = {}
     light_brightness: int = 50  # Percentage (0-100)
 
@@ -28,12 +35,14 @@ class Environment:
     selected_sources: list[enum.StatusSource] = [
         enum.StatusSource.WEBEX, enum.StatusSource.OFFICE365]
 
-    webex_person_id: str = ''
+    webex_person_ids: list[str] = []
     webex_bot_id: str = ''
 
     # 48 - Add Slack Support
     slack_user_id: str = ''
     slack_bot_token: str = ''
+    # Optional, enables Socket Mode
+    slack_app_token: str = ''
     # 66 - Add Slack custom status support
     slack_off_status: list[str] = [
         ':no_entry: Out of Office', ':airplane:', ':palm_tree: Vacationing']
@@ -41,15 +50,25 @@ class Environment:
     slack_scheduled_status: list[str] = [':spiral_calendar_pad: In a meeting']
     slack_busy_status: list[str] = [
         ':no_entry_sign:', ':no_entry: Do not Disturb']
+    # Which custom status rules win when several match, highest first
+    slack_status_priority: list[str] = list(matcher.CATEGORIES)
 
     office_app_id: str = ''
     office_app_secret: str = ''
     office_token_store: str = '~'
+    office_cache_window: int = 480
+    office_cache_lifetime: int = 15
 
     # 47 - Add Google support
     # This is the relative path from status-light.py
     google_credential_store: str = './utility/api/calendar/google'
     google_token_store: str = '~'
+    google_calendar_ids: list[str] = ['primary']
+    # `freebusy` queries busy times; `sync` keeps a local copy of the calendars' events
+    google_mode: str = 'freebusy'
+    google_webhook_url: str = ''
+    google_cache_window: int = 480
+    google_cache_lifetime: int = 15
 
     # ICS Calendar support
     ics_url: str = ''
@@ -95,13 +114,69 @@ class Environment:
     # 22 - Make sleep timeout configurable
     sleep_seconds: int = 5
 
+    # Per-source poll intervals
+    calendar_poll_seconds: int = 60
+    source_poll_seconds: dict[enum.StatusSource, int] = {}
+
+    # Per-source circuit breakers
+    circuit_threshold: int = 3
+    circuit_max_backoff_seconds: int = 300
+    circuit_stale_seconds: int = 300
+
+    # Status debouncing
+    debounce_samples: int = 1
+    debounce_dwell_seconds: int = 0
+    debounce_exempt_status: list[enum.Status] = [enum.Status.CALL,
+                                                 enum.Status.PRESENTING]
+
+    # Per-source poll deadlines
+    poll_timeout_seconds: int = 10
+    source_timeouts: dict[enum.StatusSource, int] = {}
+
     # 23 - Make logging level configurable
     log_level: enum.LogLevel = enum.LogLevel.INFO
 
+    # Metrics endpoint, disabled by default
+    metrics_address: str = '127.0.0.1'
+    metrics_port: int = 0
+
+    # Pushed events, received over HTTP, disabled by default
+    push_address: str = '127.0.0.1'
+    push_port: int = 0
+    push_secret: str = ''
+    webex_webhook_secret: str = ''
+    slack_signing_secret: str = ''
+    google_webhook_secret: str = ''
+    # How often sources that push their status are still polled, just in case
+    push_poll_seconds: int = 300
+
+    # The HTTP connection pools shared by every source
+    http_pool_size: int = 4
+    http_pool_hosts: int = 32
+    http_timeout_seconds: int = 30
+    http2: bool = False
+
+    # Recent decisions, kept in memory and served on a Unix socket, if set
+    decision_log_size: int = 1000
+    decision_socket: str = ''
+
+    # Warm restart state snapshot, disabled by default
+    state_file: str = ''
+    state_max_age_seconds: int = 300
+
+    # Status trace recording, and replay, both disabled by default
+    trace_file: str = ''
+    replay_file: str = ''
+    replay_speed: int = 0
+
+    def __init__(self, environ: Mapping[str, str] | None = None):
+        if environ is not None:
+            self.environ = environ
+
     def get_sources(self) -> bool:
         """Retrieves and validates the `SOURCES` variable."""
         # 32 - SOURCES variable default is wrong
-        self.selected_sources = util.parse_enum_list(os.environ.get('SOURCES'),  # type: ignore
+        self.selected_sources = util.parse_enum_list(self.environ.get('SOURCES'),  # type: ignore
                                                      enum.StatusSource, 'SOURCES',
                                                      self.selected_sources)
         return_value = None is not self.selected_sources
@@ -117,7 +192,7 @@ class Environment:
         try:
             # 30: This variable could contain secrets
             self.tuya_device = json.loads(
-                util.get_env_or_secret('TUYA_DEVICE', ''))
+                util.get_env_or_secret('TUYA_DEVICE', '', environ=self.environ))
         except json.decoder.JSONDecodeError as ex:
             logger.warning('Exception while getting Tuya device: %s', ex)
             logger.exception(ex)
@@ -131,8 +206,8 @@ class Environment:
 
         # 41: Replace decorator with utility function
         # Support both LIGHT_BRIGHTNESS and TUYA_BRIGHTNESS (backward compatibility)
-        brightness_value = os.environ.get('LIGHT_BRIGHTNESS',
-                                          os.environ.get('TUYA_BRIGHTNESS', ''))
+        brightness_value = self.environ.get('LIGHT_BRIGHTNESS',
+                                            self.environ.get('TUYA_BRIGHTNESS', ''))
         raw_brightness = util.try_parse_int(brightness_value, self.light_brightness)
 
         # Auto-detect legacy 0-255 format and convert to percentage
@@ -155,59 +230,128 @@ class Environment:
     def get_webex(self) -> bool:
         """Retrieves and validates the `WEBEX_*` variables."""
         # 30: This variable could contain secrets
-        self.webex_person_id = util.get_env_or_secret('WEBEX_PERSONID', '')
+        # One or more people, separated by commas
+        self.webex_person_ids = [person_id.strip() for person_id in util.parse_str_array(
+            util.get_env_or_secret('WEBEX_PERSONID', '', environ=self.environ), [])
+            if person_id.strip() != '']
         # 30: This variable could contain secrets
-        self.webex_bot_id = util.get_env_or_secret('WEBEX_BOTID', '')
-        return ('' not in [self.webex_person_id, self.webex_bot_id])
+        self.webex_bot_id = util.get_env_or_secret('WEBEX_BOTID', '', environ=self.environ)
+        return self.webex_person_ids != [] and self.webex_bot_id != ''
 
     def get_slack(self) -> bool:
         """Retrieves and validates the `SLACK_*` variables."""
         # 30: This variable could contain secrets
-        self.slack_user_id = util.get_env_or_secret('SLACK_USER_ID', '')
+        self.slack_user_id = util.get_env_or_secret('SLACK_USER_ID', '', environ=self.environ)
+        # 30: This variable could contain secrets
+        self.slack_bot_token = util.get_env_or_secret('SLACK_BOT_TOKEN', '', environ=self.environ)
         # 30: This variable could contain secrets
-        self.slack_bot_token = util.get_env_or_secret('SLACK_BOT_TOKEN', '')
+        self.slack_app_token = util.get_env_or_secret('SLACK_APP_TOKEN', '', environ=self.environ)
         # 66: Support Slack custom statuses
         # NOTE: Since these are all optional, and at least one defaults to '',
         # they should not be checked in the return statement
+        # Rules are casefolded when they're compiled, except regexes, which ignore case
         self.slack_available_status = util.parse_str_array(
-            os.environ.get('SLACK_AVAILABLE_STATUS', ''),
-            self.slack_available_status, casefold=True)
+            self.environ.get('SLACK_AVAILABLE_STATUS', ''), self.slack_available_status)
         self.slack_busy_status = util.parse_str_array(
-            os.environ.get('SLACK_BUSY_STATUS', ''),
-            self.slack_busy_status, casefold=True)
+            self.environ.get('SLACK_BUSY_STATUS', ''), self.slack_busy_status)
         self.slack_off_status = util.parse_str_array(
-            os.environ.get('SLACK_OFF_STATUS', ''),
-            self.slack_off_status, casefold=True)
+            self.environ.get('SLACK_OFF_STATUS', ''), self.slack_off_status)
         self.slack_scheduled_status = util.parse_str_array(
-            os.environ.get('SLACK_SCHEDULED_STATUS', ''),
-            self.slack_scheduled_status, casefold=True)
+            self.environ.get('SLACK_SCHEDULED_STATUS', ''), self.slack_scheduled_status)
+        # Any categories not listed follow the listed ones, in their default order
+        priority = [category.strip() for category in util.parse_str_array(
+            self.environ.get('SLACK_STATUS_PRIORITY', ''), self.slack_status_priority,
+            casefold=True)]
+        if not set(priority) <= set(matcher.CATEGORIES) or len(set(priority)) != len(priority):
+            logger.warning('SLACK_STATUS_PRIORITY must list each of %s at most once!',
+                           ', '.join(matcher.CATEGORIES))
+            return False
+        self.slack_status_priority = priority + [category for category in matcher.CATEGORIES
+                                                 if category not in priority]
+        # Check the rules now, so an invalid regex is caught while loading the config
+        for category in matcher.CATEGORIES:
+            try:
+                for rule in getattr(self, f'slack_{category}_status'):
+                    matcher.compile_rule(rule)
+            except re.error as ex:
+                logger.warning('SLACK_%s_STATUS contains an invalid regex: %s',
+                               category.upper(), ex)
+                return False
+        # And compile them together, as the Slack source will
+        try:
+            matcher.compile_rules(tuple(
+                (category, enum.Status.UNKNOWN, tuple(getattr(self, f'slack_{category}_status')))
+                for category in self.slack_status_priority))
+        except re.error as ex:
+            logger.warning('The Slack custom status rules could not be compiled: %s', ex)
+            return False
         return ('' not in [self.slack_user_id, self.slack_bot_token])
 
     def get_office(self) -> bool:
         """Retrieves and validates the `O365_*` variables."""
         # 30: This variable could contain secrets
-        self.office_app_id = util.get_env_or_secret('O365_APPID', '')
+        self.office_app_id = util.get_env_or_secret('O365_APPID', '', environ=self.environ)
         # 30: This variable could contain secrets
-        self.office_app_secret = util.get_env_or_secret('O365_APPSECRET', '')
-        self.office_token_store = os.environ.get('O365_TOKENSTORE', self.office_token_store)
+        self.office_app_secret = util.get_env_or_secret('O365_APPSECRET', '',
+                                                        environ=self.environ)
+        self.office_token_store = self.environ.get('O365_TOKENSTORE', self.office_token_store)
+        self.office_cache_window = util.try_parse_int(
+            self.environ.get('O365_CACHEWINDOW', ''),
+            self.office_cache_window)
+        # Validate the cache window is within 1-24 hours
+        if self.office_cache_window < 60 or self.office_cache_window > 1440:
+            logger.warning('O365_CACHEWINDOW must be between 60 and 1440 minutes!')
+            self.office_cache_window = 480
+        self.office_cache_lifetime = util.try_parse_int(
+            self.environ.get('O365_CACHELIFETIME', ''),
+            self.office_cache_lifetime)
+        # Validate cache lifetime is within 1-60 minutes
+        if self.office_cache_lifetime < 1 or self.office_cache_lifetime > 60:
+            logger.warning('O365_CACHELIFETIME must be between 1 and 60 minutes!')
+            self.office_cache_lifetime = 15
         return ('' not in [self.office_app_id, self.office_app_secret, self.office_token_store])
 
     # 47: Add Google support
     def get_google(self) -> bool:
         """Retrieves and validates the `GOOGLE_*` variables."""
-        self.google_credential_store = os.environ.get('GOOGLE_CREDENTIALSTORE',
-                                                      self.google_credential_store)
-        self.google_token_store = os.environ.get('GOOGLE_TOKENSTORE',
-                                                 self.google_token_store)
-        return ('' not in [self.google_credential_store, self.google_token_store])
+        self.google_credential_store = self.environ.get('GOOGLE_CREDENTIALSTORE',
+                                                        self.google_credential_store)
+        self.google_token_store = self.environ.get('GOOGLE_TOKENSTORE',
+                                                   self.google_token_store)
+        # One or more calendars, separated by commas
+        self.google_calendar_ids = [calendar_id.strip() for calendar_id in util.parse_str_array(
+            self.environ.get('GOOGLE_CALENDARS', ''), self.google_calendar_ids)
+            if calendar_id.strip() != '']
+        self.google_cache_window = util.try_parse_int(
+            self.environ.get('GOOGLE_CACHEWINDOW', ''),
+            self.google_cache_window)
+        # Validate the cache window is within 1-24 hours
+        if self.google_cache_window < 60 or self.google_cache_window > 1440:
+            logger.warning('GOOGLE_CACHEWINDOW must be between 60 and 1440 minutes!')
+            self.google_cache_window = 480
+        self.google_cache_lifetime = util.try_parse_int(
+            self.environ.get('GOOGLE_CACHELIFETIME', ''),
+            self.google_cache_lifetime)
+        # Validate cache lifetime is within 1-60 minutes
+        if self.google_cache_lifetime < 1 or self.google_cache_lifetime > 60:
+            logger.warning('GOOGLE_CACHELIFETIME must be between 1 and 60 minutes!')
+            self.google_cache_lifetime = 15
+        self.google_mode = self.environ.get('GOOGLE_MODE', self.google_mode).strip().lower()
+        if self.google_mode not in ('freebusy', 'sync'):
+            logger.warning('GOOGLE_MODE must be "freebusy" or "sync"!')
+            return False
+        self.google_webhook_url = self.environ.get('GOOGLE_WEBHOOK_URL',
+                                                   self.google_webhook_url).strip()
+        return ('' not in [self.google_credential_store, self.google_token_store] and
+                self.google_calendar_ids != [])
 
     def get_ics(self) -> bool:
         """Retrieves and validates the `ICS_*` variables."""
         # ICS_URL is required and may contain secrets
-        self.ics_url = util.get_env_or_secret('ICS_URL', '')
-        self.ics_cache_store = os.environ.get('ICS_CACHESTORE', self.ics_cache_store)
+        self.ics_url = util.get_env_or_secret('ICS_URL', '', environ=self.environ)
+        self.ics_cache_store = self.environ.get('ICS_CACHESTORE', self.ics_cache_store)
         self.ics_cache_lifetime = util.try_parse_int(
-            os.environ.get('ICS_CACHELIFETIME', ''),
+            self.environ.get('ICS_CACHELIFETIME', ''),
             self.ics_cache_lifetime)
         # Validate cache lifetime is within 5-60 minutes
         if self.ics_cache_lifetime < 5 or self.ics_cache_lifetime > 60:
@@ -217,7 +361,7 @@ class Environment:
 
     def get_target(self) -> bool:
         """Retrieves and validates the `TARGET` variable."""
-        self.target = os.environ.get('TARGET', self.target).lower()
+        self.target = self.environ.get('TARGET', self.target).lower()
         if self.target not in ('tuya', 'virtual'):
             logger.warning('TARGET must be "tuya" or "virtual"!')
             return False
@@ -225,26 +369,26 @@ class Environment:
 
     def get_colors(self) -> bool:
         """Retrieves and validates the `*_COLOR` variables."""
-        self.available_color = util.parse_color(os.environ.get('AVAILABLE_COLOR', ''),
+        self.available_color = util.parse_color(self.environ.get('AVAILABLE_COLOR', ''),
                                                 self.available_color)
-        self.scheduled_color = util.parse_color(os.environ.get('SCHEDULED_COLOR', ''),
+        self.scheduled_color = util.parse_color(self.environ.get('SCHEDULED_COLOR', ''),
                                                 self.scheduled_color)
-        self.busy_color = util.parse_color(os.environ.get('BUSY_COLOR', ''),
+        self.busy_color = util.parse_color(self.environ.get('BUSY_COLOR', ''),
                                            self.busy_color)
         return ('' not in [self.available_color, self.scheduled_color, self.busy_color])
 
     def get_status(self) -> bool:
         """Retrieves and validates the `*_STATUS` variables."""
-        self.off_status = util.parse_enum_list(os.environ.get('OFF_STATUS', ''),
+        self.off_status = util.parse_enum_list(self.environ.get('OFF_STATUS', ''),
                                                enum.Status, 'OFF_STATUS',
                                                self.off_status)  # type: ignore
-        self.available_status = util.parse_enum_list(os.environ.get('AVAILABLE_STATUS', ''),
+        self.available_status = util.parse_enum_list(self.environ.get('AVAILABLE_STATUS', ''),
                                                      enum.Status, 'AVAILABLE_STATUS',
                                                      self.available_status)  # type: ignore
-        self.busy_status = util.parse_enum_list(os.environ.get('BUSY_STATUS', ''),
+        self.busy_status = util.parse_enum_list(self.environ.get('BUSY_STATUS', ''),
                                                 enum.Status, 'BUSY_STATUS',
                                                 self.busy_status)  # type: ignore
-        self.scheduled_status = util.parse_enum_list(os.environ.get('SCHEDULED_STATUS', ''),
+        self.scheduled_status = util.parse_enum_list(self.environ.get('SCHEDULED_STATUS', ''),
                                                      enum.Status, 'SCHEDULED_STATUS',
                                                      self.scheduled_status)  # type: ignore
         return ('' not in [self.off_status, self.available_status,
@@ -253,14 +397,14 @@ class Environment:
     # 45 - Allow user to specify active hours
     def get_active_time(self) -> bool:
         """Retrieves and validates the `ACTIVE_*` variables."""
-        self.active_days = util.parse_enum_list(os.environ.get('ACTIVE_DAYS', ''),
+        self.active_days = util.parse_enum_list(self.environ.get('ACTIVE_DAYS', ''),
                                                 enum.Weekday, 'ACTIVE_DAYS',
                                                 self.active_days)  # type: ignore
         self.active_hours_start = util.try_parse_datetime(
-            os.environ.get('ACTIVE_HOURS_START', ''),
+            self.environ.get('ACTIVE_HOURS_START', ''),
             datetime.combine(datetime.today(), self.active_hours_start)).time()
         self.active_hours_end = util.try_parse_datetime(
-            os.environ.get('ACTIVE_HOURS_END', ''),
+            self.environ.get('ACTIVE_HOURS_END', ''),
             datetime.combine(datetime.today(), self.active_hours_end)).time()
 
         return ('' not in [self.active_days, self.active_hours_start,
@@ -269,20 +413,191 @@ class Environment:
     def get_lookahead(self) -> bool:
         """Retrieves and validates the `CALENDAR_LOOKAHEAD` variable."""
         # 41: Replace decorator with utility function
-        self.calendar_lookahead = util.try_parse_int(os.environ.get('CALENDAR_LOOKAHEAD', ''),
+        self.calendar_lookahead = util.try_parse_int(self.environ.get('CALENDAR_LOOKAHEAD', ''),
                                                 self.calendar_lookahead)
         return self.calendar_lookahead >= 5 and self.calendar_lookahead <= 60
 
     def get_sleep(self) -> bool:
         """Retrieves and validates the `SLEEP_SECONDS` variable."""
         # 41: Replace decorator with utility function
-        self.sleep_seconds = util.try_parse_int(os.environ.get('SLEEP_SECONDS', ''),
+        self.sleep_seconds = util.try_parse_int(self.environ.get('SLEEP_SECONDS', ''),
                                                 self.sleep_seconds)
         return self.sleep_seconds >= 5 and self.sleep_seconds <= 60
 
+    def get_poll_intervals(self) -> bool:
+        """Retrieves and validates the `<SOURCE>_POLL_SECONDS` variables.
+
+        Collaboration sources default to `SLEEP_SECONDS`, and calendar sources, whose
+        status only changes at meeting boundaries, default to `calendar_poll_seconds`."""
+        return_value = True
+        self.source_poll_seconds = {}
+        for source in self.selected_sources:
+            default = self.calendar_poll_seconds if source in precedence.CALENDAR_SOURCES \
+                else self.sleep_seconds
+            variable = source.name + '_POLL_SECONDS'
+            interval = util.try_parse_int(self.environ.get(variable, ''), default)
+            if interval < 5 or interval > 3600:
+                logger.warning('%s must be between 5 and 3600 seconds!', variable)
+                return_value = False
+            self.source_poll_seconds[source] = interval
+        return return_value
+
+    def get_poll_timeout(self) -> bool:
+        """Retrieves and validates the `POLL_TIMEOUT_SECONDS` and `<SOURCE>_TIMEOUT_SECONDS`
+        variables."""
+        self.poll_timeout_seconds = util.try_parse_int(
+            self.environ.get('POLL_TIMEOUT_SECONDS', ''), self.poll_timeout_seconds)
+        return_value = self.poll_timeout_seconds >= 1 and self.poll_timeout_seconds <= 60
+        if not return_value:
+            logger.warning('POLL_TIMEOUT_SECONDS must be between 1 and 60 seconds!')
+
+        # Each source may override the global deadline, e.g. `WEBEX_TIMEOUT_SECONDS`
+        self.source_timeouts = {}
+        for source in self.selected_sources:
+            variable = source.name + '_TIMEOUT_SECONDS'
+            timeout = util.try_parse_int(self.environ.get(variable, ''), self.poll_timeout_seconds)
+            if timeout < 1 or timeout > 60:
+                logger.warning('%s must be between 1 and 60 seconds!', variable)
+                return_value = False
+            self.source_timeouts[source] = timeout
+        return return_value
+
+    def get_circuit(self) -> bool:
+        """Retrieves and validates the `CIRCUIT_*` variables."""
+        self.circuit_threshold = util.try_parse_int(self.environ.get('CIRCUIT_THRESHOLD', ''),
+                                                    self.circuit_threshold)
+        self.circuit_max_backoff_seconds = util.try_parse_int(
+            self.environ.get('CIRCUIT_MAX_BACKOFF_SECONDS', ''),
+            self.circuit_max_backoff_seconds)
+        self.circuit_stale_seconds = util.try_parse_int(
+            self.environ.get('CIRCUIT_STALE_SECONDS', ''),
+            self.circuit_stale_seconds)
+
+        return_value = True
+        if self.circuit_threshold < 1 or self.circuit_threshold > 100:
+            logger.warning('CIRCUIT_THRESHOLD must be between 1 and 100!')
+            return_value = False
+        if self.circuit_max_backoff_seconds < 5 or self.circuit_max_backoff_seconds > 3600:
+            logger.warning('CIRCUIT_MAX_BACKOFF_SECONDS must be between 5 and 3600 seconds!')
+            return_value = False
+        if self.circuit_stale_seconds < 0 or self.circuit_stale_seconds > 86400:
+            logger.warning('CIRCUIT_STALE_SECONDS must be between 0 and 86400 seconds!')
+            return_value = False
+        return return_value
+
+    def get_debounce(self) -> bool:
+        """Retrieves and validates the `DEBOUNCE_*` variables."""
+        self.debounce_samples = util.try_parse_int(self.environ.get('DEBOUNCE_SAMPLES', ''),
+                                                   self.debounce_samples)
+        self.debounce_dwell_seconds = util.try_parse_int(
+            self.environ.get('DEBOUNCE_DWELL_SECONDS', ''),
+            self.debounce_dwell_seconds)
+        self.debounce_exempt_status = util.parse_enum_list(
+            self.environ.get('DEBOUNCE_EXEMPT_STATUS', ''),
+            enum.Status, 'DEBOUNCE_EXEMPT_STATUS',
+            self.debounce_exempt_status)  # type: ignore
+
+        return_value = True
+        if self.debounce_samples < 1 or self.debounce_samples > 10:
+            logger.warning('DEBOUNCE_SAMPLES must be between 1 and 10!')
+            return_value = False
+        if self.debounce_dwell_seconds < 0 or self.debounce_dwell_seconds > 3600:
+            logger.warning('DEBOUNCE_DWELL_SECONDS must be between 0 and 3600 seconds!')
+            return_value = False
+        return return_value
+
+    def get_metrics(self) -> bool:
+        """Retrieves and validates the `METRICS_*` variables."""
+        self.metrics_address = self.environ.get('METRICS_ADDRESS', self.metrics_address)
+        self.metrics_port = util.try_parse_int(self.environ.get('METRICS_PORT', ''),
+                                               self.metrics_port)
+        if self.metrics_port < 0 or self.metrics_port > 65535:
+            logger.warning('METRICS_PORT must be between 0 (disabled) and 65535!')
+            return False
+        return True
+
+    def get_push(self) -> bool:
+        """Retrieves and validates the `PUSH_*` variables, and the webhook secrets."""
+        return_value = True
+        self.push_address = self.environ.get('PUSH_ADDRESS', self.push_address)
+        self.push_port = util.try_parse_int(self.environ.get('PUSH_PORT', ''), self.push_port)
+        if self.push_port < 0 or self.push_port > 65535:
+            logger.warning('PUSH_PORT must be between 0 (disabled) and 65535!')
+            return_value = False
+        # 30: These variables could contain secrets
+        self.push_secret = util.get_env_or_secret('PUSH_SECRET', '', environ=self.environ)
+        self.webex_webhook_secret = util.get_env_or_secret('WEBEX_WEBHOOK_SECRET', '',
+                                                           environ=self.environ)
+        self.slack_signing_secret = util.get_env_or_secret('SLACK_SIGNING_SECRET', '',
+                                                           environ=self.environ)
+        self.google_webhook_secret = util.get_env_or_secret('GOOGLE_WEBHOOK_SECRET', '',
+                                                            environ=self.environ)
+        self.push_poll_seconds = util.try_parse_int(self.environ.get('PUSH_POLL_SECONDS', ''),
+                                                    self.push_poll_seconds)
+        if self.push_poll_seconds < 5 or self.push_poll_seconds > 86400:
+            logger.warning('PUSH_POLL_SECONDS must be between 5 and 86400 seconds!')
+            return_value = False
+        return return_value
+
+    def get_http(self) -> bool:
+        """Retrieves and validates the `HTTP_*` variables."""
+        return_value = True
+        self.http_pool_size = util.try_parse_int(self.environ.get('HTTP_POOL_SIZE', ''),
+                                                 self.http_pool_size)
+        if self.http_pool_size < 1 or self.http_pool_size > 100:
+            logger.warning('HTTP_POOL_SIZE must be between 1 and 100!')
+            return_value = False
+        self.http_pool_hosts = util.try_parse_int(self.environ.get('HTTP_POOL_HOSTS', ''),
+                                                  self.http_pool_hosts)
+        if self.http_pool_hosts < 1 or self.http_pool_hosts > 1000:
+            logger.warning('HTTP_POOL_HOSTS must be between 1 and 1000!')
+            return_value = False
+        self.http_timeout_seconds = util.try_parse_int(
+            self.environ.get('HTTP_TIMEOUT_SECONDS', ''), self.http_timeout_seconds)
+        if self.http_timeout_seconds < 1 or self.http_timeout_seconds > 300:
+            logger.warning('HTTP_TIMEOUT_SECONDS must be between 1 and 300 seconds!')
+            return_value = False
+        self.http2 = util.try_parse_bool(self.environ.get('HTTP2', ''), self.http2)
+        return return_value
+
+    def get_decisions(self) -> bool:
+        """Retrieves and validates the `DECISION_*` variables."""
+        self.decision_socket = self.environ.get('DECISION_SOCKET', self.decision_socket)
+        self.decision_log_size = util.try_parse_int(self.environ.get('DECISION_LOG_SIZE', ''),
+                                                    self.decision_log_size)
+        if self.decision_log_size < 0 or self.decision_log_size > 100000:
+            logger.warning('DECISION_LOG_SIZE must be between 0 (disabled) and 100000!')
+            return False
+        return True
+
+    def get_state(self) -> bool:
+        """Retrieves and validates the `STATE_*` variables."""
+        self.state_file = self.environ.get('STATE_FILE', self.state_file)
+        self.state_max_age_seconds = util.try_parse_int(
+            self.environ.get('STATE_MAX_AGE_SECONDS', ''), self.state_max_age_seconds)
+        if self.state_max_age_seconds < 0 or self.state_max_age_seconds > 86400:
+            logger.warning('STATE_MAX_AGE_SECONDS must be between 0 and 86400 seconds!')
+            return False
+        return True
+
+    def get_trace(self) -> bool:
+        """Retrieves and validates the `TRACE_FILE` variable."""
+        self.trace_file = self.environ.get('TRACE_FILE', self.trace_file)
+        return True
+
+    def get_replay(self) -> bool:
+        """Retrieves and validates the `REPLAY_*` variables."""
+        self.replay_file = self.environ.get('REPLAY_FILE', self.replay_file)
+        self.replay_speed = util.try_parse_int(self.environ.get('REPLAY_SPEED', ''),
+                                               self.replay_speed)
+        if self.replay_speed < 0 or self.replay_speed > 10000:
+            logger.warning('REPLAY_SPEED must be between 0 (unlimited) and 10000!')
+            return False
+        return True
+
     def get_log_level(self) -> bool:
         """Retrieves and validates the `LOGLEVEL` variable."""
-        self.log_level = util.parse_enum(os.environ.get('LOGLEVEL', ''),
+        self.log_level = util.parse_enum(self.environ.get('LOGLEVEL', ''),
                                          enum.LogLevel, 'LOGLEVEL',
                                          self.log_level)  # type: ignore
         return self.log_level != ''
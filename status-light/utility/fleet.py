@@ -0,0 +1,126 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Fleet Mode Profiles and Shared Sources
+"""
+
+# Standard imports
+from collections.abc import Mapping
+from concurrent import futures
+import json
+import logging
+import os
+import threading
+from typing import Callable
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+def load_profiles(path: str, base_environ: Mapping[str, str]) -> dict[str, dict[str, str]]:
+    """Loads the user profiles for fleet mode from a JSON file.
+
+    The file contains an object mapping each profile name to an object of environment
+    variable overrides, e.g. `{"alice": {"SOURCES": "webex", "WEBEX_PERSONID": "xxx"}}`.
+    Each profile's variables are layered over `base_environ`, so settings common to
+    every profile can be set once in the process environment. Non-string values
+    (e.g. a `TUYA_DEVICE` object) are converted to JSON strings.
+
+    Returns a dictionary mapping each profile name to its complete environment,
+    or an empty dictionary on error.
+    """
+    try:
+        with open(os.path.expanduser(path), 'rb') as profile_file:
+            profiles = json.load(profile_file)
+
+        if not isinstance(profiles, dict) or len(profiles) == 0:
+            logger.warning('FLEET_CONFIG must contain an object with at least one profile!')
+            return {}
+
+        return_value = {}
+        for name, overrides in profiles.items():
+            if not isinstance(overrides, dict):
+                logger.warning('Fleet profile %s must be an object!', name)
+                return {}
+            environ = dict(base_environ)
+            environ.update({variable: value if isinstance(value, str) else json.dumps(value)
+                            for variable, value in overrides.items()})
+            return_value[str(name)] = environ
+        return return_value
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.warning('Exception while loading fleet profiles: %s', ex)
+        logger.exception(ex)
+        return {}
+
+
+class SourcePool:
+    """Shares identically configured source objects between fleet profiles.
+
+    Two profiles that configure a source the same way (e.g. the same ICS URL, or the
+    same Webex bot and person) get the same object, and concurrent polls of that
+    object are coalesced into a single call whose result every caller shares.
+    Each object is counted by the profiles using it, so it can be closed once the last
+    one lets it go.
+    """
+
+    def __init__(self):
+        self._sources: dict[tuple[str, str], object] = {}
+        # Each pooled object's key and reference count, by its ID
+        self._keys: dict[int, tuple[str, str]] = {}
+        self._references: dict[int, int] = {}
+        self._in_flight: dict[Callable, futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def share(self, source_api: object) -> object:
+        """Returns the pooled object configured identically to `source_api`,
+        adding `source_api` to the pool if there is none yet."""
+        key = (type(source_api).__qualname__, repr(sorted(vars(source_api).items())))
+        with self._lock:
+            pooled_api = self._sources.setdefault(key, source_api)
+            self._keys[id(pooled_api)] = key
+            self._references[id(pooled_api)] = self._references.get(id(pooled_api), 0) + 1
+            return pooled_api
+
+    def release(self, source_api: object) -> bool:
+        """Lets go of one profile's reference to a pooled object.
+
+        Returns True, after removing it from the pool, if no profile uses it any more
+        (or it was never pooled), so that it can be closed."""
+        with self._lock:
+            references = self._references.get(id(source_api), 0) - 1
+            if references > 0:
+                self._references[id(source_api)] = references
+                return False
+            self._references.pop(id(source_api), None)
+            key = self._keys.pop(id(source_api), None)
+            if key is not None:
+                del self._sources[key]
+            return True
+
+    def coalesce(self, call: Callable) -> Callable:
+        """Wraps a pooled object's bound method so that concurrent calls share one result."""
+        def coalesced_call():
+            with self._lock:
+                future = self._in_flight.get(call)
+                is_owner = future is None
+                if is_owner:
+                    future = futures.Future()
+                    self._in_flight[call] = future
+
+            if not is_owner:
+                return future.result()
+
+            try:
+                result = call()
+                future.set_result(result)
+                return result
+            except BaseException as ex:
+                future.set_exception(ex)
+                raise
+            finally:
+                with self._lock:
+                    del self._in_flight[call]
+        return coalesced_call
+
+    def __len__(self) -> int:
+        return len(self._sources)
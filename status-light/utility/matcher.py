@@ -0,0 +1,108 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Slack Custom Status Matcher
+"""
+
+# Standard imports
+import functools
+import logging
+import re
+
+# Project imports
+from utility import enum
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# The kinds of rule, written as e.g. `exact:Lunch`; a rule without a kind is a prefix
+RULE_KINDS: tuple[str, ...] = ('prefix', 'exact', 'emoji', 'regex')
+# The rule categories, in their default priority order, highest first
+CATEGORIES: tuple[str, ...] = ('busy', 'scheduled', 'available', 'off')
+
+
+class StatusMatcher:
+    """Matches a custom status against every rule at once.
+
+    Each category's prefix, exact and emoji rules are alternatives within one named group
+    of one compiled regex, and the groups are in priority order, so the first group that
+    matches is the highest-priority one. Regex rules are compiled one at a time, since
+    their inline flags, groups and backreferences would clash in a combined pattern, and
+    only those of categories outranking that first group are tried."""
+
+    def __init__(self, pattern: re.Pattern | None, statuses: dict[str, enum.Status],
+                 regexes: dict[str, tuple[re.Pattern, ...]] | None = None):
+        self.pattern = pattern
+        self.statuses = statuses
+        self.regexes = regexes or {}
+
+    def match(self, custom_status: str) -> tuple[str, enum.Status] | None:
+        """Returns the category and status of the highest-priority rule matching
+        `custom_status` (its emoji and text, joined with a space, stripped and
+        casefolded), or None if no rule matches."""
+        found = self.pattern.match(custom_status) if self.pattern is not None else None
+        matched = found.lastgroup if found is not None else None
+        # The statuses are in priority order
+        for category in self.statuses:
+            if category == matched:
+                break
+            if any(regex.search(custom_status) for regex in self.regexes.get(category, ())):
+                matched = category
+                break
+        if matched is None:
+            return None
+        return matched, self.statuses[matched]
+
+
+def _split_rule(rule: str) -> tuple[str, str]:
+    """Returns the kind and value of a rule, e.g. `('exact', 'Lunch')`."""
+    kind, _, value = rule.partition(':')
+    if kind not in RULE_KINDS:
+        kind, value = 'prefix', rule
+    return kind, value
+
+
+def compile_rule(rule: str) -> str:
+    """Returns the regex for one rule: for a regex rule, its pattern, to search the custom
+    status for, and otherwise a pattern to match from the start of the custom status.
+
+    - `prefix:text`, or just `text`: the custom status starts with `text`
+    - `exact:text`: the custom status is exactly `text`
+    - `emoji::emoji:`: the custom status emoji is `:emoji:`, whatever the text
+    - `regex:pattern`: `pattern` matches anywhere in the custom status
+
+    Everything but regexes is compared casefolded; regexes ignore case. Raises
+    `re.error` on an invalid regex."""
+    kind, value = _split_rule(rule)
+    match kind:
+        case 'exact':
+            return re.escape(value.strip().casefold()) + r'\Z'
+        case 'emoji':
+            # The emoji never contains a space, and is followed by one if there's text
+            return re.escape(value.strip().casefold()) + r'(?: |\Z)'
+        case 'regex':
+            re.compile(value, re.IGNORECASE)
+            return value
+    return re.escape(value.casefold())
+
+
+@functools.lru_cache(maxsize=64)
+def compile_rules(categories: tuple[tuple[str, enum.Status, tuple[str, ...]], ...]
+                  ) -> StatusMatcher:
+    """Compiles `(category, status, rules)` tuples, in priority order, into one matcher.
+
+    Identical rule sets, e.g. those of fleet profiles sharing a configuration, are
+    compiled once and share a matcher. Raises `re.error` on an invalid regex rule."""
+    groups = []
+    regexes = {}
+    for category, _, rules in categories:
+        literals = [compile_rule(rule) for rule in rules if _split_rule(rule)[0] != 'regex']
+        if len(literals) > 0:
+            groups.append(f'(?P<{category}>' + '|'.join(literals) + ')')
+        regexes[category] = tuple(re.compile(compile_rule(rule), re.IGNORECASE)
+                                  for rule in rules if _split_rule(rule)[0] == 'regex')
+    pattern = re.compile('|'.join(groups)) if groups else None
+    logger.debug('Compiled %d custom status rule(s)',
+                 sum(len(rules) for _, _, rules in categories))
+    return StatusMatcher(pattern, {category: status for category, status, _ in categories},
+                         regexes)
@@ -0,0 +1,288 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Prometheus Metrics
+"""
+
+# Standard imports
+from abc import ABC, abstractmethod
+import http.server
+import logging
+import threading
+import time
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Latency buckets, in seconds, for network calls
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                                      1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Latency buckets, in seconds, for in-process work
+FAST_BUCKETS: tuple[float, ...] = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                                   0.001, 0.0025, 0.005, 0.01)
+
+_registry: list['Metric'] = []
+
+
+class Metric(ABC):
+    """The base of every metric: a name, help text and a set of label names.
+
+    Values are kept per combination of label values, and every metric registers
+    itself so that `render` can export it."""
+    metric_type: str = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> list[str]:
+        """Returns the metric in the Prometheus text exposition format."""
+        return [f'# HELP {self.name} {self.documentation}',
+                f'# TYPE {self.name} {self.metric_type}'] + self._render_samples()
+
+    @abstractmethod
+    def _render_samples(self) -> list[str]:
+        """Internal Helper Method to render each sample line."""
+        pass
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        """Internal Helper Method to order label values by label name."""
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: tuple[str, ...], extra: dict[str, str] | None = None) -> str:
+        """Internal Helper Method to format label values as `{name="value",...}`."""
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter(Metric):
+    """A value that only ever increases, e.g. a count of errors."""
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        # A metric without labels is always exported, starting at zero
+        self._values: dict[tuple[str, ...], float] = {} if labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, **labels: str):
+        """Increments the counter for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Returns the counter for the given label values, or the sum over any label
+        values not given."""
+        with self._lock:
+            return sum(value for key, value in self._values.items()
+                       if all(labels.get(name, part) == part
+                              for name, part in zip(self.labelnames, key)))
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            return [f'{self.name}{self._format_labels(key)} {value}'
+                    for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """A value that can go up and down, e.g. the state of a circuit breaker."""
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        # A metric without labels is always exported, starting at zero
+        self._values: dict[tuple[str, ...], float] = {} if labelnames else {(): 0}
+
+    def set(self, value: float, **labels: str):
+        """Sets the gauge for the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _render_samples(self) -> list[str]:
+        with self._lock:
+            return [f'{self.name}{self._format_labels(key)} {value}'
+                    for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    """Counts observations, e.g. latencies, into cumulative buckets."""
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: [count per bucket..., count above the last bucket], sum
+        self._values: dict[tuple[str, ...], tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        """Records an observation for the given label values."""
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def _render_samples(self) -> list[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total) in self._values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{self.name}_bucket{self._format_labels(key, {"le": le})} '
+                                 f'{cumulative}')
+                lines.append(f'{self.name}_sum{self._format_labels(key)} {total}')
+                lines.append(f'{self.name}_count{self._format_labels(key)} {cumulative}')
+        return lines
+
+
+class StateTimer(Metric):
+    """Counts the seconds spent in each state, e.g. each color of the light.
+
+    Only one state is current per set of label values; the time spent in it so far
+    is included whenever the metric is rendered."""
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 state_label: str = 'state'):
+        super().__init__(name, documentation, labelnames)
+        self.state_label = state_label
+        self._totals: dict[tuple[str, ...], dict[str, float]] = {}
+        self._current: dict[tuple[str, ...], tuple[str, float]] = {}
+
+    def enter(self, state: str, **labels: str):
+        """Ends the current state, if any, and starts counting time in `state`."""
+        key = self._key(labels)
+        now = time.monotonic()
+        with self._lock:
+            self._accrue(key, now)
+            self._current[key] = (state, now)
+
+    def leave(self, **labels: str):
+        """Ends the current state, if any, without starting another."""
+        key = self._key(labels)
+        with self._lock:
+            self._accrue(key, time.monotonic())
+            self._current.pop(key, None)
+
+    def _accrue(self, key: tuple[str, ...], now: float):
+        """Internal Helper Method to add the time spent in the current state to its total."""
+        if key in self._current:
+            state, since = self._current[key]
+            totals = self._totals.setdefault(key, {})
+            totals[state] = totals.get(state, 0.0) + now - since
+
+    def _render_samples(self) -> list[str]:
+        now = time.monotonic()
+        lines = []
+        with self._lock:
+            for key in self._totals.keys() | self._current.keys():
+                totals = dict(self._totals.get(key, {}))
+                if key in self._current:
+                    state, since = self._current[key]
+                    totals[state] = totals.get(state, 0.0) + now - since
+                for state, total in totals.items():
+                    labels = self._format_labels(key, {self.state_label: state})
+                    lines.append(f'{self.name}{labels} {total}')
+        return lines
+
+
+def render() -> str:
+    """Returns every registered metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Serves `render()` at `/metrics`."""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handles a scrape."""
+        if self.path.split('?')[0] not in ['/', '/metrics']:
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+
+def start_server(address: str, port: int) -> http.server.ThreadingHTTPServer | None:
+    """Serves the metrics on `address`:`port` from a background thread.
+
+    Returns the server, so it can be shut down, or None on error."""
+    try:
+        server = http.server.ThreadingHTTPServer((address, port), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='status-light-metrics',
+                         daemon=True).start()
+        logger.info('Serving metrics on http://%s:%d/metrics', address, port)
+        return server
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.warning('Exception while starting the metrics server: %s', ex)
+        logger.exception(ex)
+        return None
+
+
+def _escape(value: str) -> str:
+    """Internal Helper Method to escape a label value."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Status-Light's own metrics
+SOURCE_POLL_SECONDS = Histogram(
+    'status_light_source_poll_seconds',
+    'Time taken to poll a status source, in seconds.', ('profile', 'source'))
+SOURCE_POLL_ERRORS = Counter(
+    'status_light_source_poll_errors_total',
+    'Polls of a status source that failed or missed their deadline.',
+    ('profile', 'source', 'reason'))
+CIRCUIT_STATE = Gauge(
+    'status_light_circuit_state',
+    'State of a source\'s circuit breaker: 1 closed, 2 open, 3 half-open.',
+    ('profile', 'source'))
+LOOP_ITERATION_SECONDS = Histogram(
+    'status_light_loop_iteration_seconds',
+    'Time taken by one iteration of the main loop, in seconds.', ('profile',))
+SELECT_STATUS_SECONDS = Histogram(
+    'status_light_select_status_seconds',
+    'Time spent selecting the winning status, in seconds.', ('profile',), FAST_BUCKETS)
+TRANSITION_SECONDS = Histogram(
+    'status_light_transition_seconds',
+    'Time taken to transition the light to a new status, in seconds.', ('profile',))
+TRANSITIONS = Counter(
+    'status_light_transitions_total',
+    'Attempts to transition the light to a new status.', ('profile', 'result'))
+TUYA_RETRIES = Counter(
+    'status_light_tuya_retries_total',
+    'Commands to a Tuya device that were retried after an error.')
+LIGHT_COLOR_SECONDS = StateTimer(
+    'status_light_light_color_seconds_total',
+    'Time the light has spent in each color, in seconds.', ('profile',), 'color')
+HTTP_REQUESTS = Counter(
+    'status_light_http_requests_total',
+    'HTTP requests made through the shared connection pools.', ('host',))
+HTTP_CONNECTIONS = Counter(
+    'status_light_http_connections_total',
+    'HTTP connections opened by the shared connection pools; the fewer per request, '
+    'the more were reused.', ('host',))
@@ -0,0 +1,124 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Concurrent Source Polling
+"""
+
+# Standard imports
+from concurrent import futures
+import logging
+import time
+from typing import Callable
+
+# Project imports
+from utility import enum
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class PollResult:
+    """Represents the outcome of polling a single status source."""
+    status: enum.Status = enum.Status.UNKNOWN
+    # Seconds between submitting the poll and receiving (or giving up on) the result
+    latency: float = 0.0
+    timed_out: bool = False
+
+    def __init__(self, status: enum.Status, latency: float, timed_out: bool = False):
+        self.status = status
+        self.latency = latency
+        self.timed_out = timed_out
+
+
+class SourcePoller:
+    """Fans out to every configured status source on a shared worker pool.
+
+    Each source is given its own deadline. A source that misses its deadline is
+    reported as `Status.UNKNOWN` with `timed_out` set, and its in-flight call is left
+    to finish in the background rather than being submitted again, so a hung source
+    can never stall the main loop or exhaust the worker pool.
+    """
+
+    def __init__(self, sources: dict[enum.StatusSource, Callable[[], enum.Status]],
+                 timeouts: dict[enum.StatusSource, int], default_timeout: int = 10,
+                 executor: futures.ThreadPoolExecutor | None = None):
+        """Args:
+            sources: Dictionary mapping StatusSource to the callable that polls it
+            timeouts: Dictionary mapping StatusSource to its deadline, in seconds
+            default_timeout: Deadline, in seconds, for sources not found in `timeouts`
+            executor: A worker pool shared with other pollers; if omitted, the poller
+                creates (and owns) its own
+        """
+        self.sources = sources
+        self.timeouts = timeouts
+        self.default_timeout = default_timeout
+        self._pending: dict[enum.StatusSource, futures.Future] = {}
+        self._owns_executor = executor is None
+        self._executor = executor or futures.ThreadPoolExecutor(
+            max_workers=max(1, len(sources)), thread_name_prefix='status-light-poll')
+
+    def poll(self, sources: list[enum.StatusSource] | None = None) \
+            -> tuple[dict[enum.StatusSource, PollResult], float]:
+        """Polls the given sources (or every source) concurrently and waits for each
+        up to its deadline.
+
+        Returns a tuple of (results, total_latency) where `results` maps each source
+        to its `PollResult` and `total_latency` is the wall time of the whole poll, in seconds.
+        """
+        start = time.monotonic()
+        if sources is None:
+            sources = list(self.sources)
+
+        for source in sources:
+            pending = self._pending.get(source)
+            if pending is not None:
+                if not pending.done():
+                    # Still hung from a previous poll; wait on it again rather than piling up
+                    logger.debug('%s poll still in flight from a previous iteration',
+                                 source.name.capitalize())
+                    continue
+                # It finished late; discard its answer and poll afresh
+            self._pending[source] = self._executor.submit(self._timed_call, self.sources[source])
+
+        results: dict[enum.StatusSource, PollResult] = {}
+        for source in sources:
+            future = self._pending[source]
+            deadline = start + self.timeouts.get(source, self.default_timeout)
+            try:
+                status, latency = future.result(timeout=max(0, deadline - time.monotonic()))
+                del self._pending[source]
+                results[source] = PollResult(status, latency)
+            except futures.TimeoutError:
+                logger.warning('%s missed its %ss deadline', source.name.capitalize(),
+                               self.timeouts.get(source, self.default_timeout))
+                results[source] = PollResult(enum.Status.UNKNOWN, time.monotonic() - start,
+                                             timed_out=True)
+            except Exception as ex:  # pylint: disable=broad-except
+                del self._pending[source]
+                logger.warning('Exception while polling %s: %s', source.name.capitalize(), ex)
+                logger.exception(ex)
+                results[source] = PollResult(enum.Status.UNKNOWN, time.monotonic() - start)
+
+        return (results, time.monotonic() - start)
+
+    def adopt_pending(self, previous: 'SourcePoller', sources: list[enum.StatusSource]):
+        """Takes over the calls to `sources` that `previous` still has in flight, e.g. when
+        a reload replaces it but keeps those sources, so a hung source isn't called again
+        until its hung call finishes."""
+        for source in sources:
+            pending = previous._pending.get(source)  # pylint: disable=protected-access
+            if source in self.sources and pending is not None and not pending.done():
+                self._pending[source] = pending
+
+    def shutdown(self):
+        """Stops the worker pool, if this poller owns it, without waiting for any hung
+        source calls."""
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _timed_call(call: Callable[[], enum.Status]) -> tuple[enum.Status, float]:
+        """Internal Helper Method to run a source call and measure its latency."""
+        start = time.monotonic()
+        status = call()
+        return (status, time.monotonic() - start)
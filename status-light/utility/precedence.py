@@ -13,6 +13,13 @@ from utility import enum
 
 logger: logging.Logger = logging.getLogger(__name__)
 
+# Sources grouped by the `select_status` argument they feed, in precedence order
+COLLABORATION_SOURCES: tuple[enum.StatusSource, ...] = (enum.StatusSource.WEBEX,
+                                                       enum.StatusSource.SLACK)
+CALENDAR_SOURCES: tuple[enum.StatusSource, ...] = (enum.StatusSource.OFFICE365,
+                                                  enum.StatusSource.GOOGLE,
+                                                  enum.StatusSource.ICS)
+
 
 def select_status(
     collaboration_statuses: dict[enum.StatusSource, enum.Status],
@@ -63,20 +70,15 @@ def select_status(
         ... )
         (Status.BUSY, StatusSource.OFFICE365)
     """
-    # Log input sources for debugging
-    if collaboration_statuses:
-        collab_log = ', '.join(f'{src.name.lower()}={status.name.lower()}'
-                               for src, status in collaboration_statuses.items())
-        logger.debug('Collaboration sources: %s', collab_log)
-    else:
-        logger.debug('Collaboration sources: none')
-
-    if calendar_statuses:
-        calendar_log = ', '.join(f'{src.name.lower()}={status.name.lower()}'
-                                 for src, status in calendar_statuses.items())
-        logger.debug('Calendar sources: %s', calendar_log)
-    else:
-        logger.debug('Calendar sources: none')
+    # Log input sources for debugging; joining them costs more than the selection itself,
+    # so skip it unless it'll be logged
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Collaboration sources: %s', ', '.join(
+            f'{src.name.lower()}={status.name.lower()}'
+            for src, status in collaboration_statuses.items()) or 'none')
+        logger.debug('Calendar sources: %s', ', '.join(
+            f'{src.name.lower()}={status.name.lower()}'
+            for src, status in calendar_statuses.items()) or 'none')
 
     # Phase 1: Select collaboration status
     # Check Webex first (highest priority)
@@ -0,0 +1,261 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Push Event Receiver
+"""
+
+# Standard imports
+import hashlib
+import hmac
+import http.server
+import json
+import logging
+import threading
+import time
+from typing import Callable, Mapping
+
+# Project imports
+from utility import enum
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# The largest request body accepted, in bytes
+MAX_BODY_BYTES: int = 1024 * 1024
+# How old, in seconds, a signed Slack request may be, to stop replays
+SLACK_MAX_AGE_SECONDS: int = 300
+# The header carrying the signature of a generic event
+SIGNATURE_HEADER: str = 'X-Status-Light-Signature'
+# The header carrying the token a Google Calendar push channel was opened with
+GOOGLE_TOKEN_HEADER: str = 'X-Goog-Channel-Token'
+
+# Each profile's receiver, by profile name; returns True if it took the event
+_receivers: dict[str, Callable[['PushEvent'], bool]] = {}
+_receivers_lock = threading.Lock()
+
+
+class PushEvent:
+    """A change delivered by a source, rather than polled from it.
+
+    Not every event says what the new status is: Webex webhooks only say that something
+    happened, so the source should be polled right away to find out."""
+    source: enum.StatusSource = enum.StatusSource.UNKNOWN
+    # The new status, if the event says what it is
+    status: enum.Status | None = None
+    # The users the event is about (e.g. a Webex person ID or Slack user ID), if any
+    user_ids: set[str] = set()
+    # The profile the event is for, if any
+    profile: str = ''
+    # Slack's presence (`active` or `away`), or its user profile, with the custom status
+    presence: str = ''
+    user_profile: dict | None = None
+    # Whether the event covers the source's whole status (e.g. a Slack presence change, but
+    # not a custom status change), so it can be polled less often while its pushes keep up
+    replaces_polling: bool = True
+
+    def __init__(self, source: enum.StatusSource, status: enum.Status | None = None,
+                 user_ids: set[str] | None = None, profile: str = '', presence: str = '',
+                 user_profile: dict | None = None, replaces_polling: bool = True):
+        self.source = source
+        self.status = status
+        self.user_ids = user_ids or set()
+        self.profile = profile
+        self.presence = presence
+        self.user_profile = user_profile
+        self.replaces_polling = replaces_polling
+
+
+def register(profile: str, receiver: Callable[[PushEvent], bool]):
+    """Delivers every event received to `receiver`, on behalf of `profile`."""
+    with _receivers_lock:
+        _receivers[profile] = receiver
+
+
+def unregister(profile: str):
+    """Stops delivering events to `profile`, e.g. when a fleet profile is removed."""
+    with _receivers_lock:
+        _receivers.pop(profile, None)
+
+
+def dispatch(event: PushEvent) -> int:
+    """Delivers `event` to every receiver, and returns how many took it."""
+    with _receivers_lock:
+        receivers = list(_receivers.values())
+    return sum(1 for receiver in receivers if receiver(event))
+
+
+def parse_webex(payload: dict) -> list[PushEvent]:
+    """Parses a Webex webhook notification.
+
+    Webex doesn't notify status changes themselves, but a webhook on e.g. `meetings` or
+    `telephony_calls` fires when they are likely, so the event asks for a poll."""
+    data = payload.get('data') or {}
+    user_ids = {value for value in [payload.get('actorId'), payload.get('createdBy'),
+                                    data.get('personId'), data.get('hostUserId')]
+                if isinstance(value, str) and value != ''}
+    return [PushEvent(enum.StatusSource.WEBEX, user_ids=user_ids)]
+
+
+def parse_slack(payload: dict) -> list[PushEvent]:
+    """Parses a Slack Events API `event_callback` with a `user_change` or `presence_change`
+    event; other events are ignored."""
+    event = payload.get('event') or {}
+    match event.get('type'):
+        case 'user_change':
+            user = event.get('user') or {}
+            # A custom status says nothing about presence, which still has to be polled
+            return [PushEvent(enum.StatusSource.SLACK, user_ids={user.get('id', '')},
+                              user_profile=user.get('profile') or {},
+                              replaces_polling=False)]
+        case 'presence_change':
+            # Batched presence events list several users
+            user_ids = set(event.get('users') or [event.get('user', '')])
+            return [PushEvent(enum.StatusSource.SLACK, user_ids=user_ids,
+                              presence=event.get('presence', ''))]
+    return []
+
+
+def parse_google(headers: Mapping[str, str]) -> list[PushEvent]:
+    """Parses a Google Calendar push notification, which is all headers.
+
+    Notifications only say that a watched calendar changed, so the event asks for a poll
+    (which syncs the changes). The `sync` notification sent when a channel is opened is
+    ignored."""
+    if headers.get('X-Goog-Resource-State', '') == 'sync':
+        return []
+    return [PushEvent(enum.StatusSource.GOOGLE)]
+
+
+def parse_generic(payload: dict) -> list[PushEvent]:
+    """Parses a generic event: `{"source": "webex", "status": "meeting"}`, optionally
+    with a `profile`, or a list of them.
+
+    Raises ValueError on an unknown source or status."""
+    events = []
+    for item in payload if isinstance(payload, list) else [payload]:
+        events.append(PushEvent(enum.StatusSource[str(item['source']).upper()],
+                                enum.Status[str(item['status']).upper()],
+                                profile=str(item.get('profile', ''))))
+    return events
+
+
+def sign_webex(secret: str, body: bytes) -> str:
+    """Returns the `X-Spark-Signature` header Webex sends with `body`."""
+    return hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+
+
+def sign_slack(secret: str, timestamp: str, body: bytes) -> str:
+    """Returns the `X-Slack-Signature` header Slack sends with `body` at `timestamp`."""
+    base = b'v0:' + timestamp.encode() + b':' + body
+    return 'v0=' + hmac.new(secret.encode(), base, hashlib.sha256).hexdigest()
+
+
+def sign_generic(secret: str, body: bytes) -> str:
+    """Returns the `X-Status-Light-Signature` header for a generic event `body`."""
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class _PushHandler(http.server.BaseHTTPRequestHandler):
+    """Receives signed events at `/webex`, `/slack`, `/status` and `/google`."""
+    server: '_PushServer'
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handles an event."""
+        path = self.path.split('?')[0].rstrip('/')
+        secret = self.server.secrets.get(path, '')
+        # Endpoints without a secret are disabled, rather than open
+        if secret == '':
+            self.send_error(404)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self.send_error(413)
+            return
+        body = self.rfile.read(length)
+
+        if not self._is_signed(path, secret, body):
+            logger.warning('Rejected an unsigned or badly signed event at %s', path)
+            self.send_error(401)
+            return
+
+        try:
+            if path == '/google':
+                events = parse_google(self.headers)
+            else:
+                payload = json.loads(body)
+                # Slack checks the endpoint once, when it's configured
+                if path == '/slack' and payload.get('type') == 'url_verification':
+                    self._send(200, 'text/plain', str(payload.get('challenge', '')).encode())
+                    return
+                events = {'/webex': parse_webex, '/slack': parse_slack,
+                          '/status': parse_generic}[path](payload)
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Rejected a malformed event at %s: %s', path, ex)
+            self.send_error(400)
+            return
+
+        accepted = sum(dispatch(event) for event in events)
+        logger.debug('Received %d event(s) at %s, %d accepted', len(events), path, accepted)
+        self._send(200, 'application/json', json.dumps({'accepted': accepted}).encode())
+
+    def _is_signed(self, path: str, secret: str, body: bytes) -> bool:
+        """Internal Helper Method to check a request's signature."""
+        match path:
+            case '/webex':
+                expected = sign_webex(secret, body)
+                signature = self.headers.get('X-Spark-Signature', '')
+            case '/slack':
+                timestamp = self.headers.get('X-Slack-Request-Timestamp', '')
+                if not timestamp.isdigit() or \
+                        abs(time.time() - int(timestamp)) > SLACK_MAX_AGE_SECONDS:
+                    return False
+                expected = sign_slack(secret, timestamp, body)
+                signature = self.headers.get('X-Slack-Signature', '')
+            case '/google':
+                # Google doesn't sign notifications, but sends the channel's token
+                expected = secret
+                signature = self.headers.get(GOOGLE_TOKEN_HEADER, '')
+            case _:
+                expected = sign_generic(secret, body)
+                signature = self.headers.get(SIGNATURE_HEADER, '')
+        return hmac.compare_digest(expected, signature)
+
+    def _send(self, code: int, content_type: str, body: bytes):
+        """Internal Helper Method to send a response."""
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+
+class _PushServer(http.server.ThreadingHTTPServer):
+    """Knows the secret for each endpoint."""
+    daemon_threads = True
+    secrets: dict[str, str] = {}
+
+
+def start_server(address: str, port: int, webex_secret: str, slack_secret: str,
+                 generic_secret: str,
+                 google_secret: str = '') -> http.server.ThreadingHTTPServer | None:
+    """Receives events on `address`:`port` from a background thread.
+
+    Each endpoint is only enabled if its secret is set. Returns the server, so it can be
+    shut down, or None on error."""
+    try:
+        server = _PushServer((address, port), _PushHandler)
+        server.secrets = {'/webex': webex_secret, '/slack': slack_secret,
+                          '/status': generic_secret, '/google': google_secret}
+        threading.Thread(target=server.serve_forever, name='status-light-push',
+                         daemon=True).start()
+        logger.info('Receiving events on http://%s:%d/ (%s)', address, port,
+                    ', '.join(path for path, secret in server.secrets.items() if secret != '')
+                    or 'no endpoints enabled')
+        return server
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.warning('Exception while starting the push server: %s', ex)
+        logger.exception(ex)
+        return None
@@ -0,0 +1,64 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Source and Target Registry
+"""
+
+# Standard imports
+import importlib
+import logging
+from typing import Callable
+
+# Project imports
+from utility import enum
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Each source's module, class, and the method that polls it.
+# Modules are only imported once a source is selected, since each one pulls in its SDK
+# (e.g. googleapiclient or O365), which dominates startup time and memory.
+SOURCES: dict[enum.StatusSource, tuple[str, str, str]] = {
+    enum.StatusSource.WEBEX: ('sources.collaboration.webex', 'WebexAPI', 'get_person_status'),
+    enum.StatusSource.SLACK: ('sources.collaboration.slack', 'SlackAPI', 'get_user_presence'),
+    enum.StatusSource.OFFICE365: ('sources.calendar.office365', 'OfficeAPI',
+                                  'get_current_status'),
+    enum.StatusSource.GOOGLE: ('sources.calendar.google', 'GoogleCalendarAPI',
+                               'get_current_status'),
+    enum.StatusSource.ICS: ('sources.calendar.ics', 'Ics', 'get_current_status')
+}
+
+# Each `TARGET`'s module and class, imported once selected
+TARGETS: dict[str, tuple[str, str]] = {
+    'tuya': ('targets.tuya', 'TuyaLight'),
+    'virtual': ('targets.virtual', 'VirtualLight')
+}
+
+
+def get_source_class(source: enum.StatusSource) -> type:
+    """Imports the module for `source`, if needed, and returns its class."""
+    module_name, class_name, _ = SOURCES[source]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def create_source(source: enum.StatusSource) -> object:
+    """Returns a new, unconfigured instance of `source`."""
+    logger.debug('Creating %s source', source.name.capitalize())
+    return get_source_class(source)()
+
+
+def get_poll_call(source: enum.StatusSource, api: object) -> Callable[[], enum.Status]:
+    """Returns the method of `api` that polls `source` for its status."""
+    return getattr(api, SOURCES[source][2])
+
+
+def get_target_class(target: str) -> type:
+    """Imports the module for `target`, if needed, and returns its class."""
+    module_name, class_name = TARGETS[target]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def create_target(target: str) -> object:
+    """Returns a new, unconfigured instance of `target`."""
+    logger.debug('Creating %s target', target)
+    return get_target_class(target)()
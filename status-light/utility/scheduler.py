@@ -0,0 +1,55 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Per-Source Poll Scheduling
+"""
+
+# Standard imports
+import logging
+
+# Project imports
+from utility import enum
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+
+class SourceScheduler:
+    """Tracks when each status source is next due to be polled.
+
+    Every source has its own interval and next-due time, so slow-changing sources
+    (e.g. calendars) can be polled far less often than presence sources without
+    slowing down the main loop. All times are `time.monotonic()` seconds.
+    """
+
+    def __init__(self, intervals: dict[enum.StatusSource, int]):
+        """Args:
+            intervals: Dictionary mapping StatusSource to its poll interval, in seconds
+        """
+        self.intervals = intervals
+        self.next_due: dict[enum.StatusSource, float] = {}
+        self.reset()
+
+    def reset(self):
+        """Marks every source as due immediately."""
+        self.next_due = {source: 0.0 for source in self.intervals}
+
+    def due(self, now: float) -> list[enum.StatusSource]:
+        """Returns the sources whose next-due time has arrived."""
+        return [source for source, due in self.next_due.items() if due <= now]
+
+    def mark_polled(self, source: enum.StatusSource, now: float):
+        """Schedules the next poll of `source` one interval after `now`."""
+        self.next_due[source] = now + self.intervals[source]
+
+    def schedule_at(self, source: enum.StatusSource, when: float):
+        """Brings the next poll of `source` forward to `when`, if that is sooner."""
+        self.next_due[source] = min(self.next_due[source], when)
+
+    def defer_until(self, source: enum.StatusSource, when: float):
+        """Pushes the next poll of `source` back to `when`, if that is later."""
+        self.next_due[source] = max(self.next_due[source], when)
+
+    def next_wakeup(self) -> float:
+        """Returns the earliest next-due time across all sources."""
+        return min(self.next_due.values(), default=0.0)
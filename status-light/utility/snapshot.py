@@ -0,0 +1,86 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+State Snapshots for Warm Restarts
+"""
+
+# Standard imports
+import json
+import logging
+import os
+import tempfile
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# Bumped whenever the snapshot layout changes; other versions are ignored
+SNAPSHOT_VERSION: int = 1
+# How often, in seconds, an otherwise unchanged snapshot is rewritten to keep it fresh
+REFRESH_SECONDS: int = 60
+# Snapshot keys that change on (nearly) every poll, and so don't count as a change
+TIMESTAMP_KEYS: tuple[str, ...] = ('saved_at', 'retry_at', 'last_good_at')
+
+
+def save_snapshot(path: str, snapshot: dict) -> bool:
+    """Atomically writes `snapshot` to `path` as JSON.
+
+    The snapshot is written to a temporary file in the same directory, flushed to disk,
+    and renamed over `path`, so a crash or restart mid-write leaves either the old
+    snapshot or the new one, never a torn file. Returns False on error."""
+    path = os.path.expanduser(path)
+    temp_path = None
+    try:
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory,
+                                         prefix=os.path.basename(path) + '.',
+                                         suffix='.tmp', delete=False) as temp_file:
+            temp_path = temp_file.name
+            json.dump(dict(snapshot, version=SNAPSHOT_VERSION), temp_file)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, path)
+        return True
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.warning('Exception while saving the state snapshot: %s', ex)
+        logger.exception(ex)
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+
+def without_timestamps(value):
+    """Returns a copy of a snapshot, or any part of one, without its timestamps,
+    for comparison."""
+    if isinstance(value, dict):
+        return {key: without_timestamps(item) for key, item in value.items()
+                if key not in TIMESTAMP_KEYS}
+    return value
+
+
+def load_snapshot(path: str, max_age_seconds: int, now: float) -> dict | None:
+    """Loads the snapshot at `path`, if it was saved no more than `max_age_seconds`
+    before `now` (a POSIX timestamp).
+
+    Returns None if there is no snapshot, or it is too old, from another version of
+    Status-Light, or unreadable."""
+    path = os.path.expanduser(path)
+    if not os.path.exists(path):
+        logger.debug('No state snapshot at %s', path)
+        return None
+
+    try:
+        with open(path, 'rb') as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+            logger.warning('Ignoring the state snapshot at %s, from another version', path)
+            return None
+        age = now - snapshot['saved_at']
+        if age > max_age_seconds or age < 0:
+            logger.info('Ignoring the state snapshot at %s, saved %.0fs ago', path, age)
+            return None
+        return snapshot
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.warning('Exception while loading the state snapshot: %s', ex)
+        logger.exception(ex)
+        return None
@@ -0,0 +1,230 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Status Trace Recording and Replay
+"""
+
+# Standard imports
+import bisect
+from datetime import datetime, timezone
+import gzip
+import logging
+import os
+import time
+import zlib
+
+# Project imports
+from utility import clock, enum
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# The first line of every recording session
+TRACE_HEADER: str = '# status-light trace v1 '
+# Recorded after the last status of a session, when Status-Light stops cleanly
+TRACE_END: str = 'end'
+# How often, in seconds, recorded statuses are flushed to disk, each time as one complete
+# gzip member, so an unclean stop loses at most this long's statuses
+FLUSH_SECONDS: int = 60
+
+
+class TraceRecorder:
+    """Records every change in a source's polled status to a gzip-compressed trace file.
+
+    Each session (one run of Status-Light) appends a header line with its start time,
+    followed by one line per change: the whole seconds since the previous line, the
+    source and the new status, e.g. `42 webex meeting`. Failed polls are recorded as
+    `unknown`, so a replay trips the same circuit breakers."""
+
+    def __init__(self, path: str):
+        """Args:
+            path: The trace file to append to; it is created if needed
+        """
+        self.path = path
+        # The lines recorded since the last flush, and whether a session has started
+        self._lines: list[str] = []
+        self._started: bool = False
+        self._last_time: float = 0.0
+        self._last_flush: float = 0.0
+        self._statuses: dict[enum.StatusSource, enum.Status] = {}
+
+    def record(self, source: enum.StatusSource, status: enum.Status, now: datetime):
+        """Records `status` for `source` at the timezone-aware `now`, if it changed."""
+        if self._statuses.get(source) == status:
+            return
+        self._statuses[source] = status
+        try:
+            if not self._started:
+                self._started = True
+                self._last_time = float(int(now.timestamp()))
+                self._write(TRACE_HEADER + datetime.fromtimestamp(
+                    self._last_time, timezone.utc).isoformat())
+                self._last_flush = time.monotonic()
+            self._write_change(f'{source.name.lower()} {status.name.lower()}', now)
+            if time.monotonic() - self._last_flush >= FLUSH_SECONDS:
+                self._flush()
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Exception while recording the status trace: %s', ex)
+            logger.exception(ex)
+
+    def close(self, now: datetime):
+        """Marks the end of the session at the timezone-aware `now`, and flushes it."""
+        if not self._started:
+            return
+        try:
+            self._write_change(TRACE_END, now)
+            self._flush()
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Exception while closing the status trace: %s', ex)
+            logger.exception(ex)
+        self._started = False
+        self._lines = []
+        self._statuses = {}
+
+    def _flush(self):
+        """Internal Helper Method to append the lines recorded since the last flush to the
+        file, compressed as one gzip member in a single write.
+
+        The lines are kept for the next flush if they can't be written."""
+        self._last_flush = time.monotonic()
+        if not self._lines:
+            return
+        member = gzip.compress(''.join(self._lines).encode())
+        with open(os.path.expanduser(self.path), 'ab') as trace_file:
+            trace_file.write(member)
+        self._lines = []
+
+    def _write_change(self, change: str, now: datetime):
+        """Internal Helper Method to write a line, prefixed with the seconds since the last."""
+        delta = max(0, round(now.timestamp() - self._last_time))
+        self._last_time += delta
+        self._write(f'{delta} {change}')
+
+    def _write(self, line: str):
+        """Internal Helper Method to write a single line, at the next flush."""
+        self._lines.append(line + '\n')
+
+
+class Trace:
+    """A recorded trace: when each source's status changed, between `start` and `end`."""
+
+    def __init__(self, start: datetime, end: datetime,
+                 changes: dict[enum.StatusSource, tuple[list[float], list[enum.Status]]]):
+        """Args:
+            start: When the first session started
+            end: When the last status was recorded, or the last session ended
+            changes: Dictionary mapping StatusSource to its change times
+                (as POSIX timestamps, in order) and the status from each time on
+        """
+        self.start = start
+        self.end = end
+        self.changes = changes
+
+    @property
+    def sources(self) -> list[enum.StatusSource]:
+        """The sources recorded in this trace."""
+        return list(self.changes)
+
+    def get_sources(self, selected_sources: list[enum.StatusSource],
+                    source_clock: clock.Clock) -> dict[enum.StatusSource, 'TraceSource']:
+        """Returns a `TraceSource` for each of the selected sources that was recorded."""
+        return {source: TraceSource(source, *self.changes[source], source_clock)
+                for source in selected_sources if source in self.changes}
+
+
+class TraceSource:
+    """Stands in for a status source, answering with its recorded status at the clock's
+    current time."""
+
+    def __init__(self, source: enum.StatusSource, times: list[float],
+                 statuses: list[enum.Status], source_clock: clock.Clock):
+        self.source = source
+        self.times = times
+        self.statuses = statuses
+        self.clock = source_clock
+
+    def get_current_status(self) -> enum.Status:
+        """Returns the status recorded at the current time, or UNKNOWN before the first."""
+        index = bisect.bisect_right(self.times, self.clock.now(timezone.utc).timestamp()) - 1
+        return self.statuses[index] if index >= 0 else enum.Status.UNKNOWN
+
+    # The collaboration sources' polling calls
+    get_person_status = get_current_status
+    get_user_presence = get_current_status
+
+    def get_next_transition(self) -> datetime | None:
+        """Returns the time of the next recorded change, if any, like a calendar source."""
+        index = bisect.bisect_right(self.times, self.clock.now(timezone.utc).timestamp())
+        if index >= len(self.times):
+            return None
+        return datetime.fromtimestamp(self.times[index], timezone.utc)
+
+
+def load_trace(path: str) -> Trace | None:
+    """Loads a trace file written by `TraceRecorder`.
+
+    Between sessions Status-Light wasn't running, so every source is UNKNOWN from the end
+    of one session (or, if it didn't stop cleanly, the start of the next) until its first
+    status in the next. A trace cut short mid-write, e.g. by Status-Light being killed, is
+    loaded up to where it was cut. Returns None on error, or if the trace is empty."""
+    try:
+        changes: dict[enum.StatusSource, tuple[list[float], list[enum.Status]]] = {}
+        start: float | None = None
+        current: float = 0.0
+
+        def add_change(source: enum.StatusSource, status: enum.Status):
+            times, statuses = changes.setdefault(source, ([], []))
+            if statuses and statuses[-1] == status:
+                return
+            if times and times[-1] == current:
+                # Keep only the last status recorded at the same second
+                statuses[-1] = status
+                if len(statuses) > 1 and statuses[-2] == status:
+                    times.pop()
+                    statuses.pop()
+            else:
+                times.append(current)
+                statuses.append(status)
+
+        with gzip.open(os.path.expanduser(path), 'rt', encoding='utf-8') as trace_file:
+            line_number = 0
+            try:
+                for line_number, line in enumerate(trace_file, 1):
+                    line = line.strip()
+                    if line.startswith(TRACE_HEADER):
+                        # Never go back in time, even if the system clock did
+                        current = max(current, datetime.fromisoformat(
+                            line[len(TRACE_HEADER):]).timestamp())
+                        if start is None:
+                            start = current
+                        for source in changes:
+                            add_change(source, enum.Status.UNKNOWN)
+                        continue
+                    if line == '' or start is None:
+                        continue
+
+                    fields = line.split()
+                    current += int(fields[0])
+                    if fields[1:] == [TRACE_END]:
+                        for source in changes:
+                            add_change(source, enum.Status.UNKNOWN)
+                    elif len(fields) == 3 and fields[1].upper() in enum.StatusSource.__members__ \
+                            and fields[2].upper() in enum.Status.__members__:
+                        add_change(enum.StatusSource[fields[1].upper()],
+                                   enum.Status[fields[2].upper()])
+                    else:
+                        logger.warning('Skipping malformed trace line %d: %s', line_number, line)
+            except (EOFError, gzip.BadGzipFile, zlib.error) as ex:
+                # Status-Light was killed mid-write; keep everything before it
+                logger.warning('The trace %s is truncated after line %d, ignoring the '
+                               'rest: %s', path, line_number, ex)
+
+        if start is None or not changes:
+            logger.warning('The trace %s contains no statuses!', path)
+            return None
+        return Trace(datetime.fromtimestamp(start, timezone.utc),
+                     datetime.fromtimestamp(current, timezone.utc), changes)
+    except Exception as ex:  # pylint: disable=broad-except
+        logger.warning('Exception while loading the status trace: %s', ex)
+        logger.exception(ex)
+        return None
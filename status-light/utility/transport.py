@@ -0,0 +1,136 @@
+"""Status-Light
+(c) 2020-2026 Nick Warner
+https://github.com/portableprogrammer/Status-Light/
+
+Shared HTTP Transport
+"""
+
+# Standard imports
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+
+# 3rd-party imports
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Project imports
+from utility import env, metrics
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# The process-wide `adapter` and `session`; built on first use, from the process environment
+_shared: dict[str, 'PooledAdapter | SharedSession'] = {}
+_lock = threading.Lock()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    """Counts each new connection, so reuse can be measured."""
+
+    def _new_conn(self):
+        metrics.HTTP_CONNECTIONS.inc(host=str(self.host))
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    """Counts each new connection, so reuse can be measured."""
+
+    def _new_conn(self):
+        metrics.HTTP_CONNECTIONS.inc(host=str(self.host))
+        return super()._new_conn()
+
+
+class PooledAdapter(HTTPAdapter):
+    """Keeps a pool of keep-alive connections per host, for up to `pool_hosts` hosts, and
+    applies a default timeout.
+
+    Retries are left to each source (and its circuit breaker), so none are made here."""
+
+    def __init__(self, pool_hosts: int, pool_size: int, timeout_seconds: int):
+        self.timeout_seconds = timeout_seconds
+        # `pool_connections` is how many hosts keep a pool; `pool_maxsize`, its connections
+        super().__init__(pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=0)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': _CountingHTTPConnectionPool,
+                                                   'https': _CountingHTTPSConnectionPool}
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None,
+             proxies=None):  # pylint: disable=too-many-arguments
+        metrics.HTTP_REQUESTS.inc(host=urlsplit(request.url).hostname or '')
+        if timeout is None:
+            timeout = self.timeout_seconds
+        return super().send(request, stream=stream, timeout=timeout, verify=verify,
+                            cert=cert, proxies=proxies)
+
+
+class SharedSession(requests.Session):
+    """A session that reads the proxy and CA bundle environment once per host.
+
+    `requests` otherwise scans the whole process environment on every request, which
+    costs more than a kept-alive request to a nearby host."""
+
+    def __init__(self):
+        super().__init__()
+        self.trust_env = False
+        self.verify = os.environ.get('REQUESTS_CA_BUNDLE') or \
+            os.environ.get('CURL_CA_BUNDLE') or True
+        self._proxies: dict[str, dict[str, str]] = {}
+
+    def request(self, method, url, *args, **kwargs):  # pylint: disable=arguments-differ
+        if kwargs.get('proxies') is None:
+            parts = urlsplit(url)
+            origin = f'{parts.scheme}://{parts.netloc}'
+            if origin not in self._proxies:
+                # Honours NO_PROXY, as `requests` would
+                self._proxies[origin] = requests.utils.get_environ_proxies(url)
+            kwargs['proxies'] = self._proxies[origin]
+        return super().request(method, url, *args, **kwargs)
+
+
+def get_adapter() -> PooledAdapter:
+    """Returns the process-wide adapter, building it on first use."""
+    with _lock:
+        if 'adapter' not in _shared:
+            settings = env.Environment()
+            # Validated at startup, so the defaults only apply outside of `main`
+            settings.get_http()
+            if settings.http2:
+                _enable_http2()
+            _shared['adapter'] = PooledAdapter(settings.http_pool_hosts,
+                                               settings.http_pool_size,
+                                               settings.http_timeout_seconds)
+            logger.debug('Pooling up to %d connection(s) for each of up to %d host(s), '
+                         'with a %ds timeout', settings.http_pool_size,
+                         settings.http_pool_hosts, settings.http_timeout_seconds)
+        return _shared['adapter']  # type: ignore
+
+
+def mount(session: requests.Session) -> requests.Session:
+    """Routes `session`'s HTTP(S) requests through the process-wide connection pools,
+    keeping its own headers and authentication. Returns `session`."""
+    adapter = get_adapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session() -> SharedSession:
+    """Returns the process-wide session, for requests without per-source headers."""
+    if 'session' not in _shared:
+        _shared['session'] = mount(SharedSession())  # type: ignore
+    return _shared['session']  # type: ignore
+
+
+def _enable_http2():
+    """Internal Helper Method to switch HTTPS connections to HTTP/2, if `h2` is installed."""
+    try:
+        # pylint: disable=import-outside-toplevel
+        from urllib3.http2 import inject_into_urllib3
+        inject_into_urllib3()
+        logger.info('Using HTTP/2 for HTTPS connections')
+    except ImportError as ex:
+        logger.warning('HTTP/2 is unavailable, using HTTP/1.1: %s', ex)
@@ -6,8 +6,9 @@ Utility Functions
 """
 
 # Standard imports
+from collections.abc import Mapping
 import logging
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 from enum import EnumType
 import re
 import os
@@ -38,6 +39,23 @@ def try_parse_int(value, default: int, base: int = 10) -> int:
                        ex, default)
         return default
 
+
+def try_parse_bool(value, default: bool) -> bool:
+    """For a given string value, attempts to convert that value into a boolean.
+
+    Accepts `true`/`false`, `yes`/`no`, `on`/`off` and `1`/`0`, in any case."""
+    # If we received None or an empty string, just return the default
+    if value in [None, '']:
+        return default
+
+    normalized = str(value).strip().casefold()
+    if normalized in ['true', 'yes', 'on', '1']:
+        return True
+    if normalized in ['false', 'no', 'off', '0']:
+        return False
+    logger.warning('Unable to parse %s as a boolean, using default: %s', value, default)
+    return default
+
 # 45: Add support for active hours
 
 
@@ -56,11 +74,11 @@ def try_parse_datetime(value: str, default: datetime, format: str = "%H:%M:%S")
 
 
 def is_active_hours(active_days: list[enum.Weekday], active_hours_start: time,
-                    active_hours_end: time) -> bool:
+                    active_hours_end: time, now: datetime | None = None) -> bool:
     """For a given set of active days and start and end times,
-    determine if `datetime.now()` is within the active period."""
+    determine if `now` (by default, `datetime.now()`) is within the active period."""
     try:
-        current_time = datetime.now()
+        current_time = now if now is not None else datetime.now()
         # First, is the current weekday within the active_days list?
         if current_time.weekday() not in active_days:
             return False
@@ -76,6 +94,34 @@ def is_active_hours(active_days: list[enum.Weekday], active_hours_start: time,
         return False
 
 
+def get_next_transition(intervals: list[tuple[datetime, datetime]], lookahead: int,
+                        now: datetime, horizon: datetime | None = None) -> datetime | None:
+    """For a given list of (start, end) calendar intervals and a lookahead period, in minutes,
+    returns the earliest time after `now` at which the calendar status could change,
+    or None if no such time is known.
+
+    A lookahead window begins overlapping an interval `lookahead` minutes before it starts,
+    and stops overlapping it when it ends. Edges at or beyond `horizon` are ignored, since
+    intervals are typically clipped to the end of the window they were queried for.
+    """
+    edges = [edge for start, end in intervals
+             for edge in (start - timedelta(minutes=lookahead), end)
+             if edge > now and (horizon is None or edge < horizon)]
+    return min(edges, default=None)
+
+
+def is_same_configuration(current: object, configured: object) -> bool:
+    """For a freshly configured source or target, determines whether `current` is the
+    same type with the same public settings, and so can be kept in its place.
+
+    Private attributes (e.g. caches and clients) that `current` has built up are ignored."""
+    if type(current) is not type(configured):
+        return False
+    return all(getattr(current, attribute, None) == value
+               for attribute, value in vars(configured).items()
+               if not attribute.startswith('_'))
+
+
 def parse_color(color_string: str, default: str) -> str:
     """Given a string or Color enum value, attempts to parse the string into a hex color."""
     temp_color = default
@@ -149,9 +195,10 @@ def parse_str_array(value_string: str | list[str], default: list[str],
                 temp_value.append(value)
         else:
             temp_value = []
-            if casefold:
-                for value in value_string:
-                    temp_value.append(value.casefold())
+            for value in value_string:
+                if casefold:
+                    value = value.casefold()
+                temp_value.append(value)
 
     except Exception as ex:  # pylint: disable=broad-except
         logger.warning('Exception while parsing a string array: %s', ex)
@@ -161,7 +208,8 @@ def parse_str_array(value_string: str | list[str], default: list[str],
 # 30 - Docker Secrets
 
 
-def get_env_or_secret(variable: str, default: str, treat_empty_as_none: bool = True) -> str:
+def get_env_or_secret(variable: str, default: str, treat_empty_as_none: bool = True,
+                      environ: Mapping[str, str] | None = None) -> str:
     """Given a variable name, returns the Environment or File variant of the variable.
     If both are None, returns default.
 
@@ -177,16 +225,21 @@ def get_env_or_secret(variable: str, default: str, treat_empty_as_none: bool = T
 
     Note that this method does not attempt to parse or validate the value in variable;
     it simply returns the raw string found, if any.
+
+    Pass environ to read from a mapping other than the process environment.
     """
+    if environ is None:
+        environ = os.environ
+
     value = default
     try:
         # First, check the standard variant
-        value = os.environ.get(variable, None)
+        value = environ.get(variable, None)
 
         # If this value is None or an empty string,
         if value is None or (treat_empty_as_none and value == ''):
             # Check the _FILE variant
-            secret_filename = os.environ.get(variable + '_FILE', None)
+            secret_filename = environ.get(variable + '_FILE', None)
             if secret_filename is not None and (treat_empty_as_none and value != ''):
                 value = _read_file(secret_filename)
         else: